@@ -1,5 +1,6 @@
 import argparse
 import logging
+import threading
 import uuid
 
 import pyaudio
@@ -7,6 +8,9 @@ from emissor.representation.scenario import Modality
 from flask import Flask, Response, stream_with_context
 from flask import g as app_context
 
+from cltl.vad.frames import audio_content_type
+from cltl_service.vad.shared_source import SharedAudioWriter
+
 logger = logging.getLogger(__name__)
 
 
@@ -82,9 +86,33 @@ class Mic:
         return data
 
 
-def backend_app(sampling_rate, channels, frame_size):
+def capture_shared(url, sampling_rate, channels, frame_size) -> Mic:
+    """
+    Capture the microphone into shared memory for the VAD on the same host.
+
+    The frames are written with a :class:`SharedAudioWriter` for the given URL
+    until the returned microphone is stopped.
+    """
+    mic = Mic(sampling_rate, channels, frame_size)
+
+    def capture():
+        with SharedAudioWriter(url, sampling_rate, channels, frame_size) as writer, mic as mic_stream:
+            for frame in mic_stream:
+                writer.write(frame)
+        logger.debug("Stopped shared capture of %s", url)
+
+    threading.Thread(target=capture, name="shared-capture", daemon=True).start()
+    logger.info("Capture microphone to shared memory for %s", url)
+
+    return mic
+
+
+def backend_app(sampling_rate, channels, frame_size, shared_url=None):
     app = Flask(__name__)
 
+    if shared_url:
+        capture_shared(shared_url, sampling_rate, channels, frame_size)
+
     @app.route(f"/{Modality.AUDIO.name.lower()}")
     def stream_mic():
         mic = Mic(sampling_rate, channels, frame_size)
@@ -96,7 +124,7 @@ def backend_app(sampling_rate, channels, frame_size):
         # Store mic in (thread-local) app-context to be able to close it.
         app_context.mic = mic
 
-        mime_type = f"audio/L16; rate={sampling_rate}; channels={channels}; frame_size={frame_size}"
+        mime_type = audio_content_type(sampling_rate, channels, frame_size)
         stream = stream_with_context(audio_stream(mic))
 
         return Response(stream, mimetype=mime_type)
@@ -129,8 +157,11 @@ if __name__ == '__main__':
     parser.add_argument('--channels', type=int, choices=[1, 2], default=2, help="Number of audio channels.")
     parser.add_argument('--frame_duration', type=int, choices=[10, 20, 30], default=30, help="Duration of audio frames in milliseconds.")
     parser.add_argument('--port', type=int, default=8000, help="Web server port")
+    parser.add_argument('--shared_url', type=str, default=None,
+                        help="Also write the microphone to shared memory for the VAD on the same host with this URL.")
     args, _ = parser.parse_known_args()
 
     logger.info("Starting webserver with args: %s", args)
 
-    backend_app(args.rate, args.channels, args.frame_duration * args.rate // 1000).run(host="0.0.0.0", port=args.port)
\ No newline at end of file
+    app = backend_app(args.rate, args.channels, args.frame_duration * args.rate // 1000, args.shared_url)
+    app.run(host="0.0.0.0", port=args.port)
\ No newline at end of file
@@ -0,0 +1,44 @@
+from typing import Iterable, BinaryIO
+
+import numpy as np
+
+from cltl.vad.frames import BlockPool, FrameReader
+
+
+def read_frames(stream: BinaryIO, frame_size: int, channels: int, block_frames: int = 32) -> Iterable[np.ndarray]:
+    """
+    Read 16bit audio frames from a binary stream.
+
+    Frames are read directly into preallocated blocks of multiple frames,
+    chunks that arrive short are reassembled into complete frames. Each frame
+    is yielded as soon as it is complete and is a view on its block, which is
+    not reused. Use a :class:`~cltl.vad.frames.FrameReader` with a
+    :class:`~cltl.vad.frames.BlockPool` to reuse blocks across streams.
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        Stream providing raw audio data, must support `readinto`.
+    frame_size : int
+        Number of samples per frame.
+    channels : int
+        Number of channels.
+    block_frames : int
+        Number of frames per allocated block.
+
+    Returns
+    -------
+    Iterable[np.ndarray]
+        Audio frames of shape (frame_size, channels), an incomplete frame at the
+        end of the stream is dropped.
+    """
+    yield from FrameReader(stream, frame_size, channels, BlockPool(block_frames, max_free=0))
+
+
+def segment_bytes(frames: Iterable[np.ndarray]) -> bytes:
+    """
+    Concatenate audio frames into a single buffer to be sent in one write.
+    """
+    frames = list(frames)
+
+    return np.concatenate(frames).tobytes() if frames else b''
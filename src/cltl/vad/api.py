@@ -1,5 +1,5 @@
 import abc
-from typing import Iterable
+from typing import Iterable, Dict, Any
 
 import numpy as np
 
@@ -10,6 +10,23 @@ class VadTimeout(Exception):
 
 
 class VAD(abc.ABC):
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        """
+        Parameters of the VAD that determine the detected voice activity.
+
+        By default these are the attributes of the instance with primitive values
+        and the parameters of nested VADs.
+        """
+        parameters = dict()
+        for name, value in vars(self).items():
+            if isinstance(value, (bool, int, float, str, type(None))):
+                parameters[name] = value
+            elif isinstance(value, VAD):
+                parameters[name] = (value.__class__.__name__, value.parameters)
+
+        return parameters
+
     @abc.abstractmethod
     def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
         raise NotImplementedError("")
@@ -19,7 +36,7 @@ class VAD(abc.ABC):
                    audio_frames: Iterable[np.ndarray],
                    sampling_rate: int,
                    blocking: bool = True,
-                   timeout: int = 0) -> [Iterable[np.ndarray], int, int]:
+                   timeout: float = 0) -> [Iterable[np.ndarray], int, int]:
         """
         WIP
 
@@ -28,6 +45,8 @@ class VAD(abc.ABC):
         audio_frames : Iterable[np.array]
             Stream of audio frames on which voice activity will be detected.
             Implementations may support only specific frame formats.
+            Detection is cancelled by ending the stream, e.g. by wrapping it
+            with :func:`cltl.vad.util.cancellable`.
 
         sampling_rate : int
             The sampling rate of the audio frames
@@ -36,8 +55,9 @@ class VAD(abc.ABC):
             If True, the method blocks until voice activity is detected.
 
         timeout : float
-            Maximum duration of audio frames accepted for voice activity detection
-            in seconds.
+            Maximum time in seconds until voice activity is detected, no timeout if 0.
+            By default the time is measured in duration of the processed audio
+            frames, implementations may support measuring elapsed time.
 
         Returns
         -------
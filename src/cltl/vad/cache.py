@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from cltl.vad.api import VAD
+
+logger = logging.getLogger(__name__)
+
+
+Segments = List[Tuple[int, int]]
+
+
+class SegmentCache:
+    def __init__(self, capacity: int = 128, directory: str = None, max_disk_size: int = 100 * 1024 * 1024):
+        """
+        Cache of the voice activity segments detected in an audio signal.
+
+        Entries are kept in an in-memory LRU cache and, if a directory is provided,
+        on disk. The disk tier evicts the least recently used entries when its size
+        exceeds the limit.
+
+        Parameters
+        ----------
+        capacity : int
+            Maximum number of entries kept in memory.
+        directory : str
+            Directory of the disk tier, no disk tier is used if None.
+        max_disk_size : int
+            Maximum size of the disk tier in bytes.
+        """
+        self._capacity = capacity
+        self._directory = directory
+        self._max_disk_size = max_disk_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(signal: str, vad: VAD) -> str:
+        """
+        Cache key for the audio signal identified by its id or URL and the configuration of the VAD.
+
+        Any change of the parameters of the VAD results in a different key.
+        """
+        description = json.dumps({"signal": signal, "vad": vad.__class__.__name__, "parameters": vad.parameters},
+                                 sort_keys=True, default=str)
+
+        return hashlib.sha1(description.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Segments]:
+        entry = self.entry(key)
+
+        return entry[0] if entry is not None else None
+
+    def entry(self, key: str) -> Optional[Tuple[Segments, Optional[int]]]:
+        """
+        The cached segments and the sampling rate of their signal, None if the rate was not stored.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                segments, rate = self._entries[key]
+                return list(segments), rate
+
+        entry = self._load(key)
+        if entry is not None:
+            self._put_memory(key, *entry)
+
+        return entry
+
+    def put(self, key: str, segments: Segments, rate: Optional[int] = None):
+        segments = [(int(start), int(stop)) for start, stop in segments]
+        rate = int(rate) if rate else None
+        self._put_memory(key, segments, rate)
+        self._store(key, segments, rate)
+
+    def _put_memory(self, key: str, segments: Segments, rate: Optional[int]):
+        with self._lock:
+            self._entries[key] = segments, rate
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.npz")
+
+    def _load(self, key: str) -> Optional[Tuple[Segments, Optional[int]]]:
+        if not self._directory:
+            return None
+
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                segments, rate = entry["segments"], int(entry["rate"])
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+
+        return [(int(start), int(stop)) for start, stop in segments.reshape((-1, 2))], rate or None
+
+    def _store(self, key: str, segments: Segments, rate: Optional[int]):
+        if not self._directory:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, segments=np.array(segments, dtype=np.int64).reshape((-1, 2)), rate=rate or 0)
+        os.replace(tmp_path, path)
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self._directory):
+            # Entries stored without sampling rate (.npy) are evicted as well
+            if not name.endswith((".npz", ".npy")):
+                continue
+            try:
+                stat = os.stat(os.path.join(self._directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+            except FileNotFoundError:
+                pass
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self._max_disk_size:
+                break
+            try:
+                os.remove(os.path.join(self._directory, name))
+                total -= size
+                logger.debug("Evicted %s from VAD cache", name)
+            except FileNotFoundError:
+                pass
@@ -1,29 +1,53 @@
 import logging
 from collections import deque
-from queue import Queue
+from itertools import chain, islice
 from threading import Event
 from typing import Iterable
 
 import numpy as np
 
 from cltl.vad.api import VAD
-from cltl.vad.util import as_iterable
 
 logger = logging.getLogger(__name__)
 
 
 class ControllerVAD(VAD):
-    def __init__(self, vad: VAD, padding_size: int, min_duration: int):
+    def __init__(self, vad: VAD, padding_size: int, min_duration: int = 0, pre_roll: int = 0):
+        """
+        Voice activity detection that is activated and deactivated externally.
+
+        While active, the start of voice activity is detected by the wrapped VAD,
+        the end of voice activity is marked by deactivation.
+
+        Parameters
+        ----------
+        vad : VAD
+            The VAD used to detect the start of voice activity while active.
+        padding_size : int
+            Duration in milliseconds of audio added before the start and after the
+            end of voice activity.
+        min_duration : int
+            Minimum duration of voice activity in milliseconds, shorter voice activity
+            is discarded.
+        pre_roll : int
+            Duration of audio in milliseconds received before activation that is
+            included when detecting the start of voice activity.
+        """
         self._vad = vad
-        self._active = Event()
         self._padding = padding_size
+        self._min_duration = min_duration
+        self._pre_roll = pre_roll
+        # Plain attribute to be read per frame, the Event is used for waiting only
+        self._is_active = False
+        self._active = Event()
 
     @property
     def active(self) -> bool:
-        return self._active.is_set()
+        return self._is_active
 
     @active.setter
     def active(self, is_active):
+        self._is_active = bool(is_active)
         if is_active:
             self._active.set()
             logger.debug("VA set active")
@@ -31,8 +55,15 @@ class ControllerVAD(VAD):
             logger.debug("VA set inactive")
             self._active.clear()
 
+    def wait_active(self, timeout: float = None) -> bool:
+        return self._active.wait(timeout)
+
     def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
-        return self.active
+        return self._is_active
+
+    def _is_speech(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        """Decision of the wrapped VAD for a frame"""
+        return self._vad.is_vad(audio_frame, sampling_rate)
 
     def detect_vad(self, audio_frames: Iterable[np.ndarray], sampling_rate: int, blocking: bool = True,
                    timeout: int = 0) -> [Iterable[np.ndarray], int, int]:
@@ -46,50 +77,68 @@ class ControllerVAD(VAD):
             return [], -1, 0
 
         frame_duration = 1000 * len(frame) / sampling_rate
+        pre_roll = deque(maxlen=int(self._pre_roll // frame_duration))
         padding_size = int(self._padding // frame_duration)
 
-        padding_buffer = deque(maxlen=padding_size)
-        audio = []
-
-        while not self.active:
+        # Keep the most recent audio while not active
+        while not self._is_active:
+            pre_roll.append(frame)
             try:
-                # Drop audio if not active
                 frame = next(audio_iter)
                 cnt += 1
             except StopIteration:
                 logger.debug("No VA in controlled audio of length %s", cnt)
                 return [], -1, cnt
 
-        while self.active and not self._vad.is_vad(frame, sampling_rate):
-            try:
-                padding_buffer.append(frame)
-                frame = next(audio_iter)
-                cnt += 1
-            except StopIteration:
-                logger.debug("No VA in controlled audio of length %s", cnt)
-                return [], -1, cnt
+        # Position of the next frame in the input stream, starting with the pre-roll
+        position = cnt - 1 - len(pre_roll)
+        frames = chain(pre_roll, (frame,), audio_iter)
 
-        offset = cnt - len(padding_buffer) - 1
-        list(map(audio.append, padding_buffer))
-        logger.debug("Detected start of VA at offset %s cnt (padding %s)", offset, len(padding_buffer))
+        is_vad = self._is_speech
+        padding_buffer = deque(maxlen=padding_size)
+        onset = -1
+        for frame in frames:
+            if not self._is_active:
+                break
+            if is_vad(frame, sampling_rate):
+                onset = position
+                break
+            padding_buffer.append(frame)
+            position += 1
+        else:
+            logger.debug("No VA in controlled audio of length %s", position)
+            return [], -1, max(cnt, position)
 
-        while self.is_vad(frame, sampling_rate):
-            try:
-                audio.append(frame)
-                frame = next(audio_iter)
-                cnt += 1
-            except StopIteration:
-                logger.debug("Detected VA of length: %s", len(audio))
-                return tuple(audio), offset, cnt
+        if onset < 0:
+            logger.debug("Deactivated without VA at %s", position)
+            return (), position, max(cnt, position + 1)
 
-        for _ in range(padding_size):
-            try:
-                audio.append(frame)
-                frame = next(audio_iter)
-                cnt += 1
-            except:
+        offset = onset - len(padding_buffer)
+        audio = list(padding_buffer)
+        logger.debug("Detected start of VA at offset %s cnt (padding %s)", offset, len(padding_buffer))
+
+        audio.append(frame)
+        position += 1
+        end_of_audio = True
+        for frame in frames:
+            if not self._is_active:
+                end_of_audio = False
                 break
+            audio.append(frame)
+            position += 1
+
+        va_duration = (position - onset) * frame_duration
+        if va_duration < self._min_duration:
+            logger.debug("Discarded short VA of %sms", va_duration)
+            return (), offset, max(cnt, position + int(not end_of_audio))
+
+        if end_of_audio:
+            logger.debug("Detected VA of length: %s", len(audio))
+            return tuple(audio), offset, max(cnt, position)
+
+        audio.extend(islice(chain((frame,), frames), padding_size))
+        position = offset + len(audio) if padding_size else position + 1
 
         logger.debug("Detected VA of length: %s", len(audio))
 
-        return tuple(audio), offset, cnt
+        return tuple(audio), offset, max(cnt, position)
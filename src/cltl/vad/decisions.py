@@ -0,0 +1,75 @@
+import json
+import logging
+from typing import Iterable
+
+import numpy as np
+
+from cltl.vad.api import VAD
+
+logger = logging.getLogger(__name__)
+
+
+class FrameDecisions:
+    """
+    Per-frame voice activity decisions of a recording.
+
+    The decisions do not depend on the windowing, gap and padding parameters of
+    :class:`~cltl.vad.frame_vad.FrameWiseVAD`, they can be computed once and replayed
+    for different settings, see :mod:`cltl.vad.segmentation`.
+
+    Binary decisions are stored bit-packed, scores are stored as float16. The
+    stored data is a NumPy array that can be memory-mapped.
+    """
+    def __init__(self, decisions: np.ndarray, frame_duration: float):
+        self._decisions = decisions
+        self._frame_duration = frame_duration
+
+    @classmethod
+    def compute(cls, vad: VAD, audio_frames: Iterable[np.ndarray], sampling_rate: int):
+        # Apply the pre-filter of frame-wise VADs
+        classifier = getattr(vad, "frame_classifier", None)
+        is_vad = classifier(sampling_rate) if classifier else vad.is_vad
+
+        decisions = []
+        frame_duration = None
+        for frame in audio_frames:
+            if frame_duration is None:
+                frame_duration = 1000 * len(frame) / sampling_rate
+            decisions.append(is_vad(frame, sampling_rate))
+
+        return cls(np.array(decisions, dtype=bool), frame_duration)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        with open(f"{path}.json") as meta_file:
+            meta = json.load(meta_file)
+
+        data = np.load(f"{path}.npy", mmap_mode='r' if mmap else None)
+        if meta["format"] == "bits":
+            decisions = np.unpackbits(data, count=meta["frames"]).astype(bool)
+        else:
+            decisions = data
+
+        return cls(decisions, meta["frame_duration"])
+
+    def save(self, path: str):
+        if self._decisions.dtype == bool:
+            data, data_format = np.packbits(self._decisions), "bits"
+        else:
+            data, data_format = self._decisions.astype(np.float16), "float16"
+
+        np.save(f"{path}.npy", data)
+        with open(f"{path}.json", 'w') as meta_file:
+            json.dump({"format": data_format, "frames": len(self._decisions),
+                       "frame_duration": self._frame_duration}, meta_file)
+
+    @property
+    def decisions(self) -> np.ndarray:
+        return self._decisions
+
+    @property
+    def frame_duration(self) -> float:
+        return self._frame_duration
+
+    def __len__(self):
+        return len(self._decisions)
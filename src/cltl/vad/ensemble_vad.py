@@ -0,0 +1,220 @@
+import abc
+import logging
+from typing import Iterable, List, Dict, Any
+
+import numpy as np
+
+from cltl.vad.frame_vad import FrameWiseVAD, AUDIO_CLOCK
+from cltl.vad.webrtc_vad import to_mono
+
+logger = logging.getLogger(__name__)
+
+
+class FrameDetector(abc.ABC):
+    cost = 1.0
+    """Relative cost of a decision, cheaper detectors are evaluated first"""
+    stateful = False
+    """Whether decisions depend on previous frames, stateful detectors are evaluated on every frame"""
+
+    @abc.abstractmethod
+    def is_speech(self, mono_frame: np.ndarray, pcm: bytes, sampling_rate: int) -> bool:
+        """
+        Decide if a single channel audio frame contains speech.
+
+        Parameters
+        ----------
+        mono_frame : np.ndarray
+            The samples of the frame.
+        pcm : bytes
+            The samples of the frame as 16 bit PCM.
+        sampling_rate : int
+            The sampling rate of the frame.
+        """
+        raise NotImplementedError()
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        return {name: value for name, value in vars(self).items()
+                if isinstance(value, (bool, int, float, str, type(None)))}
+
+
+class WebRtcDetector(FrameDetector):
+    cost = 1.0
+    stateful = True
+
+    def __init__(self, mode: int = 3):
+        self.mode = mode
+        import webrtcvad
+        self._vad = webrtcvad.Vad(mode)
+
+    def is_speech(self, mono_frame: np.ndarray, pcm: bytes, sampling_rate: int) -> bool:
+        return self._vad.is_speech(pcm, sampling_rate, len(mono_frame))
+
+
+class EnergyDetector(FrameDetector):
+    cost = 0.1
+
+    def __init__(self, threshold: float = -40):
+        """
+        Detect frames with an RMS level above a threshold in dBFS.
+        """
+        self.threshold = threshold
+        self._min_square = (np.iinfo(np.int16).max * 10 ** (threshold / 20)) ** 2
+
+    def is_speech(self, mono_frame: np.ndarray, pcm: bytes, sampling_rate: int) -> bool:
+        samples = mono_frame.astype(np.float64)
+
+        return np.dot(samples, samples) > self._min_square * len(samples)
+
+
+class EnsembleVAD(FrameWiseVAD):
+    def __init__(self, detectors: List[FrameDetector], weights: List[float] = None, vote_threshold: float = 0.5,
+                 early_exit: bool = True,
+                 activity_window: int = 1, activity_threshold: float = 1,
+                 allow_gap: int = 0, padding: int = 2, min_duration: int = 0,
+                 storage: str = None, max_duration: int = 0, timeout_clock: str = AUDIO_CLOCK,
+                 offset_threshold: float = None, offset_window: int = None,
+                 dc_block: bool = False, highpass_cutoff: float = 0):
+        """
+        Voice activity detection by a weighted vote of multiple frame detectors.
+
+        A frame is voice active if the total weight of the detectors deciding for
+        speech reaches `vote_threshold` of the total weight. Validation, downmixing
+        and conversion of a frame are done once and shared by the detectors.
+
+        With early exit, detectors are evaluated in order of their cost and
+        evaluation stops as soon as the remaining detectors cannot change the
+        outcome of the vote, e.g. when the cheap detectors agree with sufficient
+        weight. Stateful detectors, e.g. :class:`WebRtcDetector` that adapts to
+        the frames it sees, are evaluated on every frame before the stateless
+        ones, such that their state does not depend on early exits. The decision
+        is the same as when all detectors are evaluated.
+
+        Parameters
+        ----------
+        detectors : List[FrameDetector]
+            The detectors of the ensemble.
+        weights : List[float]
+            Non-negative weights of the detectors, equal weights if None,
+            see :meth:`learn_weights`.
+        vote_threshold : float
+            Fraction of the total weight required to decide for speech.
+        early_exit : bool
+            Stop evaluating detectors once the vote is decided.
+
+        For the remaining parameters see :class:`~cltl.vad.frame_vad.FrameWiseVAD`.
+        """
+        super().__init__(activity_window, activity_threshold, allow_gap, padding, min_duration, storage=storage,
+                         max_duration=max_duration, timeout_clock=timeout_clock,
+                         offset_threshold=offset_threshold, offset_window=offset_window,
+                         dc_block=dc_block, highpass_cutoff=highpass_cutoff)
+        if not detectors:
+            raise ValueError("At least one detector is required")
+        weights = np.ones(len(detectors)) if weights is None else np.asarray(weights, dtype=np.float64)
+        if len(weights) != len(detectors) or np.any(weights < 0) or not np.any(weights > 0):
+            raise ValueError(f"Expected non-negative weights for {len(detectors)} detectors, was {weights}")
+
+        self._detectors = list(detectors)
+        self._weights = weights
+        self._vote_threshold = vote_threshold
+        self._early_exit = early_exit
+
+        self._required = vote_threshold * weights.sum()
+        order = sorted(range(len(detectors)), key=lambda i: (not detectors[i].stateful, detectors[i].cost))
+        self._ordered = [(detectors[i], weights[i]) for i in order if weights[i] > 0]
+        self._stateful = [(detector, weight) for detector, weight in self._ordered if detector.stateful]
+        self._stateless = [(detector, weight) for detector, weight in self._ordered if not detector.stateful]
+        # Weight of the stateless detectors following each position in the evaluation order
+        self._remaining = np.cumsum([weight for _, weight in self._stateless][::-1])[::-1][1:].tolist() + [0.0]
+        self._stateless_weight = sum(weight for _, weight in self._stateless)
+
+        logger.info("Setup EnsembleVAD with %s detectors (weights: %s, threshold: %s)",
+                    len(detectors), weights.tolist(), vote_threshold)
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        parameters = super().parameters
+        parameters["detectors"] = [(detector.__class__.__name__, detector.parameters) for detector in self._detectors]
+        parameters["weights"] = self._weights.tolist()
+
+        return parameters
+
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        mono_frame = to_mono(audio_frame, sampling_rate)
+        pcm = mono_frame.tobytes()
+
+        if not self._early_exit:
+            return self._score(mono_frame, pcm, sampling_rate) >= self._required
+
+        score = sum(weight for detector, weight in self._stateful
+                    if detector.is_speech(mono_frame, pcm, sampling_rate))
+        if score >= self._required:
+            return True
+        if score + self._stateless_weight < self._required:
+            return False
+
+        for (detector, weight), remaining in zip(self._stateless, self._remaining):
+            if detector.is_speech(mono_frame, pcm, sampling_rate):
+                score += weight
+            if score >= self._required:
+                return True
+            if score + remaining < self._required:
+                return False
+
+        return score >= self._required
+
+    def decisions(self, audio_frames: Iterable[np.ndarray], sampling_rate: int) -> np.ndarray:
+        """
+        Decisions of all detectors for a batch of frames.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean array of shape (frames, detectors).
+        """
+        decisions = []
+        for audio_frame in audio_frames:
+            mono_frame = to_mono(audio_frame, sampling_rate)
+            pcm = mono_frame.tobytes()
+            decisions.append([detector.is_speech(mono_frame, pcm, sampling_rate) for detector in self._detectors])
+
+        return np.array(decisions, dtype=bool).reshape(-1, len(self._detectors))
+
+    def vote(self, decisions: np.ndarray) -> np.ndarray:
+        """
+        Ensemble decisions for a batch of detector decisions, see :meth:`decisions`.
+        """
+        return np.asarray(decisions, dtype=np.float64) @ self._weights >= self._required
+
+    @staticmethod
+    def learn_weights(decisions: np.ndarray, labels: np.ndarray, smoothing: float = 1.0) -> np.ndarray:
+        """
+        Weights of the detectors learned from labelled frames.
+
+        The weight of a detector is the log-odds of its accuracy, which is the
+        optimal weighting of independent detectors in a majority vote. Detectors
+        that are not better than chance get weight zero.
+
+        Parameters
+        ----------
+        decisions : np.ndarray
+            Decisions of the detectors of shape (frames, detectors), see :meth:`decisions`.
+        labels : np.ndarray
+            Reference decisions of shape (frames,).
+        smoothing : float
+            Additive smoothing of the accuracy.
+
+        Returns
+        -------
+        np.ndarray
+            The weights of the detectors.
+        """
+        decisions = np.asarray(decisions, dtype=bool)
+        labels = np.asarray(labels, dtype=bool)
+        correct = (decisions == labels[:, np.newaxis]).sum(axis=0)
+        accuracy = (correct + smoothing) / (len(labels) + 2 * smoothing)
+
+        return np.clip(np.log(accuracy / (1 - accuracy)), 0, None)
+
+    def _score(self, mono_frame, pcm, sampling_rate):
+        return sum(weight for detector, weight in self._ordered if detector.is_speech(mono_frame, pcm, sampling_rate))
@@ -0,0 +1,166 @@
+"""
+Declarative specification of VAD detectors.
+
+VAD instances wrap native detectors that cannot be pickled or shared between
+threads and processes. A :class:`DetectorSpec` describes a detector by its type
+and constructor parameters instead, it can be passed to worker threads or
+processes which build their own instance with :func:`detector`.
+"""
+import importlib
+import inspect
+import logging
+import os
+import threading
+from typing import Dict, Any
+
+from cltl.vad.api import VAD
+
+logger = logging.getLogger(__name__)
+
+
+DETECTORS = {
+    "webrtc": "cltl.vad.webrtc_vad.WebRtcVAD",
+}
+"""Short names of VAD implementations, other types are given by their qualified class name"""
+
+MAX_DETECTORS = 8
+"""Maximum number of VAD instances kept per thread, the least recently built are dropped first"""
+
+
+class DetectorSpec:
+    __slots__ = ('type', 'parameters')
+
+    def __init__(self, type: str, parameters: Dict[str, Any] = None):
+        """
+        Type and constructor parameters of a VAD.
+
+        Parameters
+        ----------
+        type : str
+            A name in :data:`DETECTORS` or the qualified name of a VAD class.
+        parameters : Dict[str, Any]
+            Keyword arguments of the constructor, must be picklable.
+        """
+        self.type = type
+        self.parameters = dict(parameters) if parameters else dict()
+
+    @classmethod
+    def from_config(cls, config_manager, section: str = "cltl.vad.webrtc", type: str = "webrtc"):
+        """
+        Specification with the parameters configured in a section of the configuration.
+
+        Configuration keys that match a parameter of the constructor of the VAD are
+        converted to the annotated type of the parameter, empty values are ignored.
+        """
+        return cls.from_configuration(config_manager.get_config(section), type)
+
+    @classmethod
+    def from_configuration(cls, config, type: str = "webrtc"):
+        """
+        Specification with the parameters in a :class:`Configuration`, see :meth:`from_config`.
+        """
+        getters = {int: config.get_int, float: config.get_float, bool: config.get_boolean, str: config.get}
+
+        parameters = dict()
+        for name, parameter in inspect.signature(cls._class(type)).parameters.items():
+            if parameter.annotation in getters and name in config and config.get(name) != "":
+                parameters[name] = getters[parameter.annotation](name)
+
+        return cls(type, parameters)
+
+    def build(self) -> VAD:
+        """Create a new instance of the VAD"""
+        return self._class(self.type)(**self.parameters)
+
+    def updated(self, parameters: Dict[str, Any]) -> "DetectorSpec":
+        """
+        Specification of the same type with parameters replaced by the given parameters.
+
+        Values are converted to the annotated type of the constructor parameter,
+        e.g. to accept parameters from JSON.
+
+        Raises
+        ------
+        ValueError
+            If a parameter is not a parameter of the constructor of the VAD or
+            its value does not match the annotated type.
+        """
+        signature = inspect.signature(self._class(self.type)).parameters
+        unknown = [name for name in parameters if name not in signature]
+        if unknown:
+            raise ValueError(f"Unknown parameters {unknown} for VAD {self.type}")
+
+        converted = {name: _convert(name, value, signature[name]) for name, value in parameters.items()}
+
+        return DetectorSpec(self.type, {**self.parameters, **converted})
+
+    @staticmethod
+    def _class(type: str):
+        module, _, name = DETECTORS.get(type, type).rpartition('.')
+
+        return getattr(importlib.import_module(module), name)
+
+    def _key(self):
+        return self.type, tuple(sorted(self.parameters.items()))
+
+    def __eq__(self, other):
+        return isinstance(other, DetectorSpec) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"DetectorSpec({self.type!r}, {self.parameters!r})"
+
+
+def _convert(name: str, value: Any, parameter: inspect.Parameter) -> Any:
+    annotation = parameter.annotation
+    if value is None and parameter.default is None:
+        return value
+    if annotation is bool and isinstance(value, bool):
+        return value
+    if annotation is int and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if annotation is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    if annotation is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if annotation is str and isinstance(value, str):
+        return value
+    if annotation not in (bool, int, float, str):
+        return value
+
+    raise ValueError(f"Invalid value {value!r} for parameter {name}, expected {annotation.__name__}")
+
+
+_instances = threading.local()
+
+
+def detector(spec: DetectorSpec) -> VAD:
+    """
+    Instance of the VAD for the current thread, built on first use.
+
+    Instances are not shared between threads, and instances inherited from the
+    parent of a forked process are not reused.
+    """
+    if getattr(_instances, "pid", None) != os.getpid():
+        _instances.pid = os.getpid()
+        _instances.detectors = dict()
+
+    if spec not in _instances.detectors:
+        logger.debug("Build VAD %s in process %s (%s)", spec, os.getpid(), threading.current_thread().name)
+        _instances.detectors[spec] = spec.build()
+        # Drop instances of replaced specifications
+        while len(_instances.detectors) > MAX_DETECTORS:
+            del _instances.detectors[next(iter(_instances.detectors))]
+
+    return _instances.detectors[spec]
+
+
+def prewarm(spec: DetectorSpec):
+    """
+    Build the VAD for the current thread ahead of use, e.g. as initializer of a worker pool::
+
+        ProcessPoolExecutor(initializer=prewarm, initargs=(spec,))
+    """
+    detector(spec)
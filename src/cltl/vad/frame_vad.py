@@ -1,52 +1,209 @@
 import abc
 import logging
+import time
 from collections import deque
 from itertools import chain, islice
 from queue import Queue
 
 import numpy as np
-from cltl.combot.infra.time_util import timestamp_now
-from typing import Iterable
+from typing import Iterable, List, Tuple, Callable
 
 from cltl.vad.api import VAD, VadTimeout
-from cltl.vad.util import as_iterable, store_frames
+from cltl.vad.decisions import FrameDecisions
+from cltl.vad.prefilter import prefilter, FilterStream
+from cltl.vad.profiling import PROFILER
+from cltl.vad.segmentation import SegmentationParameters, replay_segments
+from cltl.vad.util import as_iterable, store_frames, Deadline, with_deadline, CancelToken
 
 logger = logging.getLogger(__name__)
 
 
+AUDIO_CLOCK = "audio"
+"""Measure timeouts in duration of the processed audio"""
+WALL_CLOCK = "wall"
+"""Measure timeouts in elapsed time, including time spent waiting for audio"""
+
+
 class FrameWiseVAD(VAD, abc.ABC):
     def __init__(self, activity_window: int = 1, activity_threshold: float = 1,
                  allow_gap: int = 0, padding: int = 2, min_duration: int = 0,
-                 mode: int = 3, storage: str = None):
-        logger.info("Setup WebRtcVAD with mode %s", mode)
+                 mode: int = 3, storage: str = None, max_duration: int = 0, timeout_clock: str = AUDIO_CLOCK,
+                 offset_threshold: float = None, offset_window: int = None,
+                 dc_block: bool = False, highpass_cutoff: float = 0):
+        """
+        Voice activity detection based on decisions for individual audio frames.
+
+        By default the same window and threshold apply to the start and the
+        continuation of voice activity. With an `offset_threshold`, detection uses
+        hysteresis: voice activity starts when the average over the activity
+        window reaches the activity threshold and continues while the average over
+        the offset window reaches the offset threshold. A high activity threshold
+        with a short window and a lower offset threshold with a longer window
+        avoids false starts without delaying the onset or fragmenting speech.
+
+        Parameters
+        ----------
+        activity_window : int
+            Duration in milliseconds of the window over which frame decisions are averaged.
+        activity_threshold : float
+            Minimum average of frame decisions in the window to detect voice activity.
+        allow_gap : int
+            Maximum duration in milliseconds of a gap within voice activity.
+        padding : int
+            Duration in milliseconds of audio included before and after voice activity.
+        min_duration : int
+            Minimum duration in milliseconds of voice activity.
+        mode : int
+            Unused, kept for compatibility.
+        storage : str
+            Directory to store the processed audio for debugging, not stored if None.
+        max_duration : int
+            Maximum duration in milliseconds of a segment, longer voice activity
+            is split into consecutive segments. Padding after the end of voice
+            activity is not limited. No limit if 0.
+        timeout_clock : str
+            Measure the timeout of :meth:`detect_vad` in duration of processed audio
+            (:data:`AUDIO_CLOCK`) or in elapsed time (:data:`WALL_CLOCK`).
+        offset_threshold : float
+            Minimum average of frame decisions in the offset window to continue
+            voice activity, no hysteresis if None.
+        offset_window : int
+            Duration in milliseconds of the window used to continue voice activity,
+            defaults to the activity window.
+        dc_block : bool
+            Remove DC offset from frames before they are classified.
+        highpass_cutoff : float
+            Cutoff frequency in Hz of a high-pass filter applied to frames before
+            they are classified, e.g. to suppress hum. No filter if 0.
+        """
+        if timeout_clock not in (AUDIO_CLOCK, WALL_CLOCK):
+            raise ValueError(f"Unsupported timeout clock {timeout_clock}, expected {AUDIO_CLOCK} or {WALL_CLOCK}")
+
         self._activity_window = activity_window
         self._activity_threshold = activity_threshold
         self._allow_gap = allow_gap
         self._padding = padding
         self._min_duration = min_duration
         self._storage = storage
+        self._max_duration = max_duration
+        self._timeout_clock = timeout_clock
+        self._offset_threshold = offset_threshold
+        self._offset_window = offset_window if offset_window is not None else activity_window
+        self._dc_block = dc_block
+        self._highpass_cutoff = highpass_cutoff
+        self._prefilters = dict()
+        self._segmentation = SegmentationParameters(activity_window, activity_threshold, allow_gap, padding,
+                                                    min_duration, max_duration, offset_threshold, offset_window)
+        self._frame_counts = dict()
 
     def detect_vad(self,
                    audio_frames: Iterable[np.array],
                    sampling_rate: int,
                    blocking: bool = True,
-                   timeout: int = 0) -> Iterable[np.array]:
+                   timeout: float = 0,
+                   cancel: CancelToken = None) -> Iterable[np.array]:
+        """
+        See :meth:`VAD.detect_vad`.
+
+        The timeout applies until voice activity is detected and is measured with
+        the clock configured for the VAD. With the wall clock, waiting for frames of
+        a stalled stream is bounded by the timeout as well. If the timeout expires
+        while a frame is read, the `cancel` token is cancelled to stop the read,
+        see :func:`~cltl.vad.util.with_deadline`.
+
+        If voice activity exceeds the maximum duration, the segment is split before
+        the frame that would exceed it. In this case the number of consumed frames
+        excludes the frames that were read but are not part of the segment, such
+        that detection continues with them.
+        """
         if not blocking:
             raise NotImplementedError("Currently only blocking is supported")
 
+        voice_activity, offset, consumed = self._detect(audio_frames, sampling_rate, timeout, cancel=cancel)
+        voice_activity.put(None)
+
+        return as_iterable(voice_activity), offset, consumed
+
+    def detect_vad_chunked(self,
+                           audio_frames: Iterable[np.array],
+                           sampling_rate: int,
+                           on_chunk: Callable[[int, List[np.ndarray], bool], None],
+                           chunk_duration: int,
+                           overlap: int = 0,
+                           timeout: float = 0, cancel: CancelToken = None) -> Tuple[int, int, int]:
+        """
+        Detect voice activity as :meth:`detect_vad` and provide its frames in chunks
+        while the voice activity is ongoing.
+
+        Chunks are emitted once voice activity reached the minimum duration, every
+        `chunk_duration` milliseconds of voice activity. Each chunk starts with the
+        last `overlap` milliseconds of the previous chunk. When the voice activity
+        ended, the remaining frames are emitted as final chunk. Frames are not kept
+        after they were emitted.
+
+        Parameters
+        ----------
+        audio_frames : Iterable[np.array]
+            Stream of audio frames on which voice activity will be detected.
+        sampling_rate : int
+            The sampling rate of the audio frames.
+        on_chunk : Callable[[int, List[np.ndarray], bool], None]
+            Called with the offset of the chunk in the input stream (in frames),
+            the frames of the chunk and whether it is the final chunk.
+        chunk_duration : int
+            Duration of a chunk in milliseconds, excluding the overlap.
+        overlap : int
+            Duration in milliseconds by which consecutive chunks overlap.
+        timeout : float
+            See :meth:`detect_vad`.
+        cancel : CancelToken
+            See :meth:`detect_vad`.
+
+        Returns
+        -------
+        int
+            The offset of the voice activity in the input stream (in frames), -1 if
+            no voice activity was detected.
+        int
+            The length of the voice activity (in frames).
+        int
+            The number of frames consumed from the input stream.
+        """
+        chunks = _Chunks(on_chunk, chunk_duration, overlap)
+        voice_activity, offset, consumed = self._detect(audio_frames, sampling_rate, timeout, chunks, cancel)
+        length = chunks.close(voice_activity, offset)
+
+        return (offset, length, consumed) if length else (-1, 0, consumed)
+
+    def _detect(self, audio_frames, sampling_rate, timeout, chunks=None, cancel=None):
         storage_buffer = []
 
+        deadline = None
+        if timeout > 0 and self._timeout_clock == WALL_CLOCK:
+            deadline = Deadline(timeout)
+            audio_frames = with_deadline(audio_frames, deadline, cancel)
+
+        profile = PROFILER.current()
+        is_vad = self.frame_classifier(sampling_rate)
+        if profile:
+            audio_frames = profile.timed_iter("read", audio_frames)
+            is_vad = profile.timed("is_vad", is_vad)
+
         audio_frames = iter(audio_frames)
         try:
             first = next(audio_frames)
         except StopIteration:
-            return [], -1, 0
+            return Queue(), -1, 0
+        except TimeoutError:
+            raise VadTimeout(timeout) from None
 
         frame_duration = 1000 * len(first) / sampling_rate
-        window_size = max(1, int(self._activity_window // frame_duration))
-        padding_size = int(self._padding // frame_duration)
-        gap_size = int(self._allow_gap // frame_duration)
+        window_size, padding_size, gap_size, max_size, offset_size = self.frame_counts(frame_duration)
+        hysteresis = self._offset_threshold is not None
+        threshold = self._activity_threshold
         padding_buffer = deque(maxlen=padding_size + window_size - 1)
+        if chunks:
+            chunks.start(frame_duration)
 
         voice_activity = Queue()
 
@@ -54,78 +211,173 @@ class FrameWiseVAD(VAD, abc.ABC):
         offset = -1
         gap = None
         va_length = 0
+        split = False
 
         logger.debug("Started VAD with window of %s and padding of %s frames (%s ms frame duration)",
                      window_size, padding_size, frame_duration)
 
-        for cnt, frame, activity in self._with_average_activity(chain((first,), audio_frames), sampling_rate, window_size):
-            storage_buffer.append(frame)
-            if offset < 0 and timeout > 0 and self._cnt_to_sec(cnt, frame_duration) > timeout:
-                raise VadTimeout(f"No VA detected within timeout ({timeout})")
-
-            # Debug
-            # if cnt % 100 == 0:
-            #     logger.debug("Processing frames (%s - %sms) : %s", cnt, cnt * frame_duration, to_decibel(storage_buffer[cnt-100:cnt]))
-
-            if activity and activity >= self._activity_threshold:
-                if voice_activity.qsize() == 0:
-                    padding = list(islice(padding_buffer, padding_size))
-                    offset = cnt - len(padding)
-                    logger.debug("Detected start of VA at %s, set offset to %s (padding: %s) frames", cnt, offset, len(padding))
-                    list(map(voice_activity.put, padding))
-                    padding_buffer = deque(maxlen=padding_size + window_size - 1)
-                if gap:
-                    logger.debug("Detected gap of %s in VA at %s", len(gap), cnt)
-                    list(map(voice_activity.put, gap))
-                gap = []
-                voice_activity.put(frame)
-                va_length += 1
-            elif gap and len(gap) * frame_duration > self._allow_gap:
-                if va_length * frame_duration >= self._min_duration:
-                    logger.debug("Detected end of VA at %s, start padding", cnt)
-                    break
-                else:
-                    logger.debug("Reset VA detection for short VA of %s", va_length)
-                    voice_activity = Queue()
-                    va_length = 0
-                    gap = None
-            elif gap is not None:
-                gap.append(frame)
-            else:
-                padding_buffer.append(frame)
-
-        if gap:
-            list(map(voice_activity.put, islice(gap, padding_size)))
+        if profile:
+            loop_start = time.perf_counter()
+            io_time = profile.total("read") + profile.total("is_vad")
 
+        if hysteresis:
+            frames = self._with_hysteresis_activity(chain((first,), audio_frames), sampling_rate,
+                                                    window_size, offset_size, is_vad)
+        else:
+            frames = self._with_average_activity(chain((first,), audio_frames), sampling_rate, window_size, is_vad)
         try:
-            for _ in range(max(0, padding_size - gap_size)):
-                voice_activity.put(next(iter(audio_frames)))
-                cnt += 1
-        except StopIteration:
-            logger.debug("Reached end of audio at %s", cnt)
-            pass
+            for cnt, frame, activity in frames:
+                if self._storage:
+                    storage_buffer.append(frame)
+                if (offset < 0 and timeout > 0 and self._timeout_clock == AUDIO_CLOCK
+                        and self._cnt_to_sec(cnt, frame_duration) > timeout):
+                    raise VadTimeout(timeout)
 
-        voice_activity.put(None)
+                # Debug
+                # if cnt % 100 == 0:
+                #     logger.debug("Processing frames (%s - %sms) : %s", cnt, cnt * frame_duration, to_decibel(storage_buffer[cnt-100:cnt]))
+
+                if hysteresis:
+                    # Continue ongoing voice activity with the offset window and threshold
+                    ongoing = gap is not None
+                    activity = activity[ongoing]
+                    threshold = self._offset_threshold if ongoing else self._activity_threshold
+
+                if activity and activity >= threshold:
+                    queued = voice_activity.qsize() + (chunks.emitted if chunks else 0)
+                    if queued == 0:
+                        padding = list(islice(padding_buffer, padding_size))
+                        offset = cnt - len(padding)
+                        logger.debug("Detected start of VA at %s, set offset to %s (padding: %s) frames", cnt, offset, len(padding))
+                        list(map(voice_activity.put, padding))
+                        padding_buffer = deque(maxlen=padding_size + window_size - 1)
+                        if deadline:
+                            deadline.clear()
+                    elif max_size and queued + len(gap) + 1 > max_size:
+                        logger.debug("Split VA at %s after %s frames", cnt - len(gap), queued)
+                        split = True
+                        break
+                    if gap:
+                        logger.debug("Detected gap of %s in VA at %s", len(gap), cnt)
+                        list(map(voice_activity.put, gap))
+                    gap = []
+                    voice_activity.put(frame)
+                    va_length += 1
+                    if chunks and va_length * frame_duration >= self._min_duration:
+                        chunks.emit(voice_activity, offset)
+                elif gap and len(gap) * frame_duration > self._allow_gap:
+                    if va_length * frame_duration >= self._min_duration:
+                        logger.debug("Detected end of VA at %s, start padding", cnt)
+                        break
+                    else:
+                        logger.debug("Reset VA detection for short VA of %s", va_length)
+                        voice_activity = Queue()
+                        va_length = 0
+                        gap = None
+                elif gap is not None:
+                    gap.append(frame)
+                else:
+                    padding_buffer.append(frame)
+        except TimeoutError:
+            raise VadTimeout(timeout) from None
+
+        if profile:
+            # Time spent in the state machine, excluding reading and classifying frames
+            io_time = profile.total("read") + profile.total("is_vad") - io_time
+            profile.add("detection", time.perf_counter() - loop_start - io_time, cnt + 1)
+
+        if split:
+            # Continue detection with the gap and the current frame
+            consumed = cnt - len(gap)
+        else:
+            if gap:
+                list(map(voice_activity.put, islice(gap, padding_size)))
 
-        logger.debug("Detected VA of length: %s", voice_activity.qsize() - 1)
+            try:
+                for _ in range(max(0, padding_size - gap_size)):
+                    voice_activity.put(next(iter(audio_frames)))
+                    cnt += 1
+            except StopIteration:
+                logger.debug("Reached end of audio at %s", cnt)
+                pass
+
+            consumed = cnt + 1
+
+        logger.debug("Detected VA of length: %s", voice_activity.qsize() + (chunks.emitted if chunks else 0))
         if self._storage:
+            from cltl.combot.infra.time_util import timestamp_now
             key = f"{int(timestamp_now())}-{offset}"
-            store_frames(storage_buffer, sampling_rate, save=f"{self._storage}/vad-{key}.wav")
+            with PROFILER.stage("storage"):
+                store_frames(storage_buffer, sampling_rate, save=f"{self._storage}/vad-{key}.wav")
+
+        if profile:
+            profile.add_audio(consumed * frame_duration / 1000)
+
+        return voice_activity, offset, consumed
+
+    def segments(self, frame_decisions: FrameDecisions) -> List[Tuple[int, int]]:
+        """
+        Segments of a recording replayed from precomputed frame decisions.
+
+        The result is the same as for consecutive calls to :meth:`detect_vad` on the
+        recording, continuing after the frames consumed by the previous call.
+
+        Returns
+        -------
+        List[Tuple[int, int]]
+            Offset and length in frames of the detected segments.
+        """
+        return replay_segments(frame_decisions.decisions, frame_decisions.frame_duration, self._segmentation)
+
+    def frame_counts(self, frame_duration: float) -> Tuple[int, int, int, int, int]:
+        """
+        Sizes in frames of the activity window, padding, allowed gap, maximum
+        duration (0 for no limit) and offset window for frames of frame_duration
+        milliseconds.
+
+        The sizes are computed once per frame duration.
+        """
+        counts = self._frame_counts.get(frame_duration)
+        if counts is None:
+            window_size, padding_size, gap_size = self._segmentation.frame_counts(frame_duration)
+            max_size = max(1, int(self._max_duration // frame_duration)) if self._max_duration > 0 else 0
+            offset_size = max(1, int(self._offset_window // frame_duration))
+            counts = window_size, padding_size, gap_size, max_size, offset_size
+            self._frame_counts[frame_duration] = counts
+
+        return counts
+
+    def frame_classifier(self, sampling_rate: int) -> Callable[[np.ndarray, int], bool]:
+        """
+        Frame decisions for a stream of frames, applying the pre-filter if configured.
+
+        The returned function keeps the filter state of the stream and must not
+        be shared between streams.
+        """
+        if sampling_rate not in self._prefilters:
+            self._prefilters[sampling_rate] = prefilter(sampling_rate, self._dc_block, self._highpass_cutoff)
+
+        iir_filter = self._prefilters[sampling_rate]
+        if iir_filter is None:
+            return self.is_vad
 
-        return as_iterable(voice_activity), offset, cnt + 1
+        stream = FilterStream(iir_filter)
+
+        return lambda audio_frame, rate: self.is_vad(stream.process(audio_frame), rate)
 
     def _cnt_to_sec(self, cnt, frame_duration):
         if frame_duration is None:
             return 0
 
-        return cnt * frame_duration // 1000
+        return cnt * frame_duration / 1000
 
     # From https://docs.python.org/3/library/collections.html#deque-recipes
-    def _with_average_activity(self, audio_frames, sampling_rate, size):
+    def _with_average_activity(self, audio_frames, sampling_rate, size, is_vad=None):
+        is_vad_frame = is_vad or self.is_vad
         it = enumerate(audio_frames)
         head = list(islice(it, size - 1))
 
-        window = deque(int(self.is_vad(f, sampling_rate)) for i, f in head)
+        window = deque(int(is_vad_frame(f, sampling_rate)) for i, f in head)
         window.appendleft(0)
         total = sum(window)
 
@@ -134,7 +386,60 @@ class FrameWiseVAD(VAD, abc.ABC):
             yield cnt, frame, total / float(size)
 
         for cnt, frame in it:
-            is_vad = int(self.is_vad(frame, sampling_rate))
+            is_vad = int(is_vad_frame(frame, sampling_rate))
             total += is_vad - window.popleft()
             window.append(is_vad)
-            yield cnt, frame, total / float(size)
\ No newline at end of file
+            yield cnt, frame, total / float(size)
+
+    def _with_hysteresis_activity(self, audio_frames, sampling_rate, onset_size, offset_size, is_vad):
+        """
+        Yield the average activity over the trailing onset and offset windows of each frame.
+
+        Frames before the start of the audio count as inactive.
+        """
+        # Running number of active frames over the last frames of the longer window
+        counts = deque([0], maxlen=max(onset_size, offset_size) + 1)
+        total = 0
+        for cnt, frame in enumerate(audio_frames):
+            total += int(is_vad(frame, sampling_rate))
+            counts.append(total)
+            onset_total = total - counts[max(-onset_size - 1, -len(counts))]
+            offset_total = total - counts[max(-offset_size - 1, -len(counts))]
+            yield cnt, frame, (onset_total / float(onset_size), offset_total / float(offset_size))
+
+
+class _Chunks:
+    """Emit the frames of ongoing voice activity in overlapping chunks"""
+    def __init__(self, on_chunk: Callable[[int, List[np.ndarray], bool], None], chunk_duration: int, overlap: int):
+        if chunk_duration <= 0:
+            raise ValueError(f"Chunk duration must be positive, was {chunk_duration}")
+
+        self._on_chunk = on_chunk
+        self._chunk_duration = chunk_duration
+        self._overlap_duration = overlap
+        self._chunk_size = None
+        self._overlap_size = None
+        self._overlap = []
+        self.emitted = 0
+
+    def start(self, frame_duration: float):
+        self._chunk_size = max(1, int(self._chunk_duration // frame_duration))
+        self._overlap_size = int(self._overlap_duration // frame_duration)
+
+    def emit(self, voice_activity: Queue, offset: int):
+        while voice_activity.qsize() >= self._chunk_size:
+            chunk = [voice_activity.get_nowait() for _ in range(self._chunk_size)]
+            self._publish(chunk, offset, False)
+
+    def close(self, voice_activity: Queue, offset: int) -> int:
+        remaining = [voice_activity.get_nowait() for _ in range(voice_activity.qsize())]
+        if remaining:
+            self._publish(remaining, offset, True)
+
+        return self.emitted
+
+    def _publish(self, frames: List[np.ndarray], offset: int, final: bool):
+        chunk = self._overlap + frames
+        self._on_chunk(offset + self.emitted - len(self._overlap), chunk, final)
+        self.emitted += len(frames)
+        self._overlap = chunk[-self._overlap_size:] if self._overlap_size else []
@@ -0,0 +1,246 @@
+"""
+Audio frames read into recycled blocks of preallocated memory.
+
+Frames are NumPy views on a :class:`FrameBlock` that holds multiple frames, they
+can be passed to any VAD as regular arrays. Blocks are obtained from a
+:class:`BlockPool` and returned to it when the frames read into them are no longer
+used, see :class:`FrameReader`.
+"""
+import logging
+import sys
+import threading
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import BinaryIO, Iterator, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Two bytes per sample for 16bit audio
+SAMPLE_DEPTH = 2
+
+CONTENT_TYPE_SEPARATOR = ';'
+AUDIO_MIME_TYPE = 'audio/L16'
+
+
+def audio_content_type(rate: int, channels: int, frame_size: int) -> str:
+    return f"{AUDIO_MIME_TYPE}; rate={rate}; channels={channels}; frame_size={frame_size}"
+
+
+def parse_content_type(content_type: str) -> SimpleNamespace:
+    """
+    Parse the parameters of an audio/L16 content type.
+
+    Parameters
+    ----------
+    content_type : str
+        Content type of the form 'audio/L16; rate=16000; channels=1; frame_size=480'.
+
+    Returns
+    -------
+    SimpleNamespace
+        The rate, channels and frame_size of the audio.
+
+    Raises
+    ------
+    ValueError
+        If the content type is not supported.
+    """
+    parts = content_type.split(CONTENT_TYPE_SEPARATOR)
+    if not parts[0].strip() == AUDIO_MIME_TYPE or len(parts) != 4:
+        # Only support 16bit audio for now
+        raise ValueError(f"Unsupported content type {parts[0]}, "
+                         "expected audio/L16 with rate, channels and frame_size paramters")
+
+    parameters = SimpleNamespace(**{p.split('=')[0].strip(): int(p.split('=')[1].strip()) for p in parts[1:]})
+    if not all(hasattr(parameters, p) for p in ('rate', 'channels', 'frame_size')):
+        raise ValueError(f"Missing parameters in content type {content_type}, "
+                         "expected rate, channels and frame_size")
+
+    return parameters
+
+
+class FrameBlock:
+    __slots__ = ('data', 'buffer', 'offset', 'count', '_pool', '_references')
+
+    def __init__(self, block_frames: int, frame_size: int, channels: int, pool=None):
+        """
+        Preallocated memory for block_frames frames of 16 bit audio.
+
+        Attributes
+        ----------
+        data : np.ndarray
+            The samples of shape (block_frames, frame_size, channels).
+        buffer : memoryview
+            The raw bytes of the block to read frames into, views on it are not
+            tracked by :attr:`in_use`.
+        offset : int
+            Offset in samples of the first frame in the signal.
+        count : int
+            Number of frames in the block that contain audio.
+        """
+        self.data = np.empty((block_frames, frame_size, channels), dtype=np.int16)
+        self.buffer = memoryview(self.data).cast('B')
+        self.offset = 0
+        self.count = 0
+        self._pool = pool
+        # References to the data held by the block itself, frames hold additional references
+        self._references = sys.getrefcount(self.data)
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self.data[:self.count]
+
+    @property
+    def in_use(self) -> bool:
+        """
+        Whether views on the frames of the block are still referenced.
+
+        Ownership is tracked by the references to :attr:`data`. Frames and arrays or
+        memoryviews derived from them, e.g. ``np.frombuffer(frame.data)``, reference
+        it through their base. Views on :attr:`buffer` do not, they must not be
+        retained beyond reading into the block.
+        """
+        return sys.getrefcount(self.data) > self._references
+
+    def release(self):
+        """Return the block to its pool, its frames must not be used afterwards"""
+        if self._pool:
+            self._pool.release(self)
+
+
+class BlockPool:
+    def __init__(self, block_frames: int = 32, max_free: int = 64):
+        """
+        Pool of frame blocks, shared by the readers of multiple streams.
+
+        Parameters
+        ----------
+        block_frames : int
+            Number of frames per block.
+        max_free : int
+            Maximum number of released blocks kept for reuse per frame format,
+            blocks released beyond this are dropped.
+        """
+        self._block_frames = block_frames
+        self._max_free = max_free
+        self._free = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(self, frame_size: int, channels: int) -> FrameBlock:
+        with self._lock:
+            free = self._free[(frame_size, channels)]
+            block = free.pop() if free else None
+
+        if block is None:
+            block = FrameBlock(self._block_frames, frame_size, channels, self)
+        block.offset = 0
+        block.count = 0
+
+        return block
+
+    def release(self, block: FrameBlock):
+        _, frame_size, channels = block.data.shape
+        with self._lock:
+            free = self._free[(frame_size, channels)]
+            if len(free) < self._max_free:
+                free.append(block)
+
+    def free_blocks(self) -> int:
+        with self._lock:
+            return sum(len(free) for free in self._free.values())
+
+
+class FrameReader:
+    __slots__ = ('_stream', '_frame_size', '_channels', '_pool', '_offset', '_blocks')
+
+    def __init__(self, stream: BinaryIO, frame_size: int, channels: int, pool: BlockPool = None, offset: int = 0):
+        """
+        Read 16bit audio frames from a binary stream into frame blocks.
+
+        Frames are read directly into the blocks, chunks that arrive short are
+        reassembled into complete frames. Each frame is yielded as soon as it is
+        complete. While reading, blocks of which no frame is referenced anymore,
+        e.g. frames of silence the VAD dropped, are returned to the pool, such that
+        the memory of a long stream is bounded by the frames the consumer retains.
+        A frame is retained as long as it or an array derived from it is referenced,
+        see :attr:`FrameBlock.in_use`.
+        The remaining blocks are returned to the pool when the reader is closed,
+        frames must not be used afterwards. Without pool, new blocks are allocated
+        and not reused.
+
+        Parameters
+        ----------
+        stream : BinaryIO
+            Stream providing raw audio data, must support `readinto`.
+        frame_size : int
+            Number of samples per frame.
+        channels : int
+            Number of channels.
+        pool : BlockPool
+            Pool that provides the blocks.
+        offset : int
+            Offset in samples of the first frame in the signal.
+        """
+        self._stream = stream
+        self._frame_size = frame_size
+        self._channels = channels
+        self._pool = pool if pool is not None else BlockPool(max_free=0)
+        self._offset = offset
+        self._blocks: List[FrameBlock] = []
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        bytes_per_frame = self._frame_size * self._channels * SAMPLE_DEPTH
+
+        block = None
+        while True:
+            if block is None or block.count == len(block.data):
+                self._release_unused()
+                block = self._pool.acquire(self._frame_size, self._channels)
+                block.offset = self._offset
+                self._blocks.append(block)
+
+            start = block.count * bytes_per_frame
+            end = start + bytes_per_frame
+            filled = start
+            while filled < end:
+                read = self._stream.readinto(block.buffer[filled:end])
+                if not read:
+                    if filled > start:
+                        logger.debug("Dropped incomplete frame of %s bytes at end of stream", filled - start)
+                    if not block.count:
+                        self._blocks.remove(block)
+                        block.release()
+                    return
+                filled += read
+
+            block.count += 1
+            self._offset += self._frame_size
+            yield block.data[block.count - 1]
+
+    @property
+    def blocks(self) -> List[FrameBlock]:
+        """The blocks read by this reader"""
+        return list(self._blocks)
+
+    def _release_unused(self):
+        blocks = []
+        for block in self._blocks:
+            if block.in_use:
+                blocks.append(block)
+            else:
+                block.release()
+        self._blocks = blocks
+
+    def close(self):
+        for block in self._blocks:
+            block.release()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
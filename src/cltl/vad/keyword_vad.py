@@ -0,0 +1,153 @@
+import abc
+import logging
+from collections import deque
+from typing import Iterable
+
+import numpy as np
+
+from cltl.vad.api import VAD
+from cltl.vad.controller_vad import ControllerVAD
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordSpotter(abc.ABC):
+    """
+    Detects a keyword in a stream of audio frames within the process.
+    """
+    @abc.abstractmethod
+    def is_keyword(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        """
+        Process the next audio frame of the stream.
+
+        Returns
+        -------
+        bool
+            True if a keyword ends with the given frame.
+        """
+        raise NotImplementedError("")
+
+    def reset(self):
+        """
+        Reset the state of the spotter after a keyword was detected.
+        """
+        pass
+
+
+class TemplateKeywordSpotter(KeywordSpotter):
+    def __init__(self, template: Iterable[np.ndarray], threshold: float = 0.8):
+        """
+        Keyword spotter that matches the energy envelope of the most recent frames
+        against the envelope of a recorded keyword.
+
+        Parameters
+        ----------
+        template : Iterable[np.ndarray]
+            Audio frames of a recording of the keyword, in the frame format of the stream.
+        threshold : float
+            Minimum correlation between the envelopes to detect the keyword.
+        """
+        self._template = self._normalize(np.array([self._log_energy(frame) for frame in template]))
+        self._window = deque(maxlen=len(self._template))
+        self._threshold = threshold
+
+    def is_keyword(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        self._window.append(self._log_energy(audio_frame))
+        if len(self._window) < self._window.maxlen:
+            return False
+
+        envelope = self._normalize(np.fromiter(self._window, dtype=float, count=len(self._window)))
+
+        return float(envelope @ self._template) >= self._threshold
+
+    def reset(self):
+        self._window.clear()
+
+    @staticmethod
+    def _log_energy(audio_frame: np.ndarray) -> float:
+        samples = audio_frame.astype(float)
+
+        return float(np.log10(1.0 + np.mean(samples * samples)))
+
+    @staticmethod
+    def _normalize(envelope: np.ndarray) -> np.ndarray:
+        centered = envelope - envelope.mean()
+        norm = np.linalg.norm(centered)
+
+        return centered / norm if norm > 0 else centered
+
+
+class KeywordVAD(ControllerVAD):
+    def __init__(self, vad: VAD, spotter: KeywordSpotter, padding_size: int, min_duration: int = 0,
+                 pre_roll: int = 0, silence: int = 1000):
+        """
+        Controlled voice activity detection that is activated by a keyword spotted
+        on the audio stream itself.
+
+        Activation by the keyword happens in-process on the frame that completes the
+        keyword, external activation through :attr:`active` remains possible.
+        The controller is deactivated after silence detected by the wrapped VAD.
+
+        Parameters
+        ----------
+        vad : VAD
+            The VAD used to detect the start and end of voice activity while active.
+        spotter : KeywordSpotter
+            The keyword spotter that activates the VAD.
+        padding_size : int
+            Duration in milliseconds of audio added before the start and after the
+            end of voice activity.
+        min_duration : int
+            Minimum duration of voice activity in milliseconds.
+        pre_roll : int
+            Duration of audio in milliseconds received before activation that is
+            included when detecting the start of voice activity. To include the
+            keyword in the detected voice activity, it should cover the keyword.
+        silence : int
+            Duration of silence in milliseconds after which the VAD is deactivated.
+        """
+        super().__init__(vad, padding_size, min_duration, pre_roll)
+        self._spotter = spotter
+        self._silence = silence
+        # Decision of the wrapped VAD for the last frame passed by the gate
+        self._decided = (None, False)
+
+    def detect_vad(self, audio_frames: Iterable[np.ndarray], sampling_rate: int, blocking: bool = True,
+                   timeout: int = 0) -> [Iterable[np.ndarray], int, int]:
+        return super().detect_vad(self._gate(audio_frames, sampling_rate), sampling_rate, blocking, timeout)
+
+    def _is_speech(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        # Reuse the decision of the gate, such that each frame is classified once
+        frame, decision = self._decided
+        if frame is audio_frame:
+            return decision
+
+        return super()._is_speech(audio_frame, sampling_rate)
+
+    def _gate(self, audio_frames: Iterable[np.ndarray], sampling_rate: int) -> Iterable[np.ndarray]:
+        is_keyword = self._spotter.is_keyword
+        is_vad = self._vad.is_vad
+
+        silence_size = None
+        silent = 0
+        for frame in audio_frames:
+            if silence_size is None:
+                silence_size = max(1, int(self._silence // (1000 * len(frame) / sampling_rate)))
+
+            if not self._is_active:
+                if is_keyword(frame, sampling_rate):
+                    logger.debug("Detected keyword")
+                    self._spotter.reset()
+                    silent = 0
+                    self.active = True
+            elif is_vad(frame, sampling_rate):
+                self._decided = (frame, True)
+                silent = 0
+            else:
+                self._decided = (frame, False)
+                silent += 1
+                if silent >= silence_size:
+                    self.active = False
+
+            yield frame
+        self._decided = (None, False)
@@ -0,0 +1,126 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LookbackBuffer:
+    def __init__(self, capacity: int, rate: int = None):
+        """
+        Ring buffer of the most recent audio of a signal, addressed by sample offset.
+
+        Memory is allocated once, on the first write, for `capacity` samples.
+        Audio is written at its offset in the signal, overlapping audio that was
+        already written is skipped and a discontinuity drops the retained audio.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of retained samples.
+        rate : int
+            Sampling rate of the audio.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, was {capacity}")
+
+        self.rate = rate
+        self._capacity = capacity
+        self._data = None
+        self._start = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    @property
+    def range(self) -> Tuple[int, int]:
+        """Start (inclusive) and end (exclusive) offset in samples of the retained audio"""
+        with self._lock:
+            return self._start, self._end
+
+    @property
+    def channels(self) -> Optional[int]:
+        if self._data is None:
+            return None
+
+        return 1 if self._data.ndim == 1 else self._data.shape[1]
+
+    def write(self, offset: int, samples: np.ndarray):
+        """
+        Write samples starting at offset in the signal.
+        """
+        with self._lock:
+            if self._data is None:
+                self._data = np.empty((self._capacity,) + samples.shape[1:], dtype=samples.dtype)
+            if offset > self._end or offset < self._start:
+                logger.debug("Discontinuity at %s in look-back buffer (%s - %s)", offset, self._start, self._end)
+                self._start = self._end = offset
+
+            samples = samples[self._end - offset:]
+            if len(samples) > self._capacity:
+                self._end += len(samples) - self._capacity
+                samples = samples[-self._capacity:]
+
+            position = self._end % self._capacity
+            head = min(len(samples), self._capacity - position)
+            self._data[position:position + head] = samples[:head]
+            self._data[:len(samples) - head] = samples[head:]
+
+            self._end += len(samples)
+            self._start = max(self._start, self._end - self._capacity)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """
+        Copy of the samples in the range [start, end) of the signal.
+
+        Raises
+        ------
+        ValueError
+            If the range is not retained in the buffer.
+        """
+        with self._lock:
+            if not self._start <= start <= end <= self._end:
+                raise ValueError(f"Range ({start}, {end}) is not within the retained audio "
+                                 f"({self._start}, {self._end})")
+            if self._data is None:
+                return np.empty((0,))
+
+            positions = np.arange(start, end) % self._capacity
+
+            return self._data[positions]
+
+
+class LookbackBuffers:
+    def __init__(self, duration: float, max_signals: int = 4):
+        """
+        Look-back buffers of the most recent signals.
+
+        Parameters
+        ----------
+        duration : float
+            Duration in seconds of the audio retained per signal.
+        max_signals : int
+            Maximum number of signals with retained audio, the least recently
+            created are dropped first.
+        """
+        self._duration = duration
+        self._max_signals = max_signals
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def buffer(self, signal_id: str, rate: int) -> LookbackBuffer:
+        """Look-back buffer of the signal, created if it does not exist"""
+        with self._lock:
+            if signal_id not in self._buffers:
+                self._buffers[signal_id] = LookbackBuffer(int(self._duration * rate), rate)
+                while len(self._buffers) > self._max_signals:
+                    dropped, _ = self._buffers.popitem(last=False)
+                    logger.debug("Dropped look-back buffer of signal %s", dropped)
+
+            return self._buffers[signal_id]
+
+    def get(self, signal_id: str) -> Optional[LookbackBuffer]:
+        with self._lock:
+            return self._buffers.get(signal_id)
@@ -0,0 +1,182 @@
+"""
+Pre-filtering of audio frames before voice activity detection.
+
+DC offset and low frequency hum of microphones bias frame decisions. The filters
+in this module remove them from the frames passed to
+:meth:`~cltl.vad.api.VAD.is_vad`, the detected audio itself is not filtered.
+
+Filters are applied per frame as a block: for a linear filter in state space form
+the output of a frame is a linear function of its samples and the filter state
+before the frame. The matrices of this function are precomputed per frame length,
+such that filtering a frame reduces to matrix products on preallocated buffers.
+"""
+import logging
+import math
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+DC_POLE = 0.995
+"""Pole of the DC blocking filter, closer to 1 narrows the removed band around 0 Hz"""
+
+
+class IIRFilter:
+    def __init__(self, b: np.ndarray, a: np.ndarray):
+        """
+        Linear IIR filter with transfer function coefficients b and a.
+
+        The filter is immutable and can be shared between threads, the filter
+        state of a stream of frames is kept by :class:`FilterStream`.
+        """
+        b = np.asarray(b, dtype=np.float64) / a[0]
+        a = np.asarray(a, dtype=np.float64) / a[0]
+        order = max(len(a), len(b)) - 1
+        b = np.pad(b, (0, order + 1 - len(b)))
+        a = np.pad(a, (0, order + 1 - len(a)))
+
+        # Transposed direct form II as state space system
+        self._A = np.eye(order, k=1)
+        self._A[:, 0] = -a[1:]
+        self._B = b[1:] - a[1:] * b[0]
+        self._C = np.eye(1, order).ravel()
+        self._D = b[0]
+        self._order = order
+        self._blocks = dict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cascade(cls, *filters: Tuple[np.ndarray, np.ndarray]):
+        """Filter equivalent to applying the filters given by (b, a) coefficients in sequence"""
+        b, a = np.ones(1), np.ones(1)
+        for filter_b, filter_a in filters:
+            b, a = np.convolve(b, filter_b), np.convolve(a, filter_a)
+
+        return cls(b, a)
+
+    @property
+    def order(self) -> int:
+        return self._order
+
+    def steady_state(self, value: float) -> np.ndarray:
+        """Filter state after a constant input of value"""
+        return np.linalg.solve(np.eye(self._order) - self._A, self._B * value)
+
+    def block(self, length: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Matrices to filter a block of length samples.
+
+        For input X of shape (length, channels) and state Z of shape (order, channels)
+        the output is ``T @ X + O @ Z`` and the state after the block ``P @ Z + Q @ X``.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            The matrices T, O, P and Q.
+        """
+        with self._lock:
+            if length not in self._blocks:
+                self._blocks[length] = self._compute_block(length)
+
+            return self._blocks[length]
+
+    def _compute_block(self, length):
+        powers = [np.eye(self._order)]
+        for _ in range(length):
+            powers.append(self._A @ powers[-1])
+
+        impulse_response = np.array([self._D] + [self._C @ powers[k] @ self._B for k in range(length - 1)])
+        indices = np.arange(length)
+        lags = indices[:, np.newaxis] - indices
+        transfer = np.where(lags >= 0, impulse_response[np.clip(lags, 0, None)], 0.0)
+        observation = np.array([self._C @ powers[k] for k in range(length)])
+        control = np.stack([powers[length - 1 - k] @ self._B for k in range(length)], axis=1)
+
+        return transfer, observation, powers[length], control
+
+
+class FilterStream:
+    def __init__(self, iir_filter: IIRFilter):
+        """
+        Filter a stream of audio frames of equal length, carrying the filter state across frames.
+
+        The filter state is initialized to the steady state for the first sample
+        of the stream, such that a constant DC offset causes no transient.
+        Buffers are allocated on the first frame and reused for later frames.
+        """
+        self._filter = iir_filter
+        self._state = None
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Filter a frame of int16 samples with one or more channels.
+
+        Returns
+        -------
+        np.ndarray
+            The filtered frame, the array is reused for the next frame.
+        """
+        samples = frame.reshape(len(frame), -1)
+        if self._state is None or self._input.shape != samples.shape:
+            self._allocate(samples)
+
+        np.copyto(self._input, samples)
+        transfer, observation, propagation, control = self._filter.block(len(samples))
+
+        np.matmul(transfer, self._input, out=self._output)
+        np.matmul(observation, self._state, out=self._response)
+        self._output += self._response
+
+        np.matmul(propagation, self._state, out=self._next_state)
+        np.matmul(control, self._input, out=self._state)
+        self._state += self._next_state
+
+        np.clip(self._output, np.iinfo(np.int16).min, np.iinfo(np.int16).max, out=self._output)
+        np.copyto(self._filtered, self._output, casting='unsafe')
+
+        return self._filtered.reshape(frame.shape)
+
+    def _allocate(self, samples):
+        length, channels = samples.shape
+        if self._state is None:
+            self._state = np.stack([self._filter.steady_state(value) for value in samples[0]], axis=1)
+        self._input = np.empty((length, channels), dtype=np.float64)
+        self._output = np.empty((length, channels), dtype=np.float64)
+        self._response = np.empty((length, channels), dtype=np.float64)
+        self._next_state = np.empty_like(self._state)
+        self._filtered = np.empty((length, channels), dtype=np.int16)
+
+
+def dc_blocker(pole: float = DC_POLE) -> Tuple[np.ndarray, np.ndarray]:
+    """Coefficients (b, a) of a first order DC blocking filter"""
+    return np.array([1.0, -1.0]), np.array([1.0, -pole])
+
+
+def highpass(cutoff: float, sampling_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Coefficients (b, a) of a second order Butterworth high-pass filter with cutoff in Hz"""
+    w0 = 2 * math.pi * cutoff / sampling_rate
+    alpha = math.sin(w0) / math.sqrt(2)
+    cos_w0 = math.cos(w0)
+
+    b = np.array([(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2])
+    a = np.array([1 + alpha, -2 * cos_w0, 1 - alpha])
+
+    return b, a
+
+
+def prefilter(sampling_rate: int, dc_block: bool = False, highpass_cutoff: float = 0) -> Optional[IIRFilter]:
+    """
+    Filter with DC blocking and a high-pass, None if neither is enabled.
+    """
+    filters = []
+    if dc_block:
+        filters.append(dc_blocker())
+    if highpass_cutoff > 0:
+        if highpass_cutoff >= sampling_rate / 2:
+            raise ValueError(f"High-pass cutoff {highpass_cutoff} Hz exceeds the Nyquist frequency")
+        filters.append(highpass(highpass_cutoff, sampling_rate))
+
+    return IIRFilter.cascade(*filters) if filters else None
@@ -0,0 +1,201 @@
+"""
+Opt-in profiling of voice activity detection.
+
+Profiling is disabled by default. When enabled, the detection loop and the
+services record the time spent per stage for the audio signal processed by
+the current thread, see :meth:`Profiler.start`. Profiling can also be limited
+to a set of signals, see :meth:`Profiler.scope`. Profiles of the most recent
+signals are retained and can be retrieved by signal id.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterable, Any, Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+
+IO_STAGES = {"read"}
+"""Stages that wait for input and do not count as processing time"""
+
+
+class SignalProfile:
+    def __init__(self, signal_id: str):
+        """
+        Cumulative time and call counts per stage of the processing of an audio signal.
+        """
+        self.signal_id = signal_id
+        self._stages = dict()
+        self._audio = 0.0
+        self._started = time.monotonic()
+        self._ended = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, duration: float, count: int = 1):
+        with self._lock:
+            total, calls = self._stages.get(stage, (0.0, 0))
+            self._stages[stage] = (total + duration, calls + count)
+
+    def add_audio(self, duration: float):
+        """Add the duration in seconds of processed audio"""
+        with self._lock:
+            self._audio += duration
+
+    def total(self, stage: str) -> float:
+        return self._stages.get(stage, (0.0, 0))[0]
+
+    def timed(self, stage: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap func to record the time of its calls"""
+        def timed_func(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed_func
+
+    def timed_iter(self, stage: str, iterable: Iterable[Any]) -> Iterable[Any]:
+        """Wrap iterable to record the time waiting for its elements"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def end(self):
+        self._ended = time.monotonic()
+
+    @property
+    def processing_time(self) -> float:
+        """Time in seconds spent in stages other than waiting for input"""
+        with self._lock:
+            return sum(total for stage, (total, _) in self._stages.items() if stage not in IO_STAGES)
+
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        """Processing time relative to the duration of the processed audio, below 1 is faster than real time"""
+        return self.processing_time / self._audio if self._audio else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {stage: {"time": total, "count": calls} for stage, (total, calls) in self._stages.items()}
+            audio = self._audio
+
+        ended = self._ended if self._ended is not None else time.monotonic()
+
+        return {
+            "signal_id": self.signal_id,
+            "stages": stages,
+            "audio": audio,
+            "elapsed": ended - self._started,
+            "completed": self._ended is not None,
+            "real_time_factor": self.real_time_factor,
+        }
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, capacity: int = 100):
+        """
+        Registry of the profiles of processed audio signals.
+
+        Parameters
+        ----------
+        enabled : bool
+            Record profiles of signals started after profiling is enabled.
+        capacity : int
+            Maximum number of retained profiles, the oldest are dropped first.
+        """
+        self._enabled = enabled
+        self._capacity = capacity
+        self._scopes = []
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool):
+        self._enabled = enabled
+        logger.info("Profiling %s", "enabled" if enabled else "disabled")
+
+    @contextmanager
+    def scope(self, signal_ids: Iterable[str]):
+        """
+        Record profiles of the given signals within the context, also if profiling is not enabled.
+        """
+        scope = frozenset(signal_ids)
+        with self._lock:
+            self._scopes.append(scope)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._scopes.remove(scope)
+
+    def _profiled(self, signal_id: str) -> bool:
+        return self._enabled or any(signal_id in scope for scope in self._scopes)
+
+    def start(self, signal_id: str) -> Optional[SignalProfile]:
+        """
+        Start the profile of a signal processed by the current thread, if profiling is enabled
+        or the signal is in a :meth:`scope`.
+        """
+        if not self._profiled(signal_id):
+            self._local.profile = None
+            return None
+
+        profile = SignalProfile(signal_id)
+        with self._lock:
+            self._profiles[signal_id] = profile
+            self._profiles.move_to_end(signal_id)
+            while len(self._profiles) > self._capacity:
+                self._profiles.popitem(last=False)
+        self._local.profile = profile
+
+        return profile
+
+    def end(self):
+        """End the profile of the current thread"""
+        profile = getattr(self._local, "profile", None)
+        if profile:
+            profile.end()
+        self._local.profile = None
+
+    def current(self) -> Optional[SignalProfile]:
+        """Profile of the current thread, None if profiling is disabled"""
+        profile = getattr(self._local, "profile", None)
+
+        return profile if profile is not None and self._profiled(profile.signal_id) else None
+
+    def get(self, signal_id: str) -> Optional[SignalProfile]:
+        with self._lock:
+            return self._profiles.get(signal_id)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record the time of a stage for the current profile"""
+        profile = self.current()
+        if profile is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.add(name, time.perf_counter() - start)
+
+
+PROFILER = Profiler()
+"""Profiler used by the VAD implementations and services"""
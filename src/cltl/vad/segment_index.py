@@ -0,0 +1,166 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, List, Dict, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentIndex:
+    def __init__(self, max_segments: int = 0, rate: Optional[int] = None, capacity: int = 64):
+        """
+        Append-only index of the voice activity segments of a signal.
+
+        Segments are stored in array columns of start, end and score and must be
+        appended in order. Range queries use binary search on the columns.
+
+        Parameters
+        ----------
+        max_segments : int
+            Maximum number of retained segments, the oldest are dropped first.
+            No limit if 0.
+        rate : int
+            Sampling rate of the signal, required for queries in seconds.
+        capacity : int
+            Initial capacity of the columns.
+        """
+        self._max_segments = max_segments
+        self.rate = rate
+        self._starts = np.empty(capacity, dtype=np.int64)
+        self._ends = np.empty(capacity, dtype=np.int64)
+        self._scores = np.empty(capacity, dtype=np.float32)
+        self._first = 0
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._last - self._first
+
+    def append(self, start: int, end: int, score: float = 1.0):
+        """
+        Append a segment with start and end offset in samples.
+
+        Raises
+        ------
+        ValueError
+            If the segment starts or ends before the last segment in the index.
+        """
+        with self._lock:
+            if self._last > self._first and (start < self._starts[self._last - 1] or end < self._ends[self._last - 1]):
+                raise ValueError(f"Segment ({start}, {end}) precedes the last segment "
+                                 f"({self._starts[self._last - 1]}, {self._ends[self._last - 1]})")
+            if self._last == len(self._starts):
+                self._reserve()
+
+            self._starts[self._last] = start
+            self._ends[self._last] = end
+            self._scores[self._last] = score
+            self._last += 1
+
+            if self._max_segments and self._last - self._first > self._max_segments:
+                self._first = self._last - self._max_segments
+
+    def query(self, start: int = 0, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Segments that overlap the range [start, end) in samples.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, np.ndarray]
+            Starts, ends and scores of the segments.
+        """
+        with self._lock:
+            starts = self._starts[self._first:self._last]
+            ends = self._ends[self._first:self._last]
+            first = np.searchsorted(ends, start, side='right')
+            last = np.searchsorted(starts, end, side='left') if end is not None else len(starts)
+            selected = slice(self._first + first, self._first + max(first, last))
+
+            return self._starts[selected].copy(), self._ends[selected].copy(), self._scores[selected].copy()
+
+    def latest(self, duration: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Segments within the last duration in seconds before the end of the last segment.
+
+        Raises
+        ------
+        ValueError
+            If the sampling rate of the signal is not known.
+        """
+        if not self.rate:
+            raise ValueError("Sampling rate of the signal is unknown")
+
+        with self._lock:
+            end = int(self._ends[self._last - 1]) if self._last > self._first else 0
+
+        return self.query(end - int(duration * self.rate), None)
+
+    def _reserve(self):
+        size = self._last - self._first
+        capacity = len(self._starts)
+        if size > capacity // 2:
+            capacity *= 2
+
+        for name in ('_starts', '_ends', '_scores'):
+            column = getattr(self, name)
+            resized = np.empty(capacity, dtype=column.dtype)
+            resized[:size] = column[self._first:self._last]
+            setattr(self, name, resized)
+
+        self._first, self._last = 0, size
+
+
+class SegmentIndexes:
+    def __init__(self, max_signals: int = 16, max_segments: int = 0):
+        """
+        Segment indexes of the most recent signals.
+
+        Parameters
+        ----------
+        max_signals : int
+            Maximum number of signals retained, the least recently updated are dropped first.
+        max_segments : int
+            Maximum number of segments retained per signal, see :class:`SegmentIndex`.
+        """
+        self._max_signals = max_signals
+        self._max_segments = max_segments
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, signal_id: str, segments: List[Tuple[int, int]], scores: List[float] = None,
+            rate: Optional[int] = None):
+        """
+        Append segments with start and end offsets in samples to the index of a signal.
+        """
+        with self._lock:
+            index = self._indexes.get(signal_id)
+            if index is None:
+                index = SegmentIndex(self._max_segments)
+                self._indexes[signal_id] = index
+            self._indexes.move_to_end(signal_id)
+            while len(self._indexes) > self._max_signals:
+                dropped, _ = self._indexes.popitem(last=False)
+                logger.debug("Dropped segment index of signal %s", dropped)
+
+        if rate:
+            index.rate = rate
+        for (start, end), score in zip(segments, scores if scores is not None else [1.0] * len(segments)):
+            index.append(start, end, score)
+
+    def get(self, signal_id: str) -> Optional[SegmentIndex]:
+        with self._lock:
+            return self._indexes.get(signal_id)
+
+    def discard(self, signal_id: str):
+        """
+        Remove the index of a signal, e.g. before the signal is processed again.
+        """
+        with self._lock:
+            self._indexes.pop(signal_id, None)
+
+    def signals(self) -> Dict[str, Any]:
+        """Number of retained segments per signal"""
+        with self._lock:
+            return {signal_id: len(index) for signal_id, index in self._indexes.items()}
@@ -0,0 +1,363 @@
+"""
+Replay of the segmentation of :class:`~cltl.vad.frame_vad.FrameWiseVAD` on precomputed frame decisions.
+
+The replay yields the same segments as repeatedly calling
+:meth:`~cltl.vad.frame_vad.FrameWiseVAD.detect_vad` on a recording, continuing after
+the frames consumed by the previous call, without running the VAD on the audio.
+"""
+from typing import List, Tuple, Iterable, Dict, Any
+
+import numpy as np
+
+from cltl.vad.decisions import FrameDecisions
+
+Segment = Tuple[int, int]
+"""Offset and length of a segment in frames"""
+
+
+class SegmentationParameters:
+    __slots__ = ('activity_window', 'activity_threshold', 'allow_gap', 'padding', 'min_duration', 'max_duration',
+                 'offset_threshold', 'offset_window')
+
+    def __init__(self, activity_window: int = 1, activity_threshold: float = 1,
+                 allow_gap: int = 0, padding: int = 2, min_duration: int = 0, max_duration: int = 0,
+                 offset_threshold: float = None, offset_window: int = None):
+        """
+        Parameters of :class:`~cltl.vad.frame_vad.FrameWiseVAD` that determine the
+        segmentation of frame decisions, in milliseconds.
+        """
+        self.activity_window = activity_window
+        self.activity_threshold = activity_threshold
+        self.allow_gap = allow_gap
+        self.padding = padding
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.offset_threshold = offset_threshold
+        self.offset_window = offset_window if offset_window is not None else activity_window
+
+    def frame_counts(self, frame_duration: float) -> Tuple[int, int, int]:
+        """
+        Window, padding and gap size in frames as used by FrameWiseVAD.
+        """
+        window_size = max(1, int(self.activity_window // frame_duration))
+        padding_size = int(self.padding // frame_duration)
+        gap_size = int(self.allow_gap // frame_duration)
+
+        return window_size, padding_size, gap_size
+
+
+def replay_segments(decisions: np.ndarray, frame_duration: float,
+                    parameters: SegmentationParameters) -> List[Segment]:
+    """
+    Segments of a recording as detected by consecutive calls to FrameWiseVAD.detect_vad.
+
+    Parameters
+    ----------
+    decisions : np.ndarray
+        Per-frame decisions of the VAD.
+    frame_duration : float
+        Duration of a frame in milliseconds.
+    parameters : SegmentationParameters
+        The segmentation parameters.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        Offset and length in frames of the detected segments.
+    """
+    cumsum = _cumsum(np.asarray(decisions) > 0)
+    if parameters.offset_threshold is not None:
+        return _replay_hysteresis(cumsum, frame_duration, parameters)
+
+    window_size, _, _ = parameters.frame_counts(frame_duration)
+    activity = _Activity(cumsum, window_size, parameters.activity_threshold)
+
+    return _replay(activity, frame_duration, parameters)
+
+
+def sweep(frame_decisions: FrameDecisions,
+          grid: Iterable[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], List[Segment]]]:
+    """
+    Replay the segmentation of the same frame decisions for multiple parameter settings.
+
+    The window activity is shared between settings with the same window and threshold.
+
+    Parameters
+    ----------
+    frame_decisions : FrameDecisions
+        The per-frame decisions of a recording.
+    grid : Iterable[Dict[str, Any]]
+        Keyword arguments of :class:`SegmentationParameters` for each setting.
+
+    Returns
+    -------
+    List[Tuple[Dict[str, Any], List[Tuple[int, int]]]]
+        The segments for each setting.
+    """
+    frame_duration = frame_decisions.frame_duration
+    cumsum = _cumsum(np.asarray(frame_decisions.decisions) > 0)
+
+    activities = dict()
+    results = []
+    for setting in grid:
+        parameters = SegmentationParameters(**setting)
+        if parameters.offset_threshold is not None:
+            results.append((setting, _replay_hysteresis(cumsum, frame_duration, parameters)))
+            continue
+
+        window_size, _, _ = parameters.frame_counts(frame_duration)
+        key = (window_size, parameters.activity_threshold)
+        if key not in activities:
+            activities[key] = _Activity(cumsum, window_size, parameters.activity_threshold)
+
+        results.append((setting, _replay(activities[key], frame_duration, parameters)))
+
+    return results
+
+
+def _cumsum(decisions: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(decisions, dtype=np.int64)))
+
+
+class _Activity:
+    """
+    Voice activity of the frames of a recording for a window size and threshold.
+
+    A frame is active if the average decision over the trailing window reaches
+    the threshold. Inactive frames are run-length encoded.
+    """
+    def __init__(self, cumsum: np.ndarray, window_size: int, threshold: float):
+        self.cumsum = cumsum
+        self.length = len(cumsum) - 1
+        self.window_size = window_size
+        self.threshold = threshold
+
+        active = np.zeros(self.length, dtype=bool)
+        if self.length >= window_size:
+            activity = (cumsum[window_size:] - cumsum[:-window_size]) / float(window_size)
+            active[window_size - 1:] = (activity > 0) & (activity >= threshold)
+
+        self.active_indices = np.flatnonzero(active)
+        self.active_cumsum = _cumsum(active)
+
+        edges = np.diff(np.concatenate(([0], (~active).astype(np.int8), [0])))
+        self.run_starts = np.flatnonzero(edges == 1)
+        self.run_ends = np.flatnonzero(edges == -1)
+
+        self._long_runs = dict()
+
+    def long_runs(self, min_length: int) -> np.ndarray:
+        """Start indices of inactive runs with at least the given length"""
+        if min_length not in self._long_runs:
+            lengths = self.run_ends - self.run_starts
+            self._long_runs[min_length] = self.run_starts[lengths >= min_length]
+
+        return self._long_runs[min_length]
+
+    def next_active(self, index: int) -> int:
+        """First active frame at or after index, or -1"""
+        position = np.searchsorted(self.active_indices, index)
+
+        return int(self.active_indices[position]) if position < len(self.active_indices) else -1
+
+    def last_active(self, index: int) -> int:
+        """Last active frame at or before index, or -1"""
+        position = np.searchsorted(self.active_indices, index, side='right') - 1
+
+        return int(self.active_indices[position]) if position >= 0 else -1
+
+    def inactive_run_end(self, index: int) -> int:
+        """End of the inactive run containing index, or -1 if the frame is active"""
+        run = np.searchsorted(self.run_starts, index, side='right') - 1
+
+        return int(self.run_ends[run]) if run >= 0 and self.run_ends[run] > index else -1
+
+    def count_active(self, start: int, end: int) -> int:
+        return int(self.active_cumsum[end] - self.active_cumsum[start])
+
+
+def _gap_frames(frame_duration: float, allow_gap: int) -> int:
+    """Smallest number of gap frames exceeding the allowed gap, as checked by FrameWiseVAD"""
+    frames = max(1, int(allow_gap // frame_duration))
+    while frames > 1 and (frames - 1) * frame_duration > allow_gap:
+        frames -= 1
+    while frames * frame_duration <= allow_gap:
+        frames += 1
+
+    return frames
+
+
+def _replay(activity: _Activity, frame_duration: float, parameters: SegmentationParameters) -> List[Segment]:
+    segments = []
+    start = 0
+    while True:
+        offset, length, consumed = _replay_detect(activity, start, frame_duration, parameters)
+        if length > 0:
+            segments.append((start + offset, length))
+        if consumed == 0:
+            return segments
+        start += consumed
+
+
+def _replay_detect(activity: _Activity, start: int, frame_duration: float, parameters: SegmentationParameters):
+    """
+    Replay a single call to FrameWiseVAD.detect_vad starting at frame `start`.
+
+    Instead of stepping through the state machine of detect_vad frame by frame,
+    jump between the onsets and ends of voice activity:
+
+    * Within a call the first window - 1 frames share the average decision of
+      those frames, later frames use the trailing window average of the recording.
+    * Voice activity starts at the first active frame, preceded by up to
+      padding frames that were not part of a previous short voice activity.
+    * Voice activity ends on the frame after a gap of gap frames, i.e. within
+      the first run of more than gap inactive frames. Shorter gaps are included.
+    * Voice activity shorter than min_duration is dropped and detection continues
+      after its end.
+    * Voice activity exceeding max_duration is split after the last active frame
+      that fits, detection continues after it.
+
+    Returns offset and length of the voice activity and the number of consumed
+    frames, relative to `start`.
+    """
+    frames = activity.length - start
+    if frames <= 0:
+        return -1, 0, 0
+
+    window_size, padding_size, gap_size = parameters.frame_counts(frame_duration)
+    gap = _gap_frames(frame_duration, parameters.allow_gap)
+    max_duration = parameters.max_duration
+    max_size = max(1, int(max_duration // frame_duration)) if max_duration > 0 else 0
+
+    head = min(window_size - 1, frames)
+    head_activity = (activity.cumsum[start + head] - activity.cumsum[start]) / float(window_size)
+    head_active = bool(head_activity) and head_activity >= parameters.activity_threshold
+
+    def first_active(position):
+        if position < head and head_active:
+            return position
+        index = activity.next_active(start + max(position, head))
+        return index - start if index >= 0 else -1
+
+    def end_of_activity(onset):
+        position = max(onset + 1, head)
+        if position >= frames:
+            return -1
+        run_end = activity.inactive_run_end(start + position)
+        if run_end >= 0 and run_end - start - position > gap:
+            return position + gap
+        long_runs = activity.long_runs(gap + 1)
+        run = np.searchsorted(long_runs, start + position, side='right')
+        return int(long_runs[run]) - start + gap if run < len(long_runs) else -1
+
+    def last_active(position):
+        if position >= head:
+            index = activity.last_active(start + position)
+            if index >= start + head:
+                return index - start
+        return min(position, head - 1) if head_active else -1
+
+    def count_active(begin, end):
+        count = max(0, min(end, head) - begin) if head_active else 0
+        if end > max(begin, head):
+            count += activity.count_active(start + max(begin, head), start + end)
+        return count
+
+    search = 0
+    while True:
+        onset = first_active(search)
+        if onset < 0:
+            return -1, 0, frames
+
+        padding = min(onset - search, padding_size)
+        end = end_of_activity(onset)
+
+        if max_size:
+            split = first_active(max(onset + 1, onset + max_size - padding))
+            if split >= 0 and (end < 0 or split < end):
+                consumed = last_active(split - 1) + 1
+                return onset - padding, consumed - onset + padding, consumed
+
+        if end < 0:
+            last = last_active(frames - 1)
+            trailing_gap = frames - 1 - last
+            return onset - padding, padding + last - onset + 1 + min(trailing_gap, padding_size), frames
+
+        if count_active(onset, end) * frame_duration >= parameters.min_duration:
+            trailing = min(max(0, padding_size - gap_size), frames - end - 1)
+            length = padding + end - gap - onset + min(gap, padding_size) + trailing
+            return onset - padding, length, end + trailing + 1
+
+        search = end + 1
+
+
+def _replay_hysteresis(cumsum: np.ndarray, frame_duration: float, parameters: SegmentationParameters) -> List[Segment]:
+    """
+    Replay consecutive calls to FrameWiseVAD.detect_vad with hysteresis.
+
+    With hysteresis the activity of a frame depends on the state of the
+    detection, therefore the state machine of detect_vad is stepped through
+    frame by frame on the frame counts.
+    """
+    segments = []
+    start = 0
+    while start < len(cumsum) - 1:
+        offset, length, consumed = _replay_detect_hysteresis(cumsum, start, frame_duration, parameters)
+        if length > 0:
+            segments.append((start + offset, length))
+        start += consumed
+
+    return segments
+
+
+def _replay_detect_hysteresis(cumsum: np.ndarray, start: int, frame_duration: float,
+                              parameters: SegmentationParameters):
+    frames = len(cumsum) - 1 - start
+    onset_size, padding_size, gap_size = parameters.frame_counts(frame_duration)
+    offset_size = max(1, int(parameters.offset_window // frame_duration))
+    max_duration = parameters.max_duration
+    max_size = max(1, int(max_duration // frame_duration)) if max_duration > 0 else 0
+    buffer_size = padding_size + onset_size - 1
+
+    offset = -1
+    gap = None
+    queued = 0
+    va_length = 0
+    buffered = 0
+    ended = False
+    cnt = -1
+    for cnt in range(frames):
+        ongoing = gap is not None
+        size, threshold = (offset_size, parameters.offset_threshold) if ongoing \
+            else (onset_size, parameters.activity_threshold)
+        activity = (cumsum[start + cnt + 1] - cumsum[start + max(0, cnt + 1 - size)]) / float(size)
+
+        if activity and activity >= threshold:
+            if queued == 0:
+                padding = min(buffered, padding_size)
+                offset = cnt - padding
+                queued = padding
+                buffered = 0
+            elif max_size and queued + gap + 1 > max_size:
+                return offset, queued, cnt - gap
+            queued += (gap or 0) + 1
+            gap = 0
+            va_length += 1
+        elif gap and gap * frame_duration > parameters.allow_gap:
+            if va_length * frame_duration >= parameters.min_duration:
+                ended = True
+                break
+            queued = 0
+            va_length = 0
+            gap = None
+        elif gap is not None:
+            gap += 1
+        else:
+            buffered = min(buffered + 1, buffer_size)
+
+    if not ended:
+        cnt = frames - 1
+    queued += min(gap or 0, padding_size)
+    trailing = min(max(0, padding_size - gap_size), frames - cnt - 1)
+
+    return offset, queued + trailing, cnt + trailing + 1
@@ -0,0 +1,160 @@
+"""
+Per-channel voice activity of a multi-channel signal.
+
+The activity of each channel is kept as run-length encoded intervals of active
+frames, such that the timeline of a long signal stays small and can be queried
+for the channels active in a time range without keeping frame decisions.
+"""
+import bisect
+from array import array
+from typing import Iterable, List, Tuple, Dict, Optional
+
+import numpy as np
+
+from cltl.vad.decisions import FrameDecisions
+from cltl.vad.frame_vad import FrameWiseVAD
+
+Interval = Tuple[int, int]
+"""Start (inclusive) and end (exclusive) of an interval in frames"""
+
+
+class ActivityTimeline:
+    def __init__(self, channels: int, frame_duration: float):
+        """
+        Run-length encoded voice activity of the channels of a signal.
+
+        Intervals are in frames from the start of the signal, use
+        :attr:`frame_duration` to convert them to milliseconds.
+
+        Parameters
+        ----------
+        channels : int
+            The number of channels of the signal.
+        frame_duration : float
+            The duration of a frame in milliseconds.
+        """
+        self._frame_duration = frame_duration
+        self._starts = [array('q') for _ in range(channels)]
+        self._ends = [array('q') for _ in range(channels)]
+        self._active = np.zeros(channels, dtype=bool)
+        self._open = np.full(channels, -1, dtype=np.int64)
+        self._length = 0
+
+    @classmethod
+    def compute(cls, vad, audio_frames: Iterable[np.ndarray], sampling_rate: int):
+        """
+        Compute the timeline of a signal with a VAD that provides per-channel decisions,
+        e.g. :meth:`~cltl.vad.webrtc_vad.WebRtcVAD.channel_decisions`.
+        """
+        timeline = None
+        for frame in audio_frames:
+            decisions = vad.channel_decisions(frame, sampling_rate)
+            if timeline is None:
+                timeline = cls(len(decisions), 1000 * len(frame) / sampling_rate)
+            timeline.append(decisions)
+
+        return timeline
+
+    @property
+    def channels(self) -> int:
+        return len(self._starts)
+
+    @property
+    def frame_duration(self) -> float:
+        return self._frame_duration
+
+    def __len__(self):
+        return self._length
+
+    def append(self, decisions: np.ndarray):
+        """
+        Append the decisions for each channel of the next frame.
+        """
+        decisions = np.asarray(decisions, dtype=bool)
+        for channel in np.flatnonzero(decisions != self._active):
+            if decisions[channel]:
+                self._open[channel] = self._length
+            else:
+                self._close(channel, self._length)
+        self._active = decisions
+        self._length += 1
+
+    def intervals(self, channel: int, start: int = 0, end: Optional[int] = None) -> List[Interval]:
+        """
+        Intervals of activity of a channel that overlap the range [start, end).
+
+        Activity that is ongoing at the end of the timeline ends at its current length.
+        """
+        end = self._length if end is None else end
+        starts, ends = self._starts[channel], self._ends[channel]
+
+        first = bisect.bisect_right(ends, start)
+        last = bisect.bisect_left(starts, end)
+        intervals = list(zip(starts[first:last], ends[first:last]))
+
+        if self._active[channel] and self._open[channel] < end and self._length > start:
+            intervals.append((int(self._open[channel]), self._length))
+
+        return intervals
+
+    def active_channels(self, start: int, end: int) -> List[int]:
+        """
+        Channels with activity in the range [start, end) in frames.
+        """
+        return [channel for channel in range(self.channels) if self._has_activity(channel, start, end)]
+
+    def overlaps(self, min_channels: int = 2) -> List[Interval]:
+        """
+        Intervals in which at least min_channels channels are active at the same time.
+        """
+        boundaries = [(start, 1) for channel in range(self.channels) for start, _ in self.intervals(channel)]
+        boundaries += [(end, -1) for channel in range(self.channels) for _, end in self.intervals(channel)]
+        boundaries.sort()
+
+        overlaps = []
+        active = 0
+        overlap_start = None
+        for position, change in boundaries:
+            active += change
+            if overlap_start is None and active >= min_channels:
+                overlap_start = position
+            elif overlap_start is not None and active < min_channels:
+                if position > overlap_start:
+                    overlaps.append((overlap_start, position))
+                overlap_start = None
+
+        return overlaps
+
+    def decisions(self, channel: int) -> FrameDecisions:
+        """
+        Frame decisions of a single channel.
+        """
+        decisions = np.zeros(self._length, dtype=bool)
+        for start, end in self.intervals(channel):
+            decisions[start:end] = True
+
+        return FrameDecisions(decisions, self._frame_duration)
+
+    def segments(self, vad: FrameWiseVAD) -> Dict[int, List[Tuple[int, int]]]:
+        """
+        Segments of each channel as detected by the VAD on the decisions of the channel,
+        see :meth:`~cltl.vad.frame_vad.FrameWiseVAD.segments`.
+
+        Returns
+        -------
+        Dict[int, List[Tuple[int, int]]]
+            Offset and length in frames of the segments of each channel.
+        """
+        return {channel: vad.segments(self.decisions(channel)) for channel in range(self.channels)}
+
+    def _close(self, channel: int, end: int):
+        self._starts[channel].append(int(self._open[channel]))
+        self._ends[channel].append(end)
+        self._open[channel] = -1
+
+    def _has_activity(self, channel: int, start: int, end: int) -> bool:
+        if self._active[channel] and self._open[channel] < end and self._length > start:
+            return True
+
+        index = bisect.bisect_right(self._ends[channel], start)
+        return index < len(self._starts[channel]) and self._starts[channel][index] < end
@@ -1,12 +1,196 @@
-from queue import Queue
-from typing import Iterable, Any
+import logging
+import threading
+import time
+from queue import Queue, Empty
+from typing import Iterable, Any, Callable, Optional
 
 import numpy as np
-import sounddevice as sd
-import soundfile
 
+logger = logging.getLogger(__name__)
 
-def as_iterable(queue: Queue) -> Iterable[Any]:
+
+_POLL_INTERVAL = 0.01
+# Time in seconds to wait for the reader of with_deadline to stop after cancellation
+_READER_STOP_TIMEOUT = 1.0
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag shared between the owner of a detection
+    task and the code consuming its audio.
+
+    Callbacks registered with :meth:`on_cancel` are invoked once from the
+    thread calling :meth:`cancel`, e.g. to release the connection of an
+    audio source that is blocked on a read.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+
+        callback()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._event.wait(timeout)
+
+
+def cancellable(audio_frames: Iterable[Any], cancel: CancelToken) -> Iterable[Any]:
+    """
+    Utility function to stop iteration over a stream of audio frames on cancellation.
+
+    Parameters
+    ----------
+    audio_frames : Iterable[Any]
+        The stream of audio frames.
+    cancel : CancelToken
+        Token that ends the iteration once it is cancelled. The token is
+        checked before each frame, i.e. iteration stops at the latest after
+        one more frame is read from the stream.
+
+    Returns
+    -------
+    Iterable[Any]
+        The frames of the input stream up to cancellation.
+    """
+    for frame in audio_frames:
+        if cancel.cancelled:
+            return
+        yield frame
+
+
+class Deadline:
+    """
+    Wall-clock deadline measured with a monotonic clock.
+
+    The deadline can be cleared once it no longer applies, e.g. when voice
+    activity was detected before it expired.
+    """
+    def __init__(self, timeout: float):
+        self._expires = time.monotonic() + timeout
+
+    @property
+    def active(self) -> bool:
+        return self._expires is not None
+
+    def remaining(self) -> Optional[float]:
+        """Remaining time in seconds, None if the deadline was cleared"""
+        expires = self._expires
+        return None if expires is None else max(0.0, expires - time.monotonic())
+
+    def clear(self):
+        self._expires = None
+
+
+def with_deadline(audio_frames: Iterable[Any], deadline: Deadline, cancel: CancelToken = None) -> Iterable[Any]:
+    """
+    Utility function to bound the time spent waiting for audio frames.
+
+    While the deadline is active, frames are read one at a time on a separate
+    thread so that a stalled stream does not block the caller beyond the
+    deadline. No frames are read ahead. Once the deadline is cleared the
+    stream is read directly.
+
+    Parameters
+    ----------
+    audio_frames : Iterable[Any]
+        The stream of audio frames.
+    deadline : Deadline
+        The deadline for receiving frames.
+    cancel : CancelToken
+        Token that is cancelled when the deadline expires, to stop a read that is
+        still pending on the stream, e.g. by closing the source of the stream in
+        a callback registered with :meth:`CancelToken.on_cancel`.
+
+    Returns
+    -------
+    Iterable[Any]
+        The frames of the input stream.
+
+    Raises
+    ------
+    TimeoutError
+        If the deadline expires before the next frame is available. With a token,
+        the reader thread is stopped before the error is raised. Without token a
+        read that is still pending on the stream is abandoned, and the stream must
+        not be read anymore.
+    """
+    audio_frames = iter(audio_frames)
+    requests, results = Queue(), Queue()
+
+    def read():
+        while requests.get() and not (cancel and cancel.cancelled):
+            try:
+                results.put((True, next(audio_frames)))
+            except StopIteration:
+                results.put((False, None))
+                return
+            except Exception as e:
+                results.put((False, e))
+                return
+
+    reader = threading.Thread(target=read, name="vad-deadline-reader", daemon=True)
+    reader.start()
+
+    try:
+        while deadline.active:
+            remaining = deadline.remaining()
+            if remaining is None:
+                break
+            if remaining <= 0:
+                raise TimeoutError("Deadline expired")
+
+            requests.put(True)
+            try:
+                has_frame, item = results.get(timeout=remaining)
+            except Empty:
+                _stop_reader(reader, requests, cancel)
+                raise TimeoutError("Deadline expired while waiting for audio") from None
+
+            if not has_frame:
+                if item is not None:
+                    raise item
+                return
+            yield item
+
+        # The reader is idle, stop it before reading on the calling thread
+        requests.put(False)
+        yield from audio_frames
+    finally:
+        requests.put(False)
+
+
+def _stop_reader(reader: threading.Thread, requests: Queue, cancel: Optional[CancelToken]):
+    requests.put(False)
+    if cancel is None:
+        return
+
+    cancel.cancel()
+    reader.join(_READER_STOP_TIMEOUT)
+    if reader.is_alive():
+        logger.warning("Pending read did not stop within %s sec after cancellation", _READER_STOP_TIMEOUT)
+
+
+def as_iterable(queue: Queue, cancel: CancelToken = None) -> Iterable[Any]:
     """
     Utility function to convert a Queue into a thread safe iterable.
 
@@ -15,26 +199,42 @@ def as_iterable(queue: Queue) -> Iterable[Any]:
     queue : Queue[Any]
         The queue to be converted. To stop iteration the Queue must be
         terminated with a None value.
+    cancel : CancelToken
+        Optional token to stop waiting for the Queue to be terminated.
 
     Returns
     -------
     Iterable[Any]
         An iterable with the content of the Queue.
     """
-    next = queue.get()
-    while next is not None:
-        yield next
+    if cancel is None:
         next = queue.get()
+        while next is not None:
+            yield next
+            next = queue.get()
+        return
+
+    while not cancel.cancelled:
+        try:
+            next = queue.get(timeout=_POLL_INTERVAL)
+        except Empty:
+            continue
+        if next is None:
+            return
+        yield next
 
 
 def store_frames(frames, sampling_rate, save=None):
     if not len(frames):
         return
 
+    # Load audio libraries only when needed, sounddevice requires PortAudio
     audio = np.concatenate(frames)
     if save:
+        import soundfile
         soundfile.write(save, audio, sampling_rate)
     else:
+        import sounddevice as sd
         sd.play(audio, sampling_rate)
         sd.wait()
 
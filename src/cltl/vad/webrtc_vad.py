@@ -1,9 +1,8 @@
 import logging
 
 import numpy as np
-import webrtcvad
 
-from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.frame_vad import FrameWiseVAD, AUDIO_CLOCK
 
 logger = logging.getLogger(__name__)
 
@@ -16,25 +15,82 @@ SAMPLE_DEPTH = {np.int16}
 class WebRtcVAD(FrameWiseVAD):
     def __init__(self, activity_window: int = 1, activity_threshold: float = 1,
                  allow_gap: int = 0, padding: int = 2, min_duration: int = 0,
-                 mode: int = 3, storage: str = None):
+                 mode: int = 3, storage: str = None, max_duration: int = 0, timeout_clock: str = AUDIO_CLOCK,
+                 offset_threshold: float = None, offset_window: int = None,
+                 dc_block: bool = False, highpass_cutoff: float = 0):
         logger.info("Setup WebRtcVAD with mode %s", mode)
-        super().__init__(activity_window, activity_threshold, allow_gap, padding, min_duration, mode, storage)
+        super().__init__(activity_window, activity_threshold, allow_gap, padding, min_duration, mode, storage,
+                         max_duration, timeout_clock, offset_threshold, offset_window, dc_block, highpass_cutoff)
+        self._mode = mode
+        # webrtcvad loads pkg_resources on import, defer it until a VAD is created
+        import webrtcvad
         self._vad = webrtcvad.Vad(mode)
+        # webrtcvad adapts to its input, use a separate instance per channel
+        self._channel_vads = []
 
     def is_vad(self, audio_frame: np.array, sampling_rate: int) -> bool:
-        if not audio_frame.dtype == np.int16:
-            raise ValueError(f"Invalid sample depth {audio_frame.dtype}, expected np.int16")
+        mono_frame = to_mono(audio_frame, sampling_rate)
 
-        if sampling_rate != 16000:
-            raise NotImplementedError(f"Currently only sampling rate 16000 is supported, was {sampling_rate}")
+        return self._vad.is_speech(mono_frame.tobytes(), sampling_rate, len(mono_frame))
 
-        frame_duration = (len(audio_frame) * 1000) // sampling_rate
-        if not frame_duration in FRAME_DURATON:
-            raise ValueError(f"Unsupported frame length {audio_frame.shape}, "
-                             f"expected one of {[d * sampling_rate // 1000 for d in FRAME_DURATON]}ms "
-                             f"(rate: {sampling_rate})")
+    def channel_decisions(self, audio_frame: np.ndarray, sampling_rate: int) -> np.ndarray:
+        """
+        Decisions for each channel of an audio frame, see :class:`~cltl.vad.timeline.ActivityTimeline`.
 
-        is_mono = audio_frame.ndim == 1 or audio_frame.shape[1] == 1
-        mono_frame = audio_frame if is_mono else audio_frame.mean(axis=1, dtype=np.int16).ravel()
+        Returns
+        -------
+        np.ndarray
+            Boolean array with the decision for each channel.
+        """
+        channels = to_channels(audio_frame, sampling_rate)
+        if len(self._channel_vads) < len(channels):
+            import webrtcvad
+            self._channel_vads += [webrtcvad.Vad(self._mode) for _ in range(len(channels) - len(self._channel_vads))]
 
-        return self._vad.is_speech(mono_frame.tobytes(), sampling_rate, len(mono_frame))
\ No newline at end of file
+        return np.array([vad.is_speech(channel.tobytes(), sampling_rate, len(channel))
+                         for vad, channel in zip(self._channel_vads, channels)], dtype=bool)
+
+
+def to_channels(audio_frame: np.ndarray, sampling_rate: int) -> np.ndarray:
+    """
+    Validate an audio frame for webrtcvad and split it into contiguous channels.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (channels, samples).
+    """
+    _validate(audio_frame, sampling_rate)
+
+    return audio_frame.reshape(1, -1) if audio_frame.ndim == 1 else np.ascontiguousarray(audio_frame.T)
+
+
+def to_mono(audio_frame: np.ndarray, sampling_rate: int) -> np.ndarray:
+    """
+    Validate an audio frame for webrtcvad and downmix it to a single channel.
+
+    Raises
+    ------
+    ValueError
+        If the sample depth or frame length is not supported.
+    NotImplementedError
+        If the sampling rate is not supported.
+    """
+    _validate(audio_frame, sampling_rate)
+
+    is_mono = audio_frame.ndim == 1 or audio_frame.shape[1] == 1
+    return audio_frame if is_mono else audio_frame.mean(axis=1, dtype=np.int16).ravel()
+
+
+def _validate(audio_frame: np.ndarray, sampling_rate: int):
+    if not audio_frame.dtype == np.int16:
+        raise ValueError(f"Invalid sample depth {audio_frame.dtype}, expected np.int16")
+
+    if sampling_rate != 16000:
+        raise NotImplementedError(f"Currently only sampling rate 16000 is supported, was {sampling_rate}")
+
+    frame_duration = (len(audio_frame) * 1000) // sampling_rate
+    if not frame_duration in FRAME_DURATON:
+        raise ValueError(f"Unsupported frame length {audio_frame.shape}, "
+                         f"expected one of {[d * sampling_rate // 1000 for d in FRAME_DURATON]}ms "
+                         f"(rate: {sampling_rate})")
\ No newline at end of file
@@ -2,7 +2,6 @@ import logging
 from typing import Callable
 
 import flask
-from cltl.backend.source.client_source import ClientAudioSource
 from cltl.backend.spi.audio import AudioSource
 from cltl.combot.infra.config import ConfigurationManager
 from cltl.combot.infra.event import Event, EventBus
@@ -11,7 +10,10 @@ from cltl_service.vad.schema import VadMentionEvent
 from flask import Response
 
 from cltl.vad.controller_vad import ControllerVAD
-from cltl_service.vad.service import VadService
+from cltl.vad.profiling import PROFILER
+from cltl.vad.util import CancelToken
+from cltl_service.vad.service import VadService, STOP_TIMEOUT
+from cltl_service.vad.session import AudioSession
 
 logger = logging.getLogger(__name__)
 
@@ -22,55 +24,64 @@ class ControllerVadService(VadService):
                          config_manager: ConfigurationManager):
         config = config_manager.get_config("cltl.vad")
         ctrl_config = config_manager.get_config("cltl.vad.controller")
-
-        def audio_loader(url, offset, length) -> AudioSource:
-            return ClientAudioSource.from_config(config_manager, url, offset, length)
+        audio_loader, audio_session = cls._audio_loader_from_config(config_manager)
+        stop_timeout = config.get_float("stop_timeout") if "stop_timeout" in config else STOP_TIMEOUT
 
         return cls(ctrl_config.get("control_topic"), config.get("mic_topic"), config.get("vad_topic"),
-                   vad, audio_loader, event_bus, resource_manager)
+                   vad, audio_loader, event_bus, resource_manager, stop_timeout=stop_timeout,
+                   audio_session=audio_session)
 
     def __init__(self, control_topic: str, mic_topic: str, vad_topic: str,
                  vad: ControllerVAD, audio_loader: Callable[[str, int, int], AudioSource],
-                 event_bus: EventBus, resource_manager: ResourceManager):
-        super().__init__(mic_topic, vad_topic, vad, audio_loader, event_bus, resource_manager)
+                 event_bus: EventBus, resource_manager: ResourceManager, stop_timeout: float = STOP_TIMEOUT,
+                 audio_session: AudioSession = None):
+        super().__init__(mic_topic, vad_topic, vad, audio_loader, event_bus, resource_manager,
+                         stop_timeout=stop_timeout, audio_session=audio_session)
         self._control_topic = control_topic
 
-        self._app = None
-
     @property
     def input_topics(self):
         return super().input_topics + [self._control_topic]
 
     def _process(self, event: Event):
-        if event.metadata.topic == self._control_topic:
+        if event and event.metadata.topic == self._control_topic:
             logger.debug("Controller VAD %s", "activated" if event.payload else "deactivated")
             self._vad.active = event.payload
         else:
             super()._process(event)
 
-    def _vad_task(self, payload):
+    def _vad_task(self, payload, cancel: CancelToken):
         audio_id, url = (payload.signal.id, payload.signal.files[0])
 
         def detect():
+            PROFILER.start(str(audio_id))
+            try:
+                detect_segments()
+            finally:
+                PROFILER.end()
+
+        def detect_segments():
             consumed = -1
             source_offset = 0
-            while not self._stopped.value and consumed != 0:
-                speech, offset, consumed, frame_size = self._listen(url, source_offset)
-                speech = list(speech)
-
-                vad_event = None
-                if len(speech) > 0:
-                    speech_offset = source_offset + (offset * frame_size)
-                    vad_event = self._create_payload(speech, speech_offset, payload)
-                    logger.debug("Published VAD event (offset: %s, consumed %s)", offset, consumed)
-                elif consumed != 0 and offset >= 0:
-                    # Don't send an event if no VAD was detected before audio ends
-                    vad_event = VadMentionEvent(VadMentionEvent.__name__, [])
-
-                if vad_event:
-                    self._event_bus.publish(self._vad_topic, Event.for_payload(vad_event))
-
-                source_offset += consumed * frame_size
+            with self._signal_audio(url, cancel) as audio:
+                while not cancel.cancelled and consumed != 0:
+                    length, offset, consumed, frame_size, _ = self._listen(audio, source_offset, cancel, audio_id)
+
+                    vad_event = None
+                    with PROFILER.stage("payload"):
+                        if length > 0:
+                            speech_offset = source_offset + (offset * frame_size)
+                            vad_event = self._create_payload(length, speech_offset, payload)
+                            logger.debug("Published VAD event (offset: %s, consumed %s)", offset, consumed)
+                        elif consumed != 0 and offset >= 0:
+                            # Don't send an event if no VAD was detected before audio ends
+                            vad_event = VadMentionEvent(VadMentionEvent.__name__, [])
+
+                    if vad_event and not self._stopped.value:
+                        with PROFILER.stage("publish"):
+                            self._event_bus.publish(self._vad_topic, Event.for_payload(vad_event))
+
+                    source_offset += consumed * frame_size
 
         return detect
 
@@ -79,9 +90,9 @@ class ControllerVadService(VadService):
         if self._app:
             return self._app
 
-        self._app = flask.Flask(__name__)
+        app = super().app
 
-        @self._app.route('/rest/active', methods=['GET', 'POST'])
+        @app.route('/rest/active', methods=['GET', 'POST'])
         def voice_activity():
             if flask.request.method == 'GET':
                 return str(self._vad.active)
@@ -91,7 +102,7 @@ class ControllerVadService(VadService):
 
                 return str(True)
 
-        @self._app.route('/rest/stop', methods=['POST'])
+        @app.route('/rest/stop', methods=['POST'])
         def stop_va():
             self._vad.active = False
 
@@ -99,16 +110,4 @@ class ControllerVadService(VadService):
 
             return Response(status=200)
 
-        @self._app.route('/urlmap')
-        def url_map():
-            return str(self._app.url_map)
-
-        @self._app.after_request
-        def set_cache_control(response):
-            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-
-            return response
-
-        return self._app
\ No newline at end of file
+        return app
\ No newline at end of file
@@ -1,8 +1,11 @@
 import uuid
+from itertools import repeat
 from cltl.combot.event.emissor import AnnotationEvent
 from cltl.combot.infra.time_util import timestamp_now
 from dataclasses import dataclass
+from emissor.representation.container import Index
 from emissor.representation.scenario import Mention, Annotation
+from typing import List, Iterable, Tuple
 
 
 @dataclass
@@ -15,6 +18,52 @@ class VadAnnotation(Annotation[float]):
 @dataclass
 class VadMentionEvent(AnnotationEvent[VadAnnotation]):
     @classmethod
-    def create(cls, segment, annotation):
-        return cls(cls.__name__, [Mention(str(uuid.uuid4()), [segment], [annotation])])
+    def create(cls, segment, annotation, mention_id: str = None):
+        return cls(cls.__name__, [Mention(mention_id or str(uuid.uuid4()), [segment], [annotation])])
 
+    @classmethod
+    def create_batch(cls, segments: Iterable[Index], annotations: Iterable[VadAnnotation],
+                     mention_ids: Iterable[str] = None):
+        mention_ids = mention_ids or repeat(None)
+        return cls(cls.__name__, [Mention(mention_id or str(uuid.uuid4()), [segment], [annotation])
+                                  for segment, annotation, mention_id in zip(segments, annotations, mention_ids)])
+
+
+@dataclass
+class VadChunkEvent(AnnotationEvent[VadAnnotation]):
+    """
+    Interim chunk of ongoing voice activity.
+
+    Chunks of the same voice activity share the id of the mention in the
+    :class:`VadMentionEvent` that closes the voice activity once it ended. The
+    closing event spans the complete voice activity, including the part after
+    the last chunk. Consecutive chunks may overlap.
+    """
+    @classmethod
+    def create(cls, mention_id: str, segment: Index, annotation: VadAnnotation):
+        return cls(cls.__name__, [Mention(mention_id, [segment], [annotation])])
+
+
+@dataclass
+class VadSegmentsEvent:
+    """
+    Compact representation of voice activity segments of a single signal.
+
+    Segments are stored in columns, the i-th segment spans the samples
+    [starts[i], stops[i]) of the signal with activation activations[i].
+    """
+    type: str
+    signal_id: str
+    source: str
+    timestamp: int
+    starts: List[int]
+    stops: List[int]
+    activations: List[float]
+
+    @classmethod
+    def create(cls, signal_id: str, source: str, segments: Iterable[Tuple[int, int]], activation: float = 1.0):
+        segments = list(segments)
+        starts = [start for start, _ in segments]
+        stops = [stop for _, stop in segments]
+
+        return cls(cls.__name__, signal_id, source, timestamp_now(), starts, stops, [activation] * len(segments))
@@ -1,41 +1,193 @@
 import logging
+import threading
+import time
+import uuid
+from concurrent import futures
+from contextlib import ExitStack
+from concurrent.futures import Future
 from concurrent.futures.thread import ThreadPoolExecutor
-from typing import Callable
+from functools import partial
+from queue import Queue, Empty
+from typing import Callable, Iterator, Tuple, Union
 
-from cltl.backend.source.client_source import ClientAudioSource
+import flask
+import numpy as np
 from cltl.backend.spi.audio import AudioSource
 from cltl.combot.infra.config import ConfigurationManager
 from cltl.combot.infra.event import Event, EventBus
 from cltl.combot.infra.resource import ResourceManager
-from cltl.combot.infra.topic_worker import TopicWorker
+from cltl.combot.infra.topic_worker import TopicWorker, RejectionStrategy
 from cltl.combot.infra.util import ThreadsafeBoolean
 from cltl.combot.event.emissor import AudioSignalStarted, AudioSignalStopped
 from emissor.representation.container import Index
+from flask import Response, jsonify
 
-from cltl.vad.api import VAD
-from cltl_service.vad.schema import VadAnnotation, VadMentionEvent
+from cltl.vad.api import VAD, VadTimeout
+from cltl.vad.cache import SegmentCache
+from cltl.vad.factory import DetectorSpec, detector, prewarm
+from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.lookback import LookbackBuffers
+from cltl.vad.profiling import PROFILER
+from cltl.vad.segment_index import SegmentIndexes
+from cltl.vad.util import CancelToken, cancellable
+from cltl_service.vad.schema import VadAnnotation, VadMentionEvent, VadSegmentsEvent, VadChunkEvent
+from cltl_service.vad.session import AudioSession
+from cltl_service.vad.shared_source import SharedMemoryAudioSource
 
 logger = logging.getLogger(__name__)
 
 
 CONTENT_TYPE_SEPARATOR = ';'
 
+STOP_TIMEOUT = 10
+"""Default time in seconds a VAD task may take to finish after its signal was stopped"""
+
+MAX_WORKERS = 2
+"""Default number of audio signals processed concurrently"""
+
+_SCHEDULE_INTERVAL = 1
+
+_EVENT_BUFFER_SIZE = 64
+
+_VALIDATION_FRAME_DURATION = 10
+
 
 class VadService:
     @classmethod
-    def from_config(cls, vad: VAD, event_bus: EventBus, resource_manager: ResourceManager,
+    def from_config(cls, vad: Union[VAD, DetectorSpec, None], event_bus: EventBus, resource_manager: ResourceManager,
                     config_manager: ConfigurationManager):
+        """
+        Create the service from the configuration. If no VAD is provided, a :class:`WebRtcVAD`
+        is built in each worker from the `cltl.vad.webrtc` configuration, and changes of
+        that configuration are applied at runtime, see :meth:`reconfigure`.
+        """
+        config = config_manager.get_config("cltl.vad")
+        from_detector_config = vad is None
+        if from_detector_config:
+            vad = DetectorSpec.from_config(config_manager)
+        audio_loader, audio_session = cls._audio_loader_from_config(config_manager)
+        stop_timeout = config.get_float("stop_timeout") if "stop_timeout" in config else STOP_TIMEOUT
+        listen_timeout = config.get_float("listen_timeout") if "listen_timeout" in config else 0
+        batch_size = config.get_int("batch_size") if "batch_size" in config else 1
+        batch_window = config.get_float("batch_window") if "batch_window" in config else 0
+        compact = config.get_boolean("compact_payload") if "compact_payload" in config else False
+        chunk_duration = config.get_int("chunk_duration") if "chunk_duration" in config else 0
+        chunk_overlap = config.get_int("chunk_overlap") if "chunk_overlap" in config else 0
+        max_workers = config.get_int("max_workers") if "max_workers" in config else MAX_WORKERS
+        index_signals = config.get_int("index_signals") if "index_signals" in config else 0
+        index_segments = config.get_int("index_segments") if "index_segments" in config else 0
+        segment_index = SegmentIndexes(index_signals, index_segments) if index_signals > 0 else None
+        lookback_duration = config.get_float("lookback") if "lookback" in config else 0
+        lookback_signals = config.get_int("lookback_signals") if "lookback_signals" in config else 4
+        lookback = LookbackBuffers(lookback_duration, lookback_signals) if lookback_duration > 0 else None
+        PROFILER.enabled = config.get_boolean("profiling") if "profiling" in config else False
+
+        cache = None
+        cache_size = config.get_int("cache_size") if "cache_size" in config else 0
+        if cache_size > 0:
+            cache_dir = config.get("cache_dir") if "cache_dir" in config else None
+            cache_disk_size = config.get_int("cache_disk_size") if "cache_disk_size" in config else 100
+            cache = SegmentCache(cache_size, cache_dir or None, cache_disk_size * 1024 * 1024)
+
+        service = cls(config.get("mic_topic"), config.get("vad_topic"), vad, audio_loader, event_bus,
+                      resource_manager, stop_timeout=stop_timeout, listen_timeout=listen_timeout,
+                      batch_size=batch_size, batch_window=batch_window, compact=compact, cache=cache,
+                      chunk_duration=chunk_duration, chunk_overlap=chunk_overlap,
+                      max_workers=max_workers, segment_index=segment_index, lookback=lookback,
+                      audio_session=audio_session)
+
+        if from_detector_config:
+            # Apply changes of the detector configuration at runtime
+            config_manager.get_config("cltl.vad.webrtc", callback=service._on_detector_config)
+
+        return service
+
+    @staticmethod
+    def _audio_loader_from_config(config_manager: ConfigurationManager) \
+            -> Tuple[Callable[[str, int, int], AudioSource], AudioSession]:
         config = config_manager.get_config("cltl.vad")
+        shared_memory = config.get_boolean("shared_memory") if "shared_memory" in config else False
+        # Connections are reused across utterances and signals
+        session = AudioSession.from_config(config_manager)
 
         def audio_loader(url, offset, length) -> AudioSource:
-            return ClientAudioSource.from_config(config_manager, url, offset, length)
+            if shared_memory:
+                # Use the shared memory transport if the audio is captured on the same host
+                try:
+                    return SharedMemoryAudioSource.for_url(url, offset, length)
+                except FileNotFoundError:
+                    logger.debug("No shared audio for %s, fall back to HTTP", url)
+
+            return session.audio_source(url, offset, length)
+
+        return audio_loader, session
+
+    def __init__(self, mic_topic: str, vad_topic: str, vad: Union[VAD, DetectorSpec], audio_loader: Callable[[str, int, int], AudioSource],
+                 event_bus: EventBus, resource_manager: ResourceManager, stop_timeout: float = STOP_TIMEOUT,
+                 batch_size: int = 1, batch_window: float = 0, compact: bool = False, cache: SegmentCache = None,
+                 chunk_duration: int = 0, chunk_overlap: int = 0, max_workers: int = MAX_WORKERS,
+                 segment_index: SegmentIndexes = None, lookback: LookbackBuffers = None,
+                 audio_session: AudioSession = None, listen_timeout: float = 0):
+        """
+        Parameters
+        ----------
+        vad : Union[VAD, DetectorSpec]
+            The VAD shared by all workers, or the specification of a VAD that is
+            built for each worker when the worker is started.
+        stop_timeout : float
+            Time in seconds a VAD task may take to finish after its signal was stopped.
+            Tasks detect voice activity until the end of the audio of a stopped
+            signal. When the service is stopped, running tasks are cancelled and
+            awaited at most this time.
+        batch_size : int
+            Maximum number of segments of a signal published in a single event.
+        batch_window : float
+            Maximum time in seconds segments of a signal are held back to be
+            published in a single event. Held segments are published when the
+            window expires, also if no further segments are detected, and
+            remaining segments are published when the signal ends.
+        compact : bool
+            Publish :class:`VadSegmentsEvent` instead of :class:`VadMentionEvent`.
+        cache : SegmentCache
+            Cache for the segments of completely processed signals, segments
+            of signals found in the cache are published without running the VAD.
+        chunk_duration : int
+            Publish :class:`VadChunkEvent` every `chunk_duration` milliseconds of
+            ongoing voice activity, requires a :class:`FrameWiseVAD`. The
+            :class:`VadMentionEvent` published at the end of the voice activity
+            has the same mention id as its chunks. No chunks are published if 0.
+        chunk_overlap : int
+            Duration in milliseconds by which consecutive chunks overlap.
+        max_workers : int
+            Maximum number of audio signals processed concurrently.
+        segment_index : SegmentIndexes
+            Index of the detected segments of recent signals that can be queried
+            through the REST routes of :attr:`app`. Segments are indexed when
+            they are detected. No index is kept if None.
+        lookback : LookbackBuffers
+            Buffers of the most recent audio read by the VAD for each signal, that
+            can be accessed by sample offset through :meth:`lookback_audio` and the
+            REST routes of :attr:`app` instead of fetching it again from the
+            backend. No audio is retained if None.
+        audio_session : AudioSession
+            Session that provides the connections of the audio loader, closed
+            when the service is stopped.
+        listen_timeout : float
+            Time in seconds to wait for the next voice activity in a signal, measured
+            with the timeout clock of the VAD. The signal is no longer processed after
+            the timeout. With the wall clock this also bounds waiting for the audio
+            of a stalled signal, the pending read is interrupted. No timeout if 0.
+        """
+        if chunk_duration > 0 and compact:
+            raise ValueError("Chunked detection is not supported with compact payloads")
 
-        return cls(config.get("mic_topic"), config.get("vad_topic"), vad, audio_loader, event_bus, resource_manager)
+        self._chunk_duration = chunk_duration
+        self._detection = None
+        self._reconfigure_lock = threading.RLock()
+        self._configure(vad)
 
-    def __init__(self, mic_topic: str, vad_topic: str, vad: VAD, audio_loader: Callable[[str, int, int], AudioSource],
-                 event_bus: EventBus, resource_manager: ResourceManager):
-        self._vad = vad
         self._audio_loader = audio_loader
+        self._audio_session = audio_session
         self._event_bus = event_bus
         self._resource_manager = resource_manager
         self._mic_topic = mic_topic
@@ -44,76 +196,580 @@ class VadService:
         self._topic_worker = None
         self._executor = None
         self._tasks = dict()
+        self._stopping = dict()
+        self._completed = Queue()
+        self._stop_timeout = stop_timeout
+        self._listen_timeout = listen_timeout
+        self._batch_size = max(1, batch_size)
+        self._batch_window = batch_window
+        self._compact = compact
+        self._cache = cache
+        self._chunk_overlap = chunk_overlap
+        self._max_workers = max_workers
+        self._segment_index = segment_index
+        self._lookback = lookback
         self._stopped = ThreadsafeBoolean()
 
+        self._app = None
+
     @property
     def input_topics(self):
         return [self._mic_topic]
 
+    @property
+    def _vad(self) -> VAD:
+        return self._detection[1]
+
+    @property
+    def _spec(self) -> DetectorSpec:
+        return self._detection[0]
+
+    def reconfigure(self, vad: Union[VAD, DetectorSpec]):
+        """
+        Replace the VAD of the service without restarting it.
+
+        The new VAD applies atomically at the next segment boundary of each
+        signal: segments that are being detected are completed with the previous
+        VAD and subsequent segments are detected with the new one. Results of
+        signals processed with both are not cached.
+
+        Raises
+        ------
+        ValueError
+            If the VAD is not supported by the service.
+        TypeError
+            If the VAD cannot be built from the specification.
+        """
+        with self._reconfigure_lock:
+            self._configure(vad)
+
+        logger.info("Reconfigured VAD to %s", self._spec or self._vad.__class__.__name__)
+
+    def _configure(self, vad):
+        # Build an instance in the current thread to validate the specification
+        spec = vad if isinstance(vad, DetectorSpec) else None
+        vad = detector(spec) if spec else vad
+
+        if self._chunk_duration > 0 and not isinstance(vad, FrameWiseVAD):
+            raise ValueError(f"Chunked detection requires a FrameWiseVAD, got {vad.__class__.__name__}")
+        if isinstance(vad, FrameWiseVAD):
+            # Fail on parameters that are only used once audio is processed
+            vad.frame_counts(_VALIDATION_FRAME_DURATION)
+
+        self._detection = spec, vad
+
+    def _on_detector_config(self, config):
+        with self._reconfigure_lock:
+            try:
+                spec = DetectorSpec.from_configuration(config, self._spec.type)
+                if spec != self._spec:
+                    self.reconfigure(spec)
+            except (TypeError, ValueError):
+                logger.exception("Failed to apply VAD configuration, continue with %s", self._spec)
+
     @property
     def app(self):
-        return None
+        if self._app:
+            return self._app
+
+        self._app = flask.Flask(__name__)
+
+        @self._app.route('/rest/profiling', methods=['GET', 'POST'])
+        def profiling():
+            if flask.request.method == 'POST':
+                PROFILER.enabled = True
+
+            return str(PROFILER.enabled)
+
+        @self._app.route('/rest/profiling/stop', methods=['POST'])
+        def stop_profiling():
+            PROFILER.enabled = False
+
+            return Response(status=200)
+
+        @self._app.route('/rest/profile/<signal_id>', methods=['GET'])
+        def profile(signal_id):
+            signal_profile = PROFILER.get(signal_id)
+            if not signal_profile:
+                return Response(f"No profile for signal {signal_id}", status=404)
+
+            return jsonify(signal_profile.to_dict())
+
+        @self._app.route('/rest/segments', methods=['GET'])
+        def indexed_signals():
+            if not self._segment_index:
+                return Response("Segment index is disabled", status=404)
+
+            return jsonify(self._segment_index.signals())
+
+        @self._app.route('/rest/segments/<signal_id>', methods=['GET'])
+        def segments(signal_id):
+            """
+            Indexed segments of a signal, either overlapping the sample range given
+            by the `start` and `end` query parameters, or within the `last` seconds.
+            """
+            index = self._segment_index.get(signal_id) if self._segment_index else None
+            if not index:
+                return Response(f"No segments indexed for signal {signal_id}", status=404)
+
+            args = flask.request.args
+            try:
+                if "last" in args:
+                    starts, ends, scores = index.latest(float(args["last"]))
+                else:
+                    end = int(args["end"]) if "end" in args else None
+                    starts, ends, scores = index.query(int(args.get("start", 0)), end)
+            except ValueError as e:
+                return Response(str(e), status=400)
+
+            return jsonify({"signal_id": signal_id, "rate": index.rate,
+                            "segments": [{"start": int(start), "end": int(end), "score": float(score)}
+                                         for start, end, score in zip(starts, ends, scores)]})
+
+        @self._app.route('/rest/lookback/<signal_id>', methods=['GET'])
+        def lookback(signal_id):
+            buffer = self._lookback.get(signal_id) if self._lookback else None
+            if not buffer:
+                return Response(f"No audio retained for signal {signal_id}", status=404)
+
+            start, end = buffer.range
+
+            return jsonify({"signal_id": signal_id, "start": start, "end": end, "rate": buffer.rate,
+                            "channels": buffer.channels})
+
+        @self._app.route('/rest/lookback/<signal_id>/audio', methods=['GET'])
+        def lookback_audio(signal_id):
+            """
+            Retained audio of a signal in the sample range given by the `start` and
+            `end` query parameters as 16 bit PCM.
+            """
+            buffer = self._lookback.get(signal_id) if self._lookback else None
+            if not buffer:
+                return Response(f"No audio retained for signal {signal_id}", status=404)
+
+            args = flask.request.args
+            try:
+                audio = buffer.read(int(args["start"]), int(args["end"]))
+            except (KeyError, ValueError) as e:
+                return Response(str(e), status=400)
+
+            content_type = f"audio/L16; rate={buffer.rate}; channels={buffer.channels or 1}"
+
+            return Response(audio.astype('>i2').tobytes(), content_type=content_type)
+
+        @self._app.route('/rest/vad', methods=['GET', 'PUT'])
+        def vad_configuration():
+            """
+            Type and parameters of the VAD. A PUT with a JSON object of parameters
+            updates the parameters of the VAD specification, see :meth:`reconfigure`.
+            """
+            if flask.request.method == 'PUT':
+                if not self._spec:
+                    return Response("VAD is not reconfigurable, the service was not created "
+                                    "from a detector specification", status=409)
+
+                parameters = flask.request.get_json(silent=True)
+                if not isinstance(parameters, dict):
+                    return Response("Expected a JSON object of VAD parameters", status=400)
+
+                with self._reconfigure_lock:
+                    try:
+                        self.reconfigure(self._spec.updated(parameters))
+                    except (TypeError, ValueError) as e:
+                        return Response(f"Invalid VAD parameters: {e}", status=400)
+
+            spec, vad = self._detection
+            if spec:
+                return jsonify({"type": spec.type, "parameters": spec.parameters})
+
+            return jsonify({"type": vad.__class__.__name__, "parameters": vad.parameters})
+
+        @self._app.route('/urlmap')
+        def url_map():
+            return str(self._app.url_map)
+
+        @self._app.after_request
+        def set_cache_control(response):
+            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+            response.headers['Pragma'] = 'no-cache'
+            response.headers['Expires'] = '0'
+
+            return response
+
+        return self._app
+
+    def lookback_audio(self, signal_id: str, start: int, end: int) -> np.ndarray:
+        """
+        Retained audio of a signal in the range [start, end) in samples.
+
+        Raises
+        ------
+        ValueError
+            If no audio is retained for the signal or the range.
+        """
+        buffer = self._lookback.get(signal_id) if self._lookback else None
+        if not buffer:
+            raise ValueError(f"No audio retained for signal {signal_id}")
+
+        return buffer.read(start, end)
 
     def start(self, timeout=30):
+        if self._spec:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                initializer=prewarm, initargs=(self._spec,))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        self._stopped.value = False
+        # Schedule processing when idle to report on stopped VAD tasks. Signal events of
+        # concurrent signals must not be dropped, block the publisher if the buffer is full
         self._topic_worker = TopicWorker(self.input_topics, self._event_bus, provides=[self._vad_topic],
                                          resource_manager=self._resource_manager, processor=self._process,
-                                         name=self.__class__.__name__)
+                                         scheduled=_SCHEDULE_INTERVAL, name=self.__class__.__name__,
+                                         buffer_size=_EVENT_BUFFER_SIZE, rejection_strategy=RejectionStrategy.BLOCK)
         self._topic_worker.start().wait()
-        self._executor = ThreadPoolExecutor(max_workers=2)
-        self._stopped.value = False
 
     def stop(self):
         if not self._topic_worker:
-            pass
+            return
 
         self._stopped.value = True
         self._topic_worker.stop()
         self._topic_worker.await_stop()
+
+        # Stop reading audio of running tasks and wait for them at most the stop timeout
+        tasks = list(self._tasks.values()) + [(task, cancel) for task, cancel, _ in self._stopping.values()]
+        for _, cancel in tasks:
+            cancel.cancel()
+        _, pending = futures.wait([task for task, _ in tasks], timeout=self._stop_timeout)
+        if pending:
+            logger.error("%s VAD tasks did not finish within %s sec after the service was stopped",
+                         len(pending), self._stop_timeout)
         self._executor.shutdown(wait=False)
         self._topic_worker = None
         self._executor = None
+        if self._audio_session:
+            self._audio_session.close()
 
     def _process(self, event):
+        self._process_completed()
+        if event is None:
+            return
+
         payload = event.payload
         if event.payload.type == AudioSignalStarted.__name__:
             # Run this asynchronously to be able to receive the AudioSignalStopped event
-            self._tasks[payload.signal.id] = self._executor.submit(self._vad_task(payload))
+            cancel = CancelToken()
+            task = self._executor.submit(self._vad_task(payload, cancel))
+            task.add_done_callback(partial(self._on_task_done, payload.signal.id))
+            self._tasks[payload.signal.id] = task, cancel
             logger.debug("Started VAD task: %s", event.id)
         if event.payload.type == AudioSignalStopped.__name__:
             if payload.signal.id not in self._tasks:
                 logger.error("Received AudioStopped without running VAD: %s", event)
                 return
-            self._tasks[payload.signal.id].result()
-            del self._tasks[payload.signal.id]
-            logger.debug("Finished VAD task: %s", event.id)
+            # The task detects voice activity until the end of the audio of the stopped signal,
+            # don't wait for it to finish, completion is tracked in _process_completed
+            task, cancel = self._tasks.pop(payload.signal.id)
+            self._stopping[payload.signal.id] = task, cancel, time.monotonic() + self._stop_timeout
+            logger.debug("Stopped VAD task: %s", event.id)
 
         logger.debug("Processed event (topic %s)", event.metadata.topic)
 
-    def _vad_task(self, payload):
+    def _on_task_done(self, signal_id, task: Future):
+        # Called from the executor thread
+        self._completed.put((signal_id, task))
+
+    def _process_completed(self):
+        while True:
+            try:
+                signal_id, task = self._completed.get(block=False)
+            except Empty:
+                break
+
+            if task.exception():
+                logger.error("VAD task for signal %s failed", signal_id, exc_info=task.exception())
+            if self._stopping.pop(signal_id, None):
+                logger.debug("Finished VAD task for signal %s", signal_id)
+            elif signal_id in self._tasks:
+                logger.debug("VAD task for signal %s finished before the signal was stopped", signal_id)
+            else:
+                logger.warning("VAD task for signal %s finished after timeout", signal_id)
+
+        now = time.monotonic()
+        timed_out = [signal_id for signal_id, (_, _, deadline) in self._stopping.items() if deadline < now]
+        for signal_id in timed_out:
+            task, _, _ = self._stopping.pop(signal_id)
+            if task.done():
+                # Finished before the signal was stopped, its completion was already processed
+                continue
+            logger.error("VAD task for signal %s did not finish within %s sec after the signal was stopped",
+                         signal_id, self._stop_timeout)
+
+    def _vad_task(self, payload, cancel: CancelToken):
         audio_id, url = (payload.signal.id, payload.signal.files[0])
 
         def detect():
+            PROFILER.start(str(audio_id))
+            try:
+                detect_segments()
+            finally:
+                PROFILER.end()
+
+        def detect_segments():
+            detection = self._detection
+            if self._segment_index:
+                # Segments of a signal that is processed again replace the indexed ones
+                self._segment_index.discard(audio_id)
+
+            cache_key = self._cache.key(url, detection[1]) if self._cache else None
+            entry = self._cache.entry(cache_key) if cache_key else None
+            if entry is not None:
+                cached, cached_rate = entry
+                logger.debug("Found %s cached VAD segments for signal %s", len(cached), audio_id)
+                if self._segment_index:
+                    self._segment_index.add(audio_id, cached, rate=cached_rate)
+                for start in range(0, len(cached), self._batch_size):
+                    if not self._stopped.value:
+                        self._publish_segments(cached[start:start + self._batch_size], payload)
+                return
+
+            def publish(batch, batch_ids):
+                if not self._stopped.value:
+                    self._publish_segments(batch, payload, batch_ids)
+
+            segments = []
             consumed = -1
             source_offset = 0
-            while not self._stopped.value and consumed != 0:
-                speech, offset, consumed, frame_size = self._listen(url, source_offset)
-                speech = list(speech)
+            rate = None
+            batch = _SegmentBatch(publish, self._batch_size, self._batch_window)
+            try:
+                with self._signal_audio(url, cancel) as audio:
+                    while not cancel.cancelled and consumed != 0:
+                        mention_id = str(uuid.uuid4())
+                        try:
+                            if self._chunk_duration > 0:
+                                segment, consumed, frame_size, rate = self._listen_chunked(audio, source_offset, cancel,
+                                                                                           mention_id, payload)
+                            else:
+                                segment, consumed, frame_size, rate = self._listen_segment(audio, source_offset, cancel,
+                                                                                           audio_id)
+                        except VadTimeout:
+                            logger.info("No voice activity in signal %s within %s sec, stopped listening",
+                                        audio_id, self._listen_timeout)
+                            break
+
+                        if segment and not self._stopped.value:
+                            segments.append(segment)
+                            if self._segment_index:
+                                self._segment_index.add(audio_id, [segment], rate=rate)
+                            batch.add(segment, mention_id)
 
-                if len(speech) > 0:
-                    speech_offset = source_offset + (offset * frame_size)
-                    vad_event = self._create_payload(speech, speech_offset, payload)
-                    self._event_bus.publish(self._vad_topic, Event.for_payload(vad_event))
+                        source_offset += consumed * frame_size
+            finally:
+                batch.flush()
 
-                source_offset += consumed * frame_size
+            # Only cache complete results of a single VAD
+            if cache_key and consumed == 0 and not cancel.cancelled and self._detection is detection:
+                self._cache.put(cache_key, segments, rate=rate)
 
         return detect
 
-    def _listen(self, url, offset):
-        with self._audio_loader(url, offset, -1) as source:
-            return self._vad.detect_vad(source.audio, source.rate, blocking=True) + (source.frame_size,)
+    def _publish_segments(self, segments, payload, mention_ids=None):
+        source = self._vad.__class__.__name__
+        with PROFILER.stage("payload"):
+            if self._compact:
+                vad_event = VadSegmentsEvent.create(payload.signal.id, source, segments)
+            else:
+                indices = [Index.from_range(payload.signal.id, start, stop) for start, stop in segments]
+                annotations = [VadAnnotation.for_activation(1.0, source) for _ in segments]
+                vad_event = VadMentionEvent.create_batch(indices, annotations, mention_ids)
+
+        with PROFILER.stage("publish"):
+            self._event_bus.publish(self._vad_topic, Event.for_payload(vad_event))
+        logger.debug("Published %s VAD segments for signal %s", len(segments), payload.signal.id)
+
+    def _listen_segment(self, audio: "_SignalAudio", offset, cancel: CancelToken, signal_id=None):
+        length, speech_offset, consumed, frame_size, rate = self._listen(audio, offset, cancel, signal_id)
+        if not length:
+            return None, consumed, frame_size, rate
+
+        start = offset + (speech_offset * frame_size)
+
+        return (start, start + length), consumed, frame_size, rate
+
+    def _listen_chunked(self, audio: "_SignalAudio", offset, cancel: CancelToken, mention_id: str, payload):
+        source_name = self._vad.__class__.__name__
+
+        source = audio.open(offset)
+        frame_size = source.frame_size
+        rate = source.rate
+
+        def publish_chunk(chunk_offset, frames, final):
+            # The closing VadMentionEvent covers the final chunk
+            if final or self._stopped.value:
+                return
+            with PROFILER.stage("payload"):
+                start = offset + chunk_offset * frame_size
+                segment = Index.from_range(payload.signal.id, start,
+                                           start + sum(len(frame) for frame in frames))
+                chunk_event = VadChunkEvent.create(mention_id, segment,
+                                                   VadAnnotation.for_activation(1.0, source_name))
+            with PROFILER.stage("publish"):
+                self._event_bus.publish(self._vad_topic, Event.for_payload(chunk_event))
+
+        frames = self._retained(cancellable(audio.frames(), cancel), payload.signal.id, offset, rate)
+        speech_offset, length, consumed = self._detector().detect_vad_chunked(
+            frames, rate, publish_chunk, self._chunk_duration, self._chunk_overlap,
+            timeout=self._listen_timeout, cancel=cancel)
+
+        if not length:
+            return None, consumed, frame_size, rate
+
+        start = offset + speech_offset * frame_size
+
+        return (start, start + length * frame_size), consumed, frame_size, rate
 
-    def _create_payload(self, speech, speech_offset, payload):
-        segment = Index.from_range(payload.signal.id, speech_offset, speech_offset + sum(len(frame) for frame in speech))
+    def _listen(self, audio: "_SignalAudio", offset, cancel: CancelToken, signal_id=None):
+        """
+        Detect the next speech segment in the audio of the signal from offset.
+
+        Returns the length of the speech in samples instead of the speech frames,
+        the frames are only valid until the audio source is closed.
+        """
+        source = audio.open(offset)
+        frames = self._retained(cancellable(audio.frames(), cancel), signal_id, offset, source.rate)
+        vad = self._detector()
+        # Only frame-wise detection supports interrupting reads on timeout
+        options = dict(cancel=cancel) if isinstance(vad, FrameWiseVAD) else dict()
+        speech, speech_offset, consumed = vad.detect_vad(frames, source.rate, blocking=True,
+                                                         timeout=self._listen_timeout, **options)
+        length = sum(len(frame) for frame in speech)
+
+        return length, speech_offset, consumed, source.frame_size, source.rate
+
+    def _signal_audio(self, url: str, cancel: CancelToken) -> "_SignalAudio":
+        return _SignalAudio(self._audio_loader, url, cancel)
+
+    def _detector(self) -> VAD:
+        spec, vad = self._detection
+
+        return detector(spec) if spec else vad
+
+    def _retained(self, audio_frames, signal_id, offset, rate):
+        if not self._lookback or signal_id is None:
+            return audio_frames
+
+        return self._with_lookback(audio_frames, self._lookback.buffer(signal_id, rate), offset)
+
+    def _with_lookback(self, audio_frames, buffer, offset):
+        for frame in audio_frames:
+            buffer.write(offset, frame)
+            offset += len(frame)
+            yield frame
+
+    def _create_payload(self, length, speech_offset, payload):
+        segment = Index.from_range(payload.signal.id, speech_offset, speech_offset + length)
         annotation = VadAnnotation.for_activation(1.0, self._vad.__class__.__name__)
 
         return VadMentionEvent.create(segment, annotation)
+
+
+class _SegmentBatch:
+    def __init__(self, publish: Callable[[list, list], None], size: int, window: float):
+        """
+        Segments of a signal held back to be published in a single event.
+
+        The batch is published when it reaches its size, or when the window
+        expired since its first segment was added, independent of whether further
+        segments are detected.
+        """
+        self._publish = publish
+        self._size = size
+        self._window = window
+        self._segments = []
+        self._mention_ids = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, segment, mention_id):
+        with self._lock:
+            self._segments.append(segment)
+            self._mention_ids.append(mention_id)
+
+            if len(self._segments) >= self._size or self._window <= 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self._window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._segments:
+            segments, mention_ids = self._segments, self._mention_ids
+            self._segments, self._mention_ids = [], []
+            self._publish(segments, mention_ids)
+
+
+class _SignalAudio:
+    def __init__(self, audio_loader: Callable[[str, int, int], AudioSource], url: str, cancel: CancelToken):
+        """
+        Audio of a signal read by consecutive detections through a single source.
+
+        The source is opened on the first detection and kept open until the signal
+        is processed, such that the connection and the frame reader of the source
+        are used for all utterances of the signal. The source is only opened again
+        if a detection read frames it did not consume, at the offset of the next
+        detection. On cancellation a pending read of the source is interrupted,
+        if the source supports it.
+        """
+        self._audio_loader = audio_loader
+        self._url = url
+        self._cancel = cancel
+        self._resources = ExitStack()
+        self._source = None
+        self._frames = None
+        self._position = 0
+
+    def open(self, offset: int) -> AudioSource:
+        """
+        The source of the signal with the next frame at offset in samples.
+        """
+        if self._source is not None and offset != self._position:
+            logger.debug("Reopen audio of %s at %s, read up to %s", self._url, offset, self._position)
+            self.close()
+
+        if self._source is None:
+            self._source = self._resources.enter_context(self._audio_loader(self._url, offset, -1))
+            interrupt = getattr(self._source, "interrupt", None)
+            if interrupt:
+                self._cancel.on_cancel(interrupt)
+            self._frames = iter(self._source.audio)
+            self._position = offset
+
+        return self._source
+
+    def frames(self) -> Iterator[np.ndarray]:
+        """
+        Frames of the source from the current position, see :meth:`open`.
+        """
+        for frame in self._frames:
+            self._position += len(frame)
+            yield frame
+
+    def close(self):
+        self._source = None
+        self._frames = None
+        self._resources.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
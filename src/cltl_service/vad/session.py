@@ -0,0 +1,166 @@
+import logging
+import socket
+from urllib.parse import urljoin
+
+import requests
+from cltl.backend.api.storage import STORAGE_SCHEME
+from cltl.backend.api.util import bytes_per_frame
+from cltl.backend.source.client_source import ClientAudioSource
+from cltl.vad.frames import BlockPool, FrameReader, SAMPLE_DEPTH, parse_content_type
+from cltl.combot.infra.config import ConfigurationManager
+from requests.adapters import HTTPAdapter, BaseAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class _StorageAdapter(BaseAdapter):
+    """Resolve cltl-storage: URLs against the storage URL using a shared connection pool."""
+    def __init__(self, storage_url: str, http_adapter: HTTPAdapter):
+        super().__init__()
+        self._storage_url = storage_url
+        self._http_adapter = http_adapter
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        storage_request = request.copy()
+        path = storage_request.url.split(f"{STORAGE_SCHEME}:")[1]
+        storage_request.url = urljoin(self._storage_url, path)
+
+        return self._http_adapter.send(storage_request, stream, timeout, verify, cert, proxies)
+
+    def close(self):
+        # The HTTP adapter is closed by the session
+        pass
+
+
+class AudioSession:
+    @classmethod
+    def from_config(cls, config_manager: ConfigurationManager):
+        backend_config = config_manager.get_config("cltl.backend")
+        config = config_manager.get_config("cltl.vad")
+
+        pool_size = config.get_int("pool_size") if "pool_size" in config else 10
+        connect_timeout = config.get_float("connect_timeout") if "connect_timeout" in config else None
+        read_timeout = config.get_float("read_timeout") if "read_timeout" in config else None
+
+        return cls(backend_config.get("storage_url"), pool_size, connect_timeout, read_timeout)
+
+    def __init__(self, storage_url: str = None, pool_size: int = 10,
+                 connect_timeout: float = None, read_timeout: float = None):
+        """
+        HTTP session with a pool of keep-alive connections shared by the audio sources of a service.
+
+        Parameters
+        ----------
+        storage_url : str
+            URL of the storage to resolve cltl-storage: URLs.
+        pool_size : int
+            Maximum number of connections kept per host.
+        connect_timeout : float
+            Timeout in seconds to establish a connection, None for no timeout.
+        read_timeout : float
+            Timeout in seconds between received bytes, None for no timeout.
+        """
+        self._session = requests.Session()
+        self._http_adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", self._http_adapter)
+        self._session.mount("https://", self._http_adapter)
+        if storage_url:
+            self._session.mount(f"{STORAGE_SCHEME}:", _StorageAdapter(storage_url, self._http_adapter))
+
+        self._timeout = (connect_timeout, read_timeout)
+        self._block_pool = BlockPool()
+
+    def get(self, url: str, params: dict = None) -> requests.Response:
+        return self._session.get(url, params=params, stream=True, timeout=self._timeout)
+
+    @property
+    def block_pool(self) -> BlockPool:
+        """Pool of the frame blocks audio is read into, shared by the audio sources of the session"""
+        return self._block_pool
+
+    def audio_source(self, url: str, offset: int = 0, length: int = -1) -> ClientAudioSource:
+        return PooledAudioSource(self, url, offset, length)
+
+    def close(self):
+        self._session.close()
+
+
+class PooledAudioSource(ClientAudioSource):
+    def __init__(self, session: AudioSession, url: str, offset: int = 0, length: int = -1):
+        """
+        :class:`ClientAudioSource` that obtains its connection from an :class:`AudioSession`.
+
+        Connections of fully consumed responses are returned to the pool of the
+        session when the source is closed. Audio frames are read into blocks from
+        the block pool of the session, the blocks are returned to the pool when
+        the source is closed and the frames must not be used afterwards.
+        """
+        super().__init__(url, None, offset, length)
+        self._session = session
+        self._reader = None
+
+    def __enter__(self):
+        if self._request is not None:
+            raise ValueError("Client is already in use")
+
+        params = None
+        if self._offset or self._length > 0:
+            params = {"offset": self._offset, "length": self._length}
+
+        request = self._session.get(self._url, params)
+        if request.status_code != 200:
+            code = request.status_code
+            text = request.text
+            request.close()
+            raise ValueError(f"Requests to {self._url} with {params} failed ({code}): {text}")
+
+        try:
+            parameters = parse_content_type(request.headers['content-type'])
+        except ValueError:
+            request.close()
+            raise
+
+        self._request = request
+        self._parameters = parameters
+        self._parameters.depth = SAMPLE_DEPTH
+        self._parameters.bytes_per_frame = bytes_per_frame(parameters.frame_size, parameters.channels, SAMPLE_DEPTH)
+
+        logger.debug("Connected to backend at %s (%s)", self._url, self._parameters)
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        super().__exit__(exc_type, exc_val, exc_tb)
+
+    def interrupt(self):
+        """
+        Stop a read of the audio that is pending on another thread, e.g. on cancellation.
+
+        The connection is shut down, such that the audio ends. The source must
+        still be closed by the thread reading it.
+        """
+        request = self._request
+        if request is None:
+            return
+
+        try:
+            # Shutting down a duplicate of the socket applies to the connection of the response
+            with socket.fromfd(request.raw.fileno(), socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, ValueError):
+            # Already closed
+            pass
+
+    @property
+    def audio(self):
+        if not self._request:
+            raise ValueError("No request, call inside a context manager!")
+        if self._reader is not None:
+            raise ValueError("Audio of the source is already in use")
+
+        self._reader = FrameReader(self._request.raw, self.frame_size, self.channels, self._session.block_pool)
+
+        return iter(self._reader)
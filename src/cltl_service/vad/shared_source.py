@@ -0,0 +1,294 @@
+"""
+Shared memory transport of audio between a capture process and the VAD on the same host.
+
+The capture process writes the frames of an audio signal into a ring buffer in
+shared memory with :class:`SharedAudioWriter`, the VAD reads them with
+:class:`SharedMemoryAudioSource` without a round trip through the backend. The
+shared memory segment of a signal is identified by the URL of the signal, see
+:func:`shared_memory_name`.
+
+The reader provides views on the ring buffer instead of copies of the frames.
+The writer does not overwrite the slot of a frame while the reader still holds
+it, until it waited for at most ``max_wait`` seconds. A single reader per signal
+holds frames.
+
+The capture backend in :mod:`app.backend` writes the microphone stream with a
+:class:`SharedAudioWriter` when started with ``--shared_url``, other capture
+processes need to create a writer for the URL of each signal they publish.
+Without a writer the VAD service falls back to HTTP.
+
+Requires Python 3.8 or later.
+"""
+import hashlib
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Iterable, Iterator
+
+import numpy as np
+from cltl.backend.spi.audio import AudioSource
+
+logger = logging.getLogger(__name__)
+
+
+_HEADER_FIELDS = 8
+_WRITTEN, _CLOSED, _RATE, _CHANNELS, _FRAME_SIZE, _CAPACITY, _READER, _RELEASED = range(_HEADER_FIELDS)
+_HEADER_SIZE = _HEADER_FIELDS * np.dtype(np.int64).itemsize
+_DEPTH = 2
+
+# Segments that could not be closed because audio frames still reference them
+_detached = []
+_detached_lock = threading.Lock()
+# Segments created by writers in this process
+_owned = set()
+
+
+def shared_memory_name(url: str) -> str:
+    """
+    Name of the shared memory segment for the audio signal at the given URL.
+    """
+    return "cltl-audio-" + hashlib.sha1(url.encode()).hexdigest()[:16]
+
+
+class SharedAudioWriter:
+    def __init__(self, url: str, rate: int, channels: int, frame_size: int, capacity: int = 1000,
+                 max_wait: float = 1.0):
+        """
+        Write audio frames to a ring buffer in shared memory.
+
+        The writer owns the shared memory segment and removes it when closed.
+        Readers that are still attached can read the remaining frames.
+
+        While a reader is attached, the writer waits for the reader to release
+        the frame in the slot it writes next. If the reader does not release it
+        within max_wait seconds, the frame is overwritten and the reader fails
+        on its next read.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the audio signal.
+        rate : int
+            The sampling rate of the audio.
+        channels : int
+            The number of channels of the audio.
+        frame_size : int
+            The number of samples per frame.
+        capacity : int
+            The number of frames held in the ring buffer.
+        max_wait : float
+            Maximum time in seconds to wait for the reader to release a slot.
+        """
+        self._frame_bytes = frame_size * channels * _DEPTH
+        self._shm = shared_memory.SharedMemory(name=shared_memory_name(url), create=True,
+                                               size=_HEADER_SIZE + capacity * self._frame_bytes)
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        self._data = np.ndarray((capacity, frame_size, channels), dtype=np.int16, buffer=self._shm.buf,
+                                offset=_HEADER_SIZE)
+        self._header[:] = 0
+        self._header[_RATE] = rate
+        self._header[_CHANNELS] = channels
+        self._header[_FRAME_SIZE] = frame_size
+        self._header[_CAPACITY] = capacity
+        self._capacity = capacity
+        self._max_wait = max_wait
+        self._poll_interval = frame_size / rate / 4
+        _owned.add(self._shm.name)
+
+        logger.debug("Created shared audio buffer %s for %s", self._shm.name, url)
+
+    def write(self, frame):
+        """
+        Write the next frame, either as raw bytes or as numpy array.
+        """
+        written = int(self._header[_WRITTEN])
+        self._wait_released(written)
+        slot = self._data[written % self._capacity]
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            slot.reshape(-1).view(np.uint8)[:] = np.frombuffer(frame, dtype=np.uint8, count=self._frame_bytes)
+        else:
+            slot[:] = frame.reshape(slot.shape)
+        # Publish the frame only after it is written
+        self._header[_WRITTEN] = written + 1
+
+    def _wait_released(self, written: int):
+        header = self._header
+        deadline = None
+        while header[_READER] and written - header[_RELEASED] >= self._capacity:
+            if deadline is None:
+                deadline = time.monotonic() + self._max_wait
+            elif time.monotonic() > deadline:
+                logger.warning("Reader of %s did not release frame %s within %s sec, overwriting it",
+                               self._shm.name, written - self._capacity, self._max_wait)
+                return
+            time.sleep(self._poll_interval)
+
+    def close(self):
+        if self._shm is None:
+            return
+
+        self._header[_CLOSED] = 1
+        self._header = None
+        self._data = None
+        self._shm.close()
+        self._shm.unlink()
+        _owned.discard(self._shm.name)
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SharedMemoryAudioSource(AudioSource):
+    @classmethod
+    def for_url(cls, url: str, offset: int = 0, length: int = -1, poll_interval: float = None):
+        """
+        Attach to the shared memory segment of the audio signal at the given URL.
+
+        Raises
+        ------
+        FileNotFoundError
+            If no shared memory segment exists for the URL, e.g. if the audio
+            is captured on a different host.
+        """
+        return cls(shared_memory_name(url), offset, length, poll_interval)
+
+    def __init__(self, name: str, offset: int = 0, length: int = -1, poll_interval: float = None):
+        """
+        Audio source reading from a ring buffer in shared memory written by a :class:`SharedAudioWriter`.
+
+        The frames provided by :attr:`audio` are views on the shared memory. A frame
+        is held while it, or an array derived from it, is referenced, the writer does
+        not reuse its slot in the ring buffer until it is released, see
+        :class:`SharedAudioWriter`. Frames are released in order and when the source
+        is closed.
+
+        Parameters
+        ----------
+        name : str
+            The name of the shared memory segment.
+        offset : int
+            Offset in samples from the start of the signal.
+        length : int
+            Number of samples to read, or -1 to read until the writer is closed.
+        poll_interval : float
+            Interval in seconds to wait for new frames, defaults to half a frame duration.
+        """
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._untrack()
+
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        self._rate = int(self._header[_RATE])
+        self._channels = int(self._header[_CHANNELS])
+        self._frame_size = int(self._header[_FRAME_SIZE])
+        self._capacity = int(self._header[_CAPACITY])
+        self._frame_bytes = self._frame_size * self._channels * _DEPTH
+
+        self._offset = offset
+        self._length = length
+        frame_duration = self._frame_size / self._rate
+        self._poll_interval = poll_interval if poll_interval is not None else frame_duration / 2
+        self._interrupted = threading.Event()
+
+        self._header[_RELEASED] = offset // self._frame_size
+        self._header[_READER] = 1
+
+    def _untrack(self):
+        # The segment is owned by the writer, prevent the resource tracker from removing it on exit
+        if self._shm.name in _owned:
+            return
+
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except Exception:
+            pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def interrupt(self):
+        """
+        Stop waiting for frames, :attr:`audio` ends at the next frame that is not yet written.
+        """
+        self._interrupted.set()
+
+    def close(self):
+        if self._shm is None:
+            return
+
+        self._header[_READER] = 0
+        self._header = None
+        with _detached_lock:
+            _detached.append(self._shm)
+            self._shm = None
+
+            for shm in list(_detached):
+                try:
+                    shm.close()
+                    _detached.remove(shm)
+                except BufferError:
+                    # Audio frames are still in use, retry on the next close
+                    pass
+
+    def __iter__(self) -> Iterator[bytes]:
+        return (frame.tobytes() for frame in self.audio)
+
+    @property
+    def audio(self) -> Iterable[np.ndarray]:
+        if self._shm is None:
+            raise ValueError("Source is closed")
+
+        header, buffer, capacity = self._header, self._shm.buf, self._capacity
+        shape, frame_bytes = (self._frame_size, self._channels), self._frame_bytes
+        position = self._offset // self._frame_size
+        end = position + self._length // self._frame_size if self._length > 0 else None
+        # Buffers of the frames provided that are not yet released, each frame is backed by its own
+        # buffer object, such that it is referenced by the frame and all arrays derived from it
+        held = deque()
+
+        while end is None or position < end:
+            self._release(held, position)
+            written = int(header[_WRITTEN])
+            if position >= written:
+                if header[_CLOSED] or self._interrupted.wait(self._poll_interval):
+                    return
+                continue
+            # The writer overwrites a slot it waited for too long, see SharedAudioWriter
+            if written - position > capacity:
+                raise ValueError(f"Audio frame {position} was overwritten in the shared buffer "
+                                 f"(written: {written}, capacity: {capacity})")
+
+            start = _HEADER_SIZE + (position % capacity) * frame_bytes
+            held.append(buffer[start:start + frame_bytes])
+            position += 1
+            yield np.ndarray(shape, dtype=np.int16, buffer=held[-1])
+
+    def _release(self, held: deque, position: int):
+        # References of a released buffer: the deque and the argument of getrefcount
+        while held and sys.getrefcount(held[0]) <= 2:
+            held.popleft().release()
+        if self._header is not None:
+            self._header[_RELEASED] = position - len(held)
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def channels(self):
+        return self._channels
+
+    @property
+    def frame_size(self):
+        return self._frame_size
+
+    @property
+    def depth(self):
+        return _DEPTH
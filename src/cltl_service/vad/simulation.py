@@ -0,0 +1,394 @@
+"""
+Real-time load simulation of the :class:`~cltl_service.vad.service.VadService`.
+
+Recordings are replayed concurrently through local stand-in audio sources,
+paced at wall-clock speed or accelerated, on a local event bus. The simulation
+reports per signal the latency from the end of each segment in the audio to
+the reception of its event, the real-time factor of the VAD, and the peak
+number of threads and memory of the process.
+
+Usage::
+
+    python -m cltl_service.vad.simulation recording.wav --sessions 8 --speed 1
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, Iterable, Dict, Any, Union
+
+import numpy as np
+from cltl.backend.spi.audio import AudioSource
+from cltl.combot.event.emissor import AudioSignalStarted, AudioSignalStopped
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+from emissor.representation.scenario import AudioSignal
+
+from cltl.vad.api import VAD
+from cltl.vad.factory import DetectorSpec
+from cltl.vad.profiling import PROFILER
+from cltl_service.vad.schema import VadMentionEvent, VadSegmentsEvent
+from cltl_service.vad.service import VadService
+
+logger = logging.getLogger(__name__)
+
+
+REPLAY_SCHEME = "replay"
+
+_MONITOR_INTERVAL = 0.05
+
+
+class Recording:
+    def __init__(self, audio: np.ndarray, rate: int, name: str = None):
+        """
+        Audio recording replayed in the simulation.
+
+        Parameters
+        ----------
+        audio : np.ndarray
+            16bit audio samples of shape (samples, channels).
+        rate : int
+            The sampling rate of the audio.
+        name : str
+            Optional name of the recording.
+        """
+        self.audio = audio if audio.ndim == 2 else audio.reshape((-1, 1))
+        self.rate = rate
+        self.name = name
+
+    @classmethod
+    def load(cls, path: str):
+        import soundfile
+
+        audio, rate = soundfile.read(path, dtype=np.int16, always_2d=True)
+
+        return cls(audio, rate, path)
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / self.rate
+
+
+class ReplayAudioSource(AudioSource):
+    def __init__(self, recording: Recording, start_time: float, speed: float, frame_size: int,
+                 offset: int = 0, length: int = -1):
+        """
+        Audio source that provides the frames of a recording as they become available in real time.
+
+        Parameters
+        ----------
+        recording : Recording
+            The replayed recording.
+        start_time : float
+            Monotonic time at which the replay of the recording started.
+        speed : float
+            Replay speed relative to real time, frames are not paced if 0.
+        frame_size : int
+            Number of samples per frame.
+        offset : int
+            Offset of the first frame in samples.
+        length : int
+            Number of samples provided, until the end of the recording if negative.
+        """
+        self._recording = recording
+        self._start_time = start_time
+        self._speed = speed
+        self._frame_size = frame_size
+        self._offset = offset
+        self._end = len(recording.audio) if length < 0 else min(len(recording.audio), offset + length)
+
+    @property
+    def audio(self) -> Iterable[np.ndarray]:
+        for start in range(self._offset, self._end - self._frame_size + 1, self._frame_size):
+            stop = start + self._frame_size
+            if self._speed > 0:
+                # A frame is available once its last sample was recorded
+                delay = self._start_time + stop / self._recording.rate / self._speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            yield self._recording.audio[start:stop]
+
+    @property
+    def rate(self) -> int:
+        return self._recording.rate
+
+    @property
+    def channels(self) -> int:
+        return self._recording.audio.shape[1]
+
+    @property
+    def frame_size(self) -> int:
+        return self._frame_size
+
+    @property
+    def depth(self) -> int:
+        return 2
+
+
+@dataclass
+class SignalReport:
+    signal_id: str
+    recording: Optional[str]
+    audio_duration: float
+    segments: int = 0
+    latencies: List[float] = field(default_factory=list)
+    real_time_factor: Optional[float] = None
+    completed: bool = False
+
+
+@dataclass
+class SimulationReport:
+    sessions: int
+    speed: float
+    elapsed: float
+    max_threads: int
+    peak_memory: Optional[int]
+    signals: List[SignalReport]
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregated latencies in seconds, real-time factors, peak thread count and
+        peak resident memory of the process in bytes.
+        """
+        latencies = np.array([latency for signal in self.signals for latency in signal.latencies])
+        factors = np.array([signal.real_time_factor for signal in self.signals
+                            if signal.real_time_factor is not None])
+
+        def stats(values):
+            if not len(values):
+                return None
+            return {"mean": float(np.mean(values)), "p50": float(np.percentile(values, 50)),
+                    "p95": float(np.percentile(values, 95)), "max": float(np.max(values))}
+
+        return {
+            "sessions": self.sessions,
+            "speed": self.speed,
+            "elapsed": self.elapsed,
+            "completed": sum(signal.completed for signal in self.signals),
+            "segments": sum(signal.segments for signal in self.signals),
+            "latency": stats(latencies),
+            "real_time_factor": stats(factors),
+            "max_threads": self.max_threads,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class LoadSimulation:
+    def __init__(self, vad: Union[DetectorSpec, VAD], recordings: List[Recording], sessions: int = 1,
+                 speed: float = 1.0, frame_duration: int = 30, max_workers: int = None, stagger: float = 0.0):
+        """
+        Replay recordings concurrently through a :class:`VadService`.
+
+        Only the signals of the simulation are profiled, independent of whether
+        profiling is enabled.
+
+        Parameters
+        ----------
+        vad : Union[DetectorSpec, VAD]
+            The specification of the VAD, from which each worker of the service
+            builds its own instance, or a VAD instance that is safe to be shared
+            by all sessions.
+        recordings : List[Recording]
+            Recordings assigned to the sessions in round-robin order.
+        sessions : int
+            Number of concurrently replayed audio signals.
+        speed : float
+            Replay speed relative to real time, e.g. 2 for twice as fast. If 0,
+            frames are provided as fast as they are consumed.
+        frame_duration : int
+            Duration of the audio frames in milliseconds.
+        max_workers : int
+            Number of signals the service processes concurrently, defaults to the
+            number of sessions.
+        stagger : float
+            Delay in seconds between the start of consecutive sessions.
+        """
+        if not recordings:
+            raise ValueError("No recordings provided")
+
+        self._vad = vad
+        self._recordings = recordings
+        self._sessions = sessions
+        self._speed = speed
+        self._frame_duration = frame_duration
+        self._max_workers = max_workers or sessions
+        self._stagger = stagger
+
+        self._replays = dict()
+        self._received = []
+        self._lock = threading.Lock()
+
+    def run(self, timeout: float = None) -> SimulationReport:
+        """
+        Run the simulation until all signals are processed.
+
+        Parameters
+        ----------
+        timeout : float
+            Maximum time in seconds to wait for processing to complete after the
+            replay of all recordings ended, unlimited if None.
+        """
+        event_bus = SynchronousEventBus()
+        service = VadService("cltl.mic", "cltl.vad", self._vad, self._audio_loader, event_bus, None,
+                             max_workers=self._max_workers)
+        event_bus.subscribe("cltl.vad", self._receive)
+
+        signal_ids = [self._signal_id(session) for session in range(self._sessions)]
+
+        max_threads = threading.active_count()
+        start = time.monotonic()
+        with PROFILER.scope(signal_ids):
+            service.start()
+            try:
+                signals = []
+                for session in range(self._sessions):
+                    signal, end_time = self._start_signal(session, event_bus)
+                    signals.append((signal, end_time))
+                    max_threads = max(max_threads, threading.active_count())
+                    if self._stagger:
+                        time.sleep(self._stagger)
+
+                pending = list(signals)
+                deadline = None
+                while pending or not self._all_completed(signals):
+                    now = time.monotonic()
+                    for signal, end_time in [(signal, end_time) for signal, end_time in pending
+                                             if self._replay_ended(signal, end_time, now)]:
+                        event_bus.publish("cltl.mic", Event.for_payload(AudioSignalStopped.create(signal)))
+                        pending.remove((signal, end_time))
+                    if not pending and deadline is None and timeout is not None:
+                        deadline = now + timeout
+                    if deadline is not None and now > deadline:
+                        logger.warning("Simulation did not complete within %s sec", timeout)
+                        break
+
+                    max_threads = max(max_threads, threading.active_count())
+                    time.sleep(_MONITOR_INTERVAL)
+            finally:
+                service.stop()
+
+        return self._report(signals, time.monotonic() - start, max_threads)
+
+    @staticmethod
+    def _signal_id(session: int) -> str:
+        return f"signal-{session}"
+
+    def _start_signal(self, session: int, event_bus):
+        recording = self._recordings[session % len(self._recordings)]
+        signal_id = self._signal_id(session)
+        url = f"{REPLAY_SCHEME}:{signal_id}"
+        start_time = time.monotonic()
+        with self._lock:
+            self._replays[url] = recording, start_time, signal_id
+
+        signal = AudioSignal.for_scenario("simulation", 0, int(recording.duration * 1000), url,
+                                          len(recording.audio), recording.audio.shape[1], signal_id=signal_id)
+        event_bus.publish("cltl.mic", Event.for_payload(AudioSignalStarted.create(signal)))
+
+        end_time = start_time + recording.duration / self._speed if self._speed > 0 else None
+
+        return signal, end_time
+
+    def _replay_ended(self, signal, end_time: Optional[float], now: float) -> bool:
+        if end_time is not None:
+            return end_time <= now
+
+        # Without pacing the signal ends when all audio is processed
+        profile = PROFILER.get(signal.id)
+        return profile is not None and profile.to_dict()["completed"]
+
+    def _audio_loader(self, url: str, offset: int, length: int) -> AudioSource:
+        with self._lock:
+            recording, start_time, _ = self._replays[url]
+
+        frame_size = recording.rate * self._frame_duration // 1000
+
+        return ReplayAudioSource(recording, start_time, self._speed, frame_size, offset, length)
+
+    def _receive(self, event):
+        received = time.monotonic()
+        payload = event.payload
+        if payload.type == VadMentionEvent.__name__:
+            segments = [(mention.segment[0].container_id, mention.segment[0].stop) for mention in payload.mentions]
+        elif payload.type == VadSegmentsEvent.__name__:
+            segments = [(payload.signal_id, stop) for stop in payload.stops]
+        else:
+            # Interim events
+            return
+
+        with self._lock:
+            self._received.extend((received, signal_id, stop) for signal_id, stop in segments)
+
+    def _all_completed(self, signals) -> bool:
+        return all(self._replay_ended(signal, None, 0) for signal, _ in signals)
+
+    def _report(self, signals, elapsed: float, max_threads: int) -> SimulationReport:
+        replays = {signal_id: (recording, start_time) for recording, start_time, signal_id in self._replays.values()}
+
+        reports = dict()
+        for signal, _ in signals:
+            recording, _ = replays[signal.id]
+            profile = PROFILER.get(signal.id)
+            profile = profile.to_dict() if profile else {}
+            reports[signal.id] = SignalReport(signal.id, recording.name, recording.duration,
+                                              real_time_factor=profile.get("real_time_factor"),
+                                              completed=profile.get("completed", False))
+
+        speed = self._speed if self._speed > 0 else float("inf")
+        for received, signal_id, stop in self._received:
+            recording, start_time = replays[signal_id]
+            report = reports[signal_id]
+            report.segments += 1
+            report.latencies.append(received - (start_time + stop / recording.rate / speed))
+
+        return SimulationReport(self._sessions, self._speed, elapsed, max_threads, _peak_memory(),
+                                list(reports.values()))
+
+
+def _peak_memory() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recordings concurrently through the VAD service")
+    parser.add_argument("recordings", nargs="+", help="WAV files with 16bit audio")
+    parser.add_argument("--sessions", type=int, default=1, help="Number of concurrent signals")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 0 for unpaced")
+    parser.add_argument("--frame-duration", type=int, default=30, help="Frame duration in milliseconds")
+    parser.add_argument("--workers", type=int, default=None, help="Number of signals processed concurrently")
+    parser.add_argument("--stagger", type=float, default=0.0, help="Delay in seconds between session starts")
+    parser.add_argument("--mode", type=int, default=3, help="WebRTC VAD mode")
+    parser.add_argument("--activity-window", type=int, default=250)
+    parser.add_argument("--activity-threshold", type=float, default=0.75)
+    parser.add_argument("--allow-gap", type=int, default=200)
+    parser.add_argument("--padding", type=int, default=200)
+    parser.add_argument("--signals", action="store_true", help="Include per-signal results")
+    args = parser.parse_args()
+
+    vad = DetectorSpec("webrtc", dict(activity_window=args.activity_window,
+                                      activity_threshold=args.activity_threshold,
+                                      allow_gap=args.allow_gap, padding=args.padding, mode=args.mode))
+    recordings = [Recording.load(path) for path in args.recordings]
+
+    simulation = LoadSimulation(vad, recordings, args.sessions, args.speed, args.frame_duration,
+                                args.workers, args.stagger)
+    report = simulation.run()
+
+    result = report.summary()
+    if args.signals:
+        result["signals"] = [asdict(signal) for signal in report.signals]
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
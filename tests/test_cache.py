@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from typing import Iterable
+
+import numpy as np
+
+from cltl.vad.api import VAD
+from cltl.vad.cache import SegmentCache
+
+
+class TestVAD(VAD):
+    def __init__(self, threshold):
+        self._threshold = threshold
+
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        raise NotImplementedError()
+
+    def detect_vad(self, audio_frames: Iterable[np.ndarray], sampling_rate: int, blocking: bool = True,
+                   timeout: int = 0) -> [Iterable[np.ndarray], int, int]:
+        raise NotImplementedError()
+
+
+class TestSegmentCache(unittest.TestCase):
+    def test_key_depends_on_parameters(self):
+        vad = TestVAD(0.5)
+        key = SegmentCache.key("url", vad)
+
+        self.assertEqual(key, SegmentCache.key("url", TestVAD(0.5)))
+        self.assertNotEqual(key, SegmentCache.key("other", vad))
+
+        vad._threshold = 0.6
+        self.assertNotEqual(key, SegmentCache.key("url", vad))
+
+    def test_memory_lru(self):
+        cache = SegmentCache(capacity=2)
+
+        cache.put("a", [(0, 1)])
+        cache.put("b", [(1, 2)])
+        cache.get("a")
+        cache.put("c", [(2, 3)])
+
+        self.assertEqual([(0, 1)], cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual([(2, 3)], cache.get("c"))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            SegmentCache(capacity=1, directory=directory).put("a", [(0, 10), (20, 30)])
+
+            self.assertEqual([(0, 10), (20, 30)], SegmentCache(directory=directory).get("a"))
+
+            SegmentCache(directory=directory).put("b", [])
+            self.assertEqual([], SegmentCache(directory=directory).get("b"))
+
+    def test_sampling_rate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SegmentCache(directory=directory)
+            cache.put("a", [(0, 10)], rate=16000)
+            cache.put("b", [(0, 10)])
+
+            self.assertEqual(([(0, 10)], 16000), cache.entry("a"))
+            self.assertEqual(([(0, 10)], None), cache.entry("b"))
+            self.assertEqual(([(0, 10)], 16000), SegmentCache(directory=directory).entry("a"))
+            self.assertEqual(([(0, 10)], None), SegmentCache(directory=directory).entry("b"))
+            self.assertIsNone(cache.entry("c"))
+
+    def test_disk_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SegmentCache(capacity=1, directory=directory, max_disk_size=1)
+            cache.put("a", [(0, 10)])
+            cache.put("b", [(0, 10)])
+
+            self.assertLessEqual(len(os.listdir(directory)), 1)
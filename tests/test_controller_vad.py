@@ -24,6 +24,9 @@ FRAME_LENGTH = (FRAME_DURATION * SAMPLING_RATE) // 1000
 
 PADDING = 10 * FRAME_DURATION
 
+# Duration in milliseconds of the frames of a single sample used in the tests
+SAMPLE_DURATION = 1000 / SAMPLING_RATE
+
 
 class TestVAD(VAD):
     def detect_vad(self, audio_frames: Iterable[np.ndarray], sampling_rate: int, blocking: bool = True,
@@ -56,9 +59,26 @@ def stop_after(silence: int, vad_length: int, vad: ControllerVAD, stop_latch: Ev
         yield np.zeros((1,1))
 
 
+def activate_after(silence: int, pre_speech: int, speech: int, vad: ControllerVAD, stop_latch: Event):
+    for _ in range(silence):
+        yield np.zeros((1,1))
+
+    for _ in range(pre_speech):
+        yield np.ones((1,1))
+
+    vad.active = True
+    for _ in range(speech):
+        yield np.ones((1,1))
+
+    vad.active = False
+    while not stop_latch.is_set():
+        time.sleep(0.001)
+        yield np.zeros((1,1))
+
+
 class TestVADUtil(unittest.TestCase):
     def test_controller_vad(self):
-        self.vad = ControllerVAD(TestVAD(), 3, min_duration=0)
+        self.vad = ControllerVAD(TestVAD(), 3 * SAMPLE_DURATION, min_duration=0)
         self.vad.active = True
 
         stop_latch = Event()
@@ -74,7 +94,7 @@ class TestVADUtil(unittest.TestCase):
         self.assertEquals(16, len(audio))
 
     def test_controller_vad_no_padding(self):
-        self.vad = ControllerVAD(TestVAD(), 0, min_duration=0)
+        self.vad = ControllerVAD(TestVAD(), 0 * SAMPLE_DURATION, min_duration=0)
         self.vad.active = True
 
         stop_latch = Event()
@@ -90,7 +110,7 @@ class TestVADUtil(unittest.TestCase):
         self.assertEquals(10, len(audio))
 
     def test_controller_vad_no_silence(self):
-        self.vad = ControllerVAD(TestVAD(), 0, min_duration=0)
+        self.vad = ControllerVAD(TestVAD(), 0 * SAMPLE_DURATION, min_duration=0)
         self.vad.active = True
 
         stop_latch = Event()
@@ -106,7 +126,7 @@ class TestVADUtil(unittest.TestCase):
         self.assertEquals(10, len(audio))
 
     def test_controller_vad_silence_less_than_padding(self):
-        self.vad = ControllerVAD(TestVAD(), 10, min_duration=0)
+        self.vad = ControllerVAD(TestVAD(), 10 * SAMPLE_DURATION, min_duration=0)
         self.vad.active = True
 
         stop_latch = Event()
@@ -120,3 +140,61 @@ class TestVADUtil(unittest.TestCase):
         self.assertLessEqual(25, consumed)
         self.assertEquals(0, offset)
         self.assertEquals(25, len(audio))
+
+    def test_controller_vad_pre_roll(self):
+        # 1ms pre-roll are 16 frames of one sample at 16kHz
+        self.vad = ControllerVAD(TestVAD(), 2 * SAMPLE_DURATION, min_duration=0, pre_roll=1)
+
+        stop_latch = Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        result = executor.submit(lambda: self.vad.detect_vad(activate_after(5, 5, 5, self.vad, stop_latch=stop_latch), 16000))
+        time.sleep(0.1)
+        stop_latch.set()
+        audio, offset, consumed = result.result()
+        audio = list(audio)
+
+        self.assertLessEqual(17, consumed)
+        self.assertEqual(3, offset)
+        self.assertEqual(14, len(audio))
+        self.assertEqual(10, sum(frame.sum() for frame in audio))
+
+    def test_controller_vad_without_pre_roll(self):
+        self.vad = ControllerVAD(TestVAD(), 2 * SAMPLE_DURATION, min_duration=0)
+
+        stop_latch = Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        result = executor.submit(lambda: self.vad.detect_vad(activate_after(5, 5, 5, self.vad, stop_latch=stop_latch), 16000))
+        time.sleep(0.1)
+        stop_latch.set()
+        audio, offset, consumed = result.result()
+        audio = list(audio)
+
+        self.assertEqual(10, offset)
+        self.assertEqual(7, len(audio))
+
+    def test_controller_vad_min_duration(self):
+        # 1ms minimum duration are 16 frames of one sample at 16kHz
+        self.vad = ControllerVAD(TestVAD(), 2 * SAMPLE_DURATION, min_duration=1)
+
+        stop_latch = Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        result = executor.submit(lambda: self.vad.detect_vad(activate_after(5, 0, 10, self.vad, stop_latch=stop_latch), 16000))
+        time.sleep(0.1)
+        stop_latch.set()
+        audio, offset, consumed = result.result()
+
+        self.assertEqual(0, len(list(audio)))
+        self.assertLessEqual(0, offset)
+        self.assertLessEqual(15, consumed)
+
+    def test_controller_vad_padding_in_milliseconds(self):
+        # 60ms padding are two frames of 30ms
+        self.vad = ControllerVAD(TestVAD(), 2 * FRAME_DURATION, min_duration=0)
+        self.vad.active = True
+
+        audio = [np.zeros((FRAME_LENGTH,))] * 5 + [np.ones((FRAME_LENGTH,))] * 3
+        speech, offset, consumed = self.vad.detect_vad(audio, SAMPLING_RATE)
+
+        self.assertEqual(3, offset)
+        self.assertEqual(5, len(list(speech)))
+
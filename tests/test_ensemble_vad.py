@@ -0,0 +1,126 @@
+import unittest
+
+import numpy as np
+
+from cltl.vad.cache import SegmentCache
+from cltl.vad.ensemble_vad import EnsembleVAD, FrameDetector, EnergyDetector, WebRtcDetector
+
+
+SAMPLING_RATE = 16000
+FRAME_DURATION = 30
+FRAME_LENGTH = (FRAME_DURATION * SAMPLING_RATE) // 1000
+
+
+class FixedDetector(FrameDetector):
+    def __init__(self, decision: bool, cost: float = 1.0):
+        self.decision = decision
+        self.cost = cost
+        self.calls = 0
+
+    def is_speech(self, mono_frame, pcm, sampling_rate):
+        self.calls += 1
+        return self.decision
+
+
+def frame(amplitude=0, channels=None):
+    shape = (FRAME_LENGTH,) if channels is None else (FRAME_LENGTH, channels)
+    return np.full(shape, amplitude, dtype=np.int16)
+
+
+class TestEnsembleVAD(unittest.TestCase):
+    def test_weighted_vote(self):
+        vad = EnsembleVAD([FixedDetector(True), FixedDetector(False), FixedDetector(False)], weights=[2, 1, 0.5])
+
+        self.assertTrue(vad.is_vad(frame(), SAMPLING_RATE))
+
+        vad = EnsembleVAD([FixedDetector(True), FixedDetector(False), FixedDetector(False)], weights=[1, 1, 1])
+
+        self.assertFalse(vad.is_vad(frame(), SAMPLING_RATE))
+
+    def test_early_exit_skips_expensive_detectors(self):
+        cheap = [FixedDetector(True, cost=0.1), FixedDetector(True, cost=0.1)]
+        expensive = FixedDetector(False, cost=10)
+        vad = EnsembleVAD([expensive] + cheap, vote_threshold=0.6)
+
+        self.assertTrue(vad.is_vad(frame(), SAMPLING_RATE))
+        self.assertEqual(0, expensive.calls)
+
+        cheap = [FixedDetector(False, cost=0.1), FixedDetector(False, cost=0.1)]
+        expensive = FixedDetector(True, cost=10)
+        vad = EnsembleVAD([expensive] + cheap, vote_threshold=0.6)
+
+        self.assertFalse(vad.is_vad(frame(), SAMPLING_RATE))
+        self.assertEqual(0, expensive.calls)
+
+    def test_early_exit_evaluates_undecided_vote(self):
+        expensive = FixedDetector(True, cost=10)
+        vad = EnsembleVAD([expensive, FixedDetector(True, cost=0.1), FixedDetector(False, cost=0.1)])
+
+        self.assertTrue(vad.is_vad(frame(), SAMPLING_RATE))
+        self.assertEqual(1, expensive.calls)
+
+    def test_early_exit_matches_full_vote(self):
+        rng = np.random.default_rng(7)
+        frames = [frame(amplitude) for amplitude in rng.integers(0, 3000, 50)]
+        detectors = [EnergyDetector(-50), EnergyDetector(-30), EnergyDetector(-25), EnergyDetector(-20)]
+        weights = [0.5, 1, 2, 0.7]
+
+        for threshold in [0.2, 0.5, 0.8]:
+            early = EnsembleVAD(detectors, weights, vote_threshold=threshold)
+            full = EnsembleVAD(detectors, weights, vote_threshold=threshold, early_exit=False)
+
+            expected = [full.is_vad(f, SAMPLING_RATE) for f in frames]
+            self.assertEqual(expected, [early.is_vad(f, SAMPLING_RATE) for f in frames])
+            self.assertEqual(expected, early.vote(early.decisions(frames, SAMPLING_RATE)).tolist())
+
+    def test_early_exit_evaluates_stateful_detectors_on_every_frame(self):
+        stateful = FixedDetector(False, cost=10)
+        stateful.stateful = True
+        cheap = [FixedDetector(True, cost=0.1), FixedDetector(True, cost=0.1)]
+        vad = EnsembleVAD([stateful] + cheap, vote_threshold=0.6)
+
+        decisions = [vad.is_vad(frame(), SAMPLING_RATE) for _ in range(5)]
+
+        self.assertEqual([True] * 5, decisions)
+        self.assertEqual(5, stateful.calls)
+        self.assertTrue(WebRtcDetector.stateful)
+        self.assertFalse(EnergyDetector.stateful)
+
+    def test_multichannel_frames(self):
+        vad = EnsembleVAD([EnergyDetector(-40)])
+
+        self.assertTrue(vad.is_vad(frame(1000, channels=2), SAMPLING_RATE))
+        self.assertFalse(vad.is_vad(frame(0, channels=2), SAMPLING_RATE))
+        with self.assertRaises(ValueError):
+            vad.is_vad(frame(1000).astype(np.float32), SAMPLING_RATE)
+
+    def test_webrtc_modes(self):
+        vad = EnsembleVAD([WebRtcDetector(mode) for mode in range(4)] + [EnergyDetector()])
+
+        self.assertFalse(vad.is_vad(frame(), SAMPLING_RATE))
+        self.assertEqual((1, 5), vad.decisions([frame()], SAMPLING_RATE).shape)
+
+    def test_learn_weights(self):
+        labels = np.array([True, False] * 10)
+        decisions = np.stack([labels, ~labels, labels ^ (np.arange(20) % 4 == 0)], axis=1)
+
+        weights = EnsembleVAD.learn_weights(decisions, labels)
+
+        self.assertEqual(0, weights[1])
+        self.assertGreater(weights[0], weights[2])
+        self.assertGreater(weights[2], 0)
+        np.testing.assert_array_equal(labels, EnsembleVAD([FixedDetector(True)] * 3, weights).vote(decisions))
+
+    def test_invalid_weights(self):
+        with self.assertRaises(ValueError):
+            EnsembleVAD([FixedDetector(True)], weights=[1, 1])
+        with self.assertRaises(ValueError):
+            EnsembleVAD([FixedDetector(True)], weights=[0])
+        with self.assertRaises(ValueError):
+            EnsembleVAD([])
+
+    def test_cache_key_depends_on_detectors(self):
+        first = EnsembleVAD([EnergyDetector(-40)])
+        second = EnsembleVAD([EnergyDetector(-30)])
+
+        self.assertNotEqual(SegmentCache.key("signal", first), SegmentCache.key("signal", second))
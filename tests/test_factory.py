@@ -0,0 +1,127 @@
+import pickle
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+
+import numpy as np
+
+from cltl.vad.factory import DetectorSpec, detector, prewarm, MAX_DETECTORS
+from cltl.vad.webrtc_vad import WebRtcVAD
+
+
+class DictConfig:
+    """Configuration section backed by a ConfigParser"""
+    def __init__(self, parser, section):
+        self._parser = parser
+        self._section = section
+
+    def get(self, key):
+        return self._parser.get(self._section, key)
+
+    def get_int(self, key):
+        return self._parser.getint(self._section, key)
+
+    def get_float(self, key):
+        return self._parser.getfloat(self._section, key)
+
+    def get_boolean(self, key):
+        return self._parser.getboolean(self._section, key)
+
+    def __contains__(self, key):
+        return self._parser.has_option(self._section, key)
+
+
+class ConfigManager:
+    def __init__(self, config: str):
+        self._parser = ConfigParser()
+        self._parser.read_string(config)
+
+    def get_config(self, name):
+        return DictConfig(self._parser, name)
+
+
+CONFIG = """
+[cltl.vad.webrtc]
+activity_window: 250
+activity_threshold: 0.75
+allow_gap: 200
+padding: 200
+timeout_clock: audio
+offset_threshold:
+dc_block: True
+unknown: 1
+"""
+
+
+class TestDetectorSpec(unittest.TestCase):
+    def test_from_config(self):
+        spec = DetectorSpec.from_config(ConfigManager(CONFIG))
+
+        self.assertEqual("webrtc", spec.type)
+        self.assertEqual({"activity_window": 250, "activity_threshold": 0.75, "allow_gap": 200, "padding": 200,
+                          "timeout_clock": "audio", "dc_block": True}, spec.parameters)
+
+        vad = spec.build()
+        self.assertIsInstance(vad, WebRtcVAD)
+        self.assertEqual(0.75, vad.parameters["_activity_threshold"])
+
+    def test_qualified_type(self):
+        spec = DetectorSpec("cltl.vad.webrtc_vad.WebRtcVAD", {"mode": 1})
+
+        self.assertIsInstance(spec.build(), WebRtcVAD)
+        self.assertEqual(spec, pickle.loads(pickle.dumps(spec)))
+        self.assertNotEqual(spec, DetectorSpec("webrtc", {"mode": 1}))
+
+    def test_instance_per_thread(self):
+        spec = DetectorSpec("webrtc", {"mode": 2})
+        instance = detector(spec)
+
+        self.assertIs(instance, detector(DetectorSpec("webrtc", {"mode": 2})))
+
+        built = []
+        with ThreadPoolExecutor(max_workers=2, initializer=prewarm, initargs=(spec,)) as executor:
+            barrier = threading.Barrier(2)
+
+            def task():
+                vad = detector(spec)
+                barrier.wait(timeout=5)
+                built.append(vad)
+                return vad.is_vad(np.zeros(480, dtype=np.int16), 16000)
+
+            self.assertEqual([False, False], list(executor.map(lambda _: task(), range(2))))
+
+        self.assertEqual(2, len({id(vad) for vad in built}))
+        self.assertNotIn(instance, built)
+
+    def test_updated(self):
+        spec = DetectorSpec("webrtc", {"mode": 2, "padding": 100})
+        updated = spec.updated({"padding": 200, "allow_gap": 50})
+
+        self.assertEqual({"mode": 2, "padding": 200, "allow_gap": 50}, updated.parameters)
+        self.assertEqual({"mode": 2, "padding": 100}, spec.parameters)
+
+    def test_updated_converts_values(self):
+        spec = DetectorSpec("webrtc").updated({"activity_threshold": 1, "allow_gap": 200.0, "dc_block": True,
+                                               "offset_threshold": None, "timeout_clock": "wall"})
+
+        self.assertEqual({"activity_threshold": 1.0, "allow_gap": 200, "dc_block": True,
+                          "offset_threshold": None, "timeout_clock": "wall"}, spec.parameters)
+        self.assertIsInstance(spec.parameters["activity_threshold"], float)
+
+    def test_updated_rejects_invalid_values(self):
+        spec = DetectorSpec("webrtc")
+
+        for parameters in ({"padding": "200"}, {"activity_threshold": "x"}, {"padding": 2.5},
+                           {"dc_block": 1}, {"padding": None}, {"unknown": 1}):
+            with self.subTest(parameters=parameters), self.assertRaises(ValueError):
+                spec.updated(parameters)
+
+    def test_replaced_instances_are_dropped(self):
+        first = DetectorSpec("webrtc", {"padding": 0})
+        instance = detector(first)
+        for padding in range(1, MAX_DETECTORS + 1):
+            detector(first.updated({"padding": padding}))
+
+        self.assertIsNot(instance, detector(first))
+
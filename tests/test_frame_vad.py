@@ -0,0 +1,248 @@
+import threading
+import time
+import unittest
+import weakref
+
+import numpy as np
+
+from cltl.vad.api import VadTimeout
+from cltl.vad.frame_vad import FrameWiseVAD, WALL_CLOCK, AUDIO_CLOCK
+from cltl.vad.util import Deadline, with_deadline, CancelToken
+
+
+SAMPLING_RATE = 16000
+FRAME_DURATION = 30
+FRAME_LENGTH = (FRAME_DURATION * SAMPLING_RATE) // 1000
+
+
+class DecisionVAD(FrameWiseVAD):
+    """Uses the first sample of a frame as decision"""
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return audio_frame[0] > 0
+
+
+def frames(*decisions):
+    return [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+
+def stalled(audio_frames, release: threading.Event):
+    yield from audio_frames
+    release.wait()
+
+
+class TestFrameWiseVAD(unittest.TestCase):
+    def test_fractional_audio_timeout(self):
+        vad = DecisionVAD(padding=0)
+
+        # 17 frames of 30ms exceed 0.5s only at frame 17
+        speech, offset, consumed = vad.detect_vad(frames(*([0] * 16 + [1, 0])), SAMPLING_RATE, timeout=0.5)
+        self.assertEqual(16, offset)
+        self.assertEqual(1, len(list(speech)))
+
+        with self.assertRaises(VadTimeout):
+            vad.detect_vad(frames(*([0] * 17 + [1, 0])), SAMPLING_RATE, timeout=0.5)
+
+    def test_audio_timeout_ignores_wall_clock(self):
+        vad = DecisionVAD(padding=0, timeout_clock=AUDIO_CLOCK)
+        release = threading.Event()
+        threading.Timer(0.2, release.set).start()
+
+        speech, offset, _ = vad.detect_vad(stalled(frames(0, 1, 0), release), SAMPLING_RATE, timeout=0.1)
+
+        self.assertEqual(1, offset)
+
+    def test_wall_clock_timeout_on_stalled_stream(self):
+        vad = DecisionVAD(padding=0, timeout_clock=WALL_CLOCK)
+        release = threading.Event()
+
+        start = time.monotonic()
+        with self.assertRaises(VadTimeout):
+            vad.detect_vad(stalled(frames(0, 0), release), SAMPLING_RATE, timeout=0.2)
+        release.set()
+
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_wall_clock_timeout_cleared_on_voice_activity(self):
+        vad = DecisionVAD(padding=0, timeout_clock=WALL_CLOCK)
+        release = threading.Event()
+        threading.Timer(0.3, release.set).start()
+
+        speech, offset, consumed = vad.detect_vad(stalled(frames(0, 1, 1), release), SAMPLING_RATE, timeout=0.1)
+
+        self.assertEqual(1, offset)
+        self.assertEqual(2, len(list(speech)))
+
+    def test_max_duration_splits_voice_activity(self):
+        vad = DecisionVAD(padding=0, max_duration=4 * FRAME_DURATION)
+        audio = frames(*([0] * 2 + [1] * 10 + [0] * 2))
+
+        segments = []
+        start = 0
+        while start < len(audio):
+            speech, offset, consumed = vad.detect_vad(iter(audio[start:]), SAMPLING_RATE)
+            speech = list(speech)
+            if speech:
+                segments.append((start + offset, len(speech)))
+            start += consumed
+
+        self.assertEqual([(2, 4), (6, 4), (10, 2)], segments)
+
+    def test_hysteresis_avoids_false_starts(self):
+        # Isolated active frames and a burst of speech with short pauses
+        audio = frames(*([0, 1, 0, 0, 1, 0, 0] + [1, 1, 1, 0, 1, 1, 0, 1, 1, 1] + [0] * 6))
+
+        single = DecisionVAD(activity_window=FRAME_DURATION, activity_threshold=1, padding=0)
+        speech, offset, consumed = single.detect_vad(iter(audio), SAMPLING_RATE)
+        self.assertEqual((1, 1), (offset, len(list(speech))))
+
+        # Onset requires three active frames, continuation half of the last four frames,
+        # such that the segment extends until the offset window drops below the threshold
+        hysteresis = DecisionVAD(activity_window=3 * FRAME_DURATION, activity_threshold=1, padding=0,
+                                 offset_threshold=0.5, offset_window=4 * FRAME_DURATION)
+        speech, offset, consumed = hysteresis.detect_vad(iter(audio), SAMPLING_RATE)
+        self.assertEqual((9, 10), (offset, len(list(speech))))
+
+    def test_frame_counts(self):
+        vad = DecisionVAD(activity_window=90, allow_gap=65, padding=60, max_duration=300, offset_window=120)
+
+        counts = vad.frame_counts(FRAME_DURATION)
+        self.assertEqual((3, 2, 2, 10, 4), counts)
+        self.assertIs(counts, vad.frame_counts(FRAME_DURATION))
+        self.assertEqual((1, 0, 0, 0, 1), DecisionVAD().frame_counts(FRAME_DURATION))
+
+    def test_invalid_timeout_clock(self):
+        with self.assertRaises(ValueError):
+            DecisionVAD(timeout_clock="cpu")
+
+
+class TestDeadline(unittest.TestCase):
+    def test_with_deadline_reads_all_frames(self):
+        deadline = Deadline(10)
+
+        self.assertEqual(list(range(5)), list(with_deadline(range(5), deadline)))
+
+    def test_with_deadline_reads_directly_when_cleared(self):
+        deadline = Deadline(10)
+        threads = []
+
+        def source():
+            for i in range(4):
+                threads.append(threading.current_thread())
+                yield i
+
+        frames_read = []
+        for frame in with_deadline(source(), deadline):
+            frames_read.append(frame)
+            if frame == 1:
+                deadline.clear()
+
+        self.assertEqual(list(range(4)), frames_read)
+        self.assertNotEqual(threading.current_thread(), threads[0])
+        self.assertEqual([threading.current_thread()] * 2, threads[2:])
+
+    def test_with_deadline_stops_pending_read_on_timeout(self):
+        cancel = CancelToken()
+        closed = threading.Event()
+        cancel.on_cancel(closed.set)
+        stopped = threading.Event()
+
+        def source():
+            try:
+                yield 1
+                # Stalled stream, ends when the source is closed
+                closed.wait(5)
+            finally:
+                stopped.set()
+
+        frames_read = []
+        with self.assertRaises(TimeoutError):
+            for frame in with_deadline(source(), Deadline(0.1), cancel):
+                frames_read.append(frame)
+
+        self.assertEqual([1], frames_read)
+        self.assertTrue(cancel.cancelled)
+        self.assertTrue(stopped.is_set())
+
+    def test_detect_vad_cancels_on_wall_clock_timeout(self):
+        vad = DecisionVAD(timeout_clock=WALL_CLOCK)
+        cancel = CancelToken()
+        closed = threading.Event()
+        cancel.on_cancel(closed.set)
+
+        def source():
+            yield from frames(0, 0)
+            closed.wait(5)
+
+        with self.assertRaises(VadTimeout):
+            vad.detect_vad(source(), SAMPLING_RATE, timeout=0.1, cancel=cancel)
+
+        self.assertTrue(closed.is_set())
+
+    def test_with_deadline_propagates_errors(self):
+        def source():
+            yield 1
+            raise ValueError("Broken stream")
+
+        with self.assertRaises(ValueError):
+            list(with_deadline(source(), Deadline(10)))
+
+
+class TestChunkedDetection(unittest.TestCase):
+    def test_chunks_cover_voice_activity(self):
+        vad = DecisionVAD(allow_gap=2 * FRAME_DURATION, padding=FRAME_DURATION)
+        audio = [frame * (i + 1) for i, frame in enumerate(frames(*([0] * 3 + [1] * 5 + [0, 1] + [1] * 4 + [0] * 5)))]
+
+        expected, expected_offset, expected_consumed = vad.detect_vad(iter(audio), SAMPLING_RATE)
+        expected = list(expected)
+
+        chunks = []
+        offset, length, consumed = vad.detect_vad_chunked(
+            iter(audio), SAMPLING_RATE, lambda *chunk: chunks.append(chunk),
+            chunk_duration=4 * FRAME_DURATION, overlap=FRAME_DURATION)
+
+        self.assertEqual((expected_offset, len(expected), expected_consumed), (offset, length, consumed))
+        self.assertEqual([False, False, False, True], [final for _, _, final in chunks])
+        self.assertEqual([offset, offset + 3, offset + 7, offset + 11], [start for start, _, _ in chunks])
+        for start, chunk, _ in chunks:
+            for i, frame in enumerate(chunk):
+                np.testing.assert_array_equal(expected[start - offset + i], frame)
+        self.assertEqual(len(expected), sum(len(chunk) - (1 if start > offset else 0) for start, chunk, _ in chunks))
+
+    def test_no_chunks_before_min_duration(self):
+        vad = DecisionVAD(padding=0, min_duration=3 * FRAME_DURATION)
+
+        chunks = []
+        offset, length, consumed = vad.detect_vad_chunked(
+            frames(1, 1, 0, 0, 1, 1, 1, 1, 0), SAMPLING_RATE, lambda *chunk: chunks.append(chunk),
+            chunk_duration=FRAME_DURATION)
+
+        self.assertEqual((4, 4), (offset, length))
+        self.assertEqual([4, 5, 6, 7], [start for start, _, _ in chunks])
+
+    def test_frames_not_retained(self):
+        vad = DecisionVAD(padding=FRAME_DURATION)
+        references = []
+
+        def speech():
+            for _ in range(300):
+                frame = frames(1)[0]
+                references.append(weakref.ref(frame))
+                yield frame
+
+        retained = []
+        vad.detect_vad_chunked(speech(), SAMPLING_RATE,
+                               lambda *chunk: retained.append(sum(ref() is not None for ref in references)),
+                               chunk_duration=2 * FRAME_DURATION, overlap=FRAME_DURATION)
+
+        self.assertEqual(150, len(retained))
+        self.assertLessEqual(max(retained), 5)
+
+    def test_no_voice_activity(self):
+        vad = DecisionVAD(padding=0)
+
+        chunks = []
+        result = vad.detect_vad_chunked(frames(0, 0, 0), SAMPLING_RATE, lambda *chunk: chunks.append(chunk),
+                                        chunk_duration=FRAME_DURATION)
+
+        self.assertEqual((-1, 0, 3), result)
+        self.assertEqual([], chunks)
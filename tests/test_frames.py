@@ -0,0 +1,222 @@
+import io
+import threading
+import unittest
+
+import numpy as np
+
+from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.frames import BlockPool, FrameBlock, FrameReader, audio_content_type, parse_content_type
+
+
+class ShortReads(io.RawIOBase):
+    """Stream returning at most `chunk` bytes per read"""
+    def __init__(self, data: bytes, chunk: int):
+        self._data = io.BytesIO(data)
+        self._chunk = chunk
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._data.read(min(len(b), self._chunk))
+        b[:len(data)] = data
+
+        return len(data)
+
+
+class DecisionVAD(FrameWiseVAD):
+    """Uses the first sample of a frame as decision"""
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return audio_frame[0, 0] > 0
+
+
+class TestContentType(unittest.TestCase):
+    def test_parse_content_type(self):
+        parameters = parse_content_type(audio_content_type(16000, 2, 480))
+
+        self.assertEqual(16000, parameters.rate)
+        self.assertEqual(2, parameters.channels)
+        self.assertEqual(480, parameters.frame_size)
+
+    def test_parse_invalid_content_type(self):
+        with self.assertRaises(ValueError):
+            parse_content_type("audio/wav; rate=16000; channels=1; frame_size=480")
+        with self.assertRaises(ValueError):
+            parse_content_type("audio/L16; rate=16000")
+
+
+class TestFrameBlock(unittest.TestCase):
+    def test_slots(self):
+        block = FrameBlock(4, 16, 1)
+
+        with self.assertRaises(AttributeError):
+            block.other = 1
+
+    def test_buffer_is_view_on_data(self):
+        block = FrameBlock(2, 4, 1)
+        block.buffer[:2] = np.array([7], dtype=np.int16).tobytes()
+
+        self.assertEqual(7, block.data[0, 0, 0])
+        self.assertEqual(16, len(block.buffer))
+
+
+class TestBlockPool(unittest.TestCase):
+    def test_reuse_released_blocks(self):
+        pool = BlockPool(block_frames=4)
+        block = pool.acquire(16, 2)
+        block.count = 3
+        block.release()
+
+        reused = pool.acquire(16, 2)
+        self.assertIs(block, reused)
+        self.assertEqual(0, reused.count)
+        self.assertIsNot(block, pool.acquire(16, 2))
+        self.assertEqual((4, 8, 1), pool.acquire(8, 1).data.shape)
+
+    def test_max_free(self):
+        pool = BlockPool(block_frames=4, max_free=1)
+        blocks = [pool.acquire(16, 1) for _ in range(3)]
+        for block in blocks:
+            block.release()
+
+        self.assertEqual(1, pool.free_blocks())
+
+    def test_concurrent_acquire(self):
+        pool = BlockPool(block_frames=2)
+        acquired = []
+
+        def acquire():
+            for _ in range(100):
+                block = pool.acquire(16, 1)
+                acquired.append(id(block))
+                block.release()
+
+        threads = [threading.Thread(target=acquire) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(400, len(acquired))
+        self.assertLessEqual(pool.free_blocks(), 4)
+
+
+class TestFrameReader(unittest.TestCase):
+    def test_read_frames_from_short_chunks(self):
+        audio = np.arange(10 * 16 * 2, dtype=np.int16).reshape((10, 16, 2))
+        data = audio.tobytes() + b'\x00' * 7
+        pool = BlockPool(block_frames=4)
+
+        with FrameReader(ShortReads(data, 13), 16, 2, pool, offset=32) as reader:
+            frames = list(reader)
+
+            self.assertEqual(10, len(frames))
+            np.testing.assert_array_equal(audio, np.stack(frames))
+            self.assertEqual([32, 96, 160], [block.offset for block in reader.blocks])
+            self.assertEqual([4, 4, 2], [block.count for block in reader.blocks])
+
+        self.assertEqual(3, pool.free_blocks())
+        self.assertEqual([], reader.blocks)
+
+    def test_blocks_reused_by_next_reader(self):
+        audio = np.arange(4 * 8, dtype=np.int16).reshape((4, 8, 1))
+        pool = BlockPool(block_frames=4)
+
+        with FrameReader(io.BytesIO(audio.tobytes()), 8, 1, pool) as reader:
+            first = list(reader)
+        allocated = pool.free_blocks()
+
+        with FrameReader(io.BytesIO((-audio).tobytes()), 8, 1, pool) as reader:
+            second = list(reader)
+
+        self.assertTrue(np.shares_memory(first[0], second[0]))
+        np.testing.assert_array_equal(-audio, np.stack(second))
+        self.assertEqual(allocated, pool.free_blocks())
+
+    def test_release_unreferenced_blocks_while_reading(self):
+        audio = np.arange(100 * 8, dtype=np.int16).reshape((100, 8, 1))
+        pool = BlockPool(block_frames=4)
+
+        with FrameReader(io.BytesIO(audio.tobytes()), 8, 1, pool) as reader:
+            frames = iter(reader)
+            retained = next(frames)
+            held = []
+            for frame in frames:
+                # Retain only the last frame, as e.g. a VAD holding padding
+                held = [frame]
+                self.assertLessEqual(len(reader.blocks), 3)
+
+            self.assertEqual(0, retained[0, 0])
+            self.assertEqual(audio[-1].tolist(), held[0].tolist())
+            self.assertEqual(0, reader.blocks[0].offset)
+
+        self.assertLessEqual(pool.free_blocks(), 4)
+
+    def test_chunked_detection_releases_blocks(self):
+        # 1000 frames of 10ms of speech
+        audio = np.ones((1000, 160, 1), dtype=np.int16)
+        pool = BlockPool(block_frames=4)
+        vad = DecisionVAD(padding=20)
+
+        with FrameReader(io.BytesIO(audio.tobytes()), 160, 1, pool) as reader:
+            blocks = []
+            offset, length, consumed = vad.detect_vad_chunked(
+                iter(reader), 16000, lambda *chunk: blocks.append(len(reader.blocks)), chunk_duration=30, overlap=10)
+
+        self.assertEqual((0, 1000, 1000), (offset, length, consumed))
+        self.assertLessEqual(max(blocks), 4)
+
+    def test_in_use(self):
+        block = BlockPool(block_frames=2).acquire(8, 1)
+        self.assertFalse(block.in_use)
+
+        frame = block.data[0]
+        self.assertTrue(block.in_use)
+
+        del frame
+        self.assertFalse(block.in_use)
+
+    def test_in_use_with_derived_views(self):
+        derived_views = {
+            "frombuffer": lambda frame: np.frombuffer(frame.data, dtype=np.int16),
+            "memoryview": lambda frame: memoryview(frame).cast('B'),
+            "slice": lambda frame: frame[:, 0],
+            "view": lambda frame: frame.view(np.uint8),
+        }
+        for name, derive in derived_views.items():
+            with self.subTest(name):
+                block = BlockPool(block_frames=2).acquire(8, 1)
+                derived = derive(block.data[0])
+                self.assertTrue(block.in_use)
+
+                del derived
+                self.assertFalse(block.in_use)
+
+    def test_buffer_slices_not_tracked(self):
+        block = BlockPool(block_frames=2).acquire(8, 1)
+
+        raw = block.buffer[:16]
+        self.assertFalse(block.in_use)
+        raw.release()
+
+    def test_derived_view_retains_block(self):
+        audio = np.arange(64 * 8, dtype=np.int16).reshape((64, 8, 1))
+        pool = BlockPool(block_frames=2)
+
+        with FrameReader(io.BytesIO(audio.tobytes()), 8, 1, pool) as reader:
+            frames = iter(reader)
+            # Retain the first frame only through a derived buffer
+            retained = np.frombuffer(next(frames).data, dtype=np.int16)
+            for _ in frames:
+                pass
+
+            self.assertEqual(audio[0].ravel().tolist(), retained.tolist())
+            self.assertEqual(0, reader.blocks[0].offset)
+
+    def test_without_pool(self):
+        audio = np.arange(3 * 8, dtype=np.int16).reshape((3, 8, 1))
+
+        with FrameReader(io.BytesIO(audio.tobytes()), 8, 1) as reader:
+            frames = list(reader)
+
+        np.testing.assert_array_equal(audio, np.stack(frames))
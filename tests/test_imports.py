@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+IMPORT_BUDGET = 0.5
+"""Maximum time in seconds to import the VAD implementations, excluding numpy"""
+
+CORE_MODULES = ["cltl.vad.api", "cltl.vad.util", "cltl.vad.frame_vad", "cltl.vad.webrtc_vad",
+                "cltl.vad.controller_vad", "cltl.vad.keyword_vad", "cltl.vad.segmentation"]
+
+OPTIONAL_MODULES = ["sounddevice", "soundfile", "webrtcvad", "pkg_resources", "cltl.combot"]
+
+IMPORT_SCRIPT = f"""
+import importlib, json, sys, time
+import numpy
+start = time.perf_counter()
+for module in {CORE_MODULES!r}:
+    importlib.import_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {OPTIONAL_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+class TestImports(unittest.TestCase):
+    def test_import_without_optional_dependencies(self):
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([src, os.environ.get("PYTHONPATH", "")]))
+
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        self.assertEqual([], result["loaded"])
+        self.assertLess(result["elapsed"], IMPORT_BUDGET)
@@ -0,0 +1,80 @@
+import unittest
+from typing import Iterable
+
+import numpy as np
+
+from cltl.vad.api import VAD
+from cltl.vad.keyword_vad import KeywordSpotter, KeywordVAD, TemplateKeywordSpotter
+
+
+class TestVAD(VAD):
+    def detect_vad(self, audio_frames: Iterable[np.ndarray], sampling_rate: int, blocking: bool = True,
+                   timeout: int = 0) -> [Iterable[np.ndarray], int, int]:
+        raise NotImplementedError()
+
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return np.amax(audio_frame) > 0
+
+
+class CountingVAD(TestVAD):
+    def __init__(self):
+        self.calls = []
+
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        self.calls.append(id(audio_frame))
+
+        return np.amax(audio_frame) == 1
+
+
+class TestSpotter(KeywordSpotter):
+    def is_keyword(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return np.amax(audio_frame) == 2
+
+
+# Duration in milliseconds of the frames of a single sample used in the tests
+SAMPLE_DURATION = 1000 / 16000
+
+
+def frames(*values):
+    return [np.full((1, 1), value) for value in values]
+
+
+class TestKeywordVAD(unittest.TestCase):
+    def test_keyword_activates_vad(self):
+        # 1ms are 16 frames of one sample at 16kHz
+        vad = KeywordVAD(TestVAD(), TestSpotter(), SAMPLE_DURATION, pre_roll=1, silence=1)
+
+        audio = frames(*([0] * 5 + [1, 2] + [1] * 5 + [0] * 20))
+        speech, offset, consumed = vad.detect_vad(audio, 16000)
+        speech = list(speech)
+
+        self.assertEqual(4, offset)
+        self.assertEqual(1 + 7 + 15 + 1, len(speech))
+        self.assertFalse(vad.active)
+
+    def test_one_decision_per_frame(self):
+        counting = CountingVAD()
+        vad = KeywordVAD(counting, TestSpotter(), SAMPLE_DURATION, pre_roll=1, silence=1)
+
+        audio = frames(*([0] * 5 + [2] + [0] * 3 + [1] * 5 + [0] * 20))
+        speech, offset, consumed = vad.detect_vad(audio, 16000)
+
+        self.assertEqual(8, offset)
+        self.assertEqual(len(counting.calls), len(set(counting.calls)))
+
+    def test_no_keyword(self):
+        vad = KeywordVAD(TestVAD(), TestSpotter(), SAMPLE_DURATION, pre_roll=1, silence=1)
+
+        speech, offset, consumed = vad.detect_vad(frames(*([0] * 5 + [1] * 5 + [0] * 5)), 16000)
+
+        self.assertEqual(0, len(list(speech)))
+        self.assertEqual(-1, offset)
+        self.assertEqual(15, consumed)
+
+    def test_template_spotter(self):
+        keyword = frames(100, 1000, 10, 1000)
+        spotter = TemplateKeywordSpotter(keyword, threshold=0.9)
+
+        detected = [spotter.is_keyword(frame, 16000) for frame in frames(0, 0, 0) + keyword + frames(0, 0)]
+
+        self.assertEqual([False] * 6 + [True] + [False] * 2, detected)
@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+
+from cltl.vad.lookback import LookbackBuffer, LookbackBuffers
+
+
+class TestLookbackBuffer(unittest.TestCase):
+    def test_read_retained_audio(self):
+        buffer = LookbackBuffer(10, rate=16000)
+        samples = np.arange(25, dtype=np.int16)
+        for offset in range(0, 25, 4):
+            buffer.write(offset, samples[offset:offset + 4])
+
+        self.assertEqual((15, 25), buffer.range)
+        np.testing.assert_array_equal(samples[15:25], buffer.read(15, 25))
+        np.testing.assert_array_equal(samples[18:21], buffer.read(18, 21))
+        self.assertEqual(0, len(buffer.read(20, 20)))
+
+        with self.assertRaises(ValueError):
+            buffer.read(14, 20)
+        with self.assertRaises(ValueError):
+            buffer.read(20, 26)
+
+    def test_overlapping_writes(self):
+        buffer = LookbackBuffer(8)
+        samples = np.arange(12, dtype=np.int16)
+
+        buffer.write(0, samples[:6])
+        buffer.write(4, samples[4:10])
+        buffer.write(2, samples[2:5])
+
+        self.assertEqual((2, 10), buffer.range)
+        np.testing.assert_array_equal(samples[2:10], buffer.read(2, 10))
+
+    def test_discontinuity(self):
+        buffer = LookbackBuffer(8)
+        buffer.write(0, np.ones(4, dtype=np.int16))
+        buffer.write(10, np.full(2, 2, dtype=np.int16))
+
+        self.assertEqual((10, 12), buffer.range)
+        np.testing.assert_array_equal([2, 2], buffer.read(10, 12))
+
+    def test_write_exceeding_capacity(self):
+        buffer = LookbackBuffer(4)
+        buffer.write(0, np.arange(10, dtype=np.int16))
+
+        self.assertEqual((6, 10), buffer.range)
+        np.testing.assert_array_equal([6, 7, 8, 9], buffer.read(6, 10))
+
+    def test_multichannel(self):
+        buffer = LookbackBuffer(6)
+        frames = np.arange(20, dtype=np.int16).reshape(10, 2)
+        buffer.write(0, frames[:5])
+        buffer.write(5, frames[5:])
+
+        self.assertEqual(2, buffer.channels)
+        np.testing.assert_array_equal(frames[4:10], buffer.read(4, 10))
+
+
+class TestLookbackBuffers(unittest.TestCase):
+    def test_signal_retention(self):
+        buffers = LookbackBuffers(0.5, max_signals=2)
+        first = buffers.buffer("first", 100)
+
+        self.assertIs(first, buffers.buffer("first", 100))
+        buffers.buffer("second", 100)
+        buffers.buffer("third", 100)
+
+        self.assertIsNone(buffers.get("first"))
+        self.assertEqual(100, buffers.get("third").rate)
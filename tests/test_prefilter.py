@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+
+from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.prefilter import IIRFilter, FilterStream, prefilter, dc_blocker, highpass
+
+
+SAMPLING_RATE = 16000
+FRAME_LENGTH = 480
+
+
+def lfilter(b, a, x, state):
+    """Reference implementation of a transposed direct form II filter"""
+    b, a = np.asarray(b, dtype=float) / a[0], np.asarray(a, dtype=float) / a[0]
+    z = np.array(state, dtype=float)
+    y = np.empty(len(x))
+    for n, sample in enumerate(x):
+        y[n] = b[0] * sample + z[0]
+        for i in range(len(z)):
+            z[i] = b[i + 1] * sample - a[i + 1] * y[n] + (z[i + 1] if i + 1 < len(z) else 0)
+
+    return y
+
+
+class EnergyVAD(FrameWiseVAD):
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return np.abs(audio_frame.astype(np.float64)).mean() > 500
+
+
+class TestPrefilter(unittest.TestCase):
+    def test_block_filter_equals_reference(self):
+        (dc_b, dc_a), (hp_b, hp_a) = dc_blocker(), highpass(100, SAMPLING_RATE)
+        b, a = np.convolve(dc_b, hp_b), np.convolve(dc_a, hp_a)
+        iir_filter = IIRFilter.cascade((dc_b, dc_a), (hp_b, hp_a))
+        signal = np.random.default_rng(1).integers(-3000, 3000, 4 * FRAME_LENGTH).astype(np.int16)
+
+        stream = FilterStream(iir_filter)
+        filtered = np.concatenate([stream.process(frame).copy() for frame in np.split(signal, 4)])
+
+        expected = lfilter(b, a, signal, iir_filter.steady_state(signal[0]))
+        np.testing.assert_allclose(expected, filtered, atol=1)
+
+    def test_dc_offset_is_removed(self):
+        iir_filter = prefilter(SAMPLING_RATE, dc_block=True)
+        tone = 1000 * np.sin(2 * np.pi * 440 * np.arange(20 * FRAME_LENGTH) / SAMPLING_RATE)
+        signal = (tone + 4000).astype(np.int16)
+
+        stream = FilterStream(iir_filter)
+        filtered = [stream.process(frame).copy() for frame in np.split(signal, 20)]
+
+        self.assertLess(abs(np.mean(filtered[-1])), 50)
+        self.assertGreater(np.std(filtered[-1]), 600)
+
+    def test_hum_is_suppressed(self):
+        iir_filter = prefilter(SAMPLING_RATE, highpass_cutoff=150)
+        time = np.arange(20 * FRAME_LENGTH) / SAMPLING_RATE
+        hum = (3000 * np.sin(2 * np.pi * 50 * time)).astype(np.int16)
+        voice = (3000 * np.sin(2 * np.pi * 1000 * time)).astype(np.int16)
+
+        self.assertLess(np.std(FilterStream(iir_filter).process(hum)[-FRAME_LENGTH:]), 500)
+        self.assertGreater(np.std(FilterStream(iir_filter).process(voice)[-FRAME_LENGTH:]), 1800)
+
+    def test_multichannel_frames_reuse_buffers(self):
+        iir_filter = prefilter(SAMPLING_RATE, dc_block=True, highpass_cutoff=100)
+        frames = np.random.default_rng(2).integers(-1000, 1000, (3, FRAME_LENGTH, 2)).astype(np.int16)
+
+        stream = FilterStream(iir_filter)
+        first = stream.process(frames[0])
+        filtered = [first.copy()] + [stream.process(frame).copy() for frame in frames[1:]]
+
+        self.assertTrue(np.shares_memory(first, stream.process(frames[0])))
+        for channel in range(2):
+            mono = FilterStream(iir_filter)
+            expected = [mono.process(np.ascontiguousarray(frame[:, channel])).copy() for frame in frames]
+            np.testing.assert_array_equal(np.concatenate(expected),
+                                          np.concatenate([frame[:, channel] for frame in filtered]))
+
+    def test_no_filter(self):
+        self.assertIsNone(prefilter(SAMPLING_RATE))
+        with self.assertRaises(ValueError):
+            prefilter(SAMPLING_RATE, highpass_cutoff=SAMPLING_RATE)
+
+    def test_frame_wise_vad_with_dc_offset(self):
+        signal = np.concatenate([np.full(10 * FRAME_LENGTH, 2000),
+                                 2000 + 3000 * np.sin(2 * np.pi * 300 * np.arange(5 * FRAME_LENGTH) / SAMPLING_RATE),
+                                 np.full(10 * FRAME_LENGTH, 2000)]).astype(np.int16)
+        frames = np.split(signal, 25)
+
+        speech, offset, _ = EnergyVAD(padding=0).detect_vad(iter(frames), SAMPLING_RATE)
+        self.assertEqual(0, offset)
+
+        speech, offset, _ = EnergyVAD(padding=0, dc_block=True).detect_vad(iter(frames), SAMPLING_RATE)
+        self.assertEqual(10, offset)
+        # The detected audio is not filtered
+        np.testing.assert_array_equal(np.concatenate(frames[10:15]), np.concatenate(list(speech)))
@@ -0,0 +1,101 @@
+import unittest
+
+import numpy as np
+
+from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.profiling import Profiler, PROFILER
+
+
+SAMPLING_RATE = 16000
+FRAME_DURATION = 30
+FRAME_LENGTH = (FRAME_DURATION * SAMPLING_RATE) // 1000
+
+
+class DecisionVAD(FrameWiseVAD):
+    """Uses the first sample of a frame as decision"""
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return audio_frame[0] > 0
+
+
+def frames(*decisions):
+    return [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler()
+
+        self.assertIsNone(profiler.start("signal"))
+        self.assertIsNone(profiler.current())
+        with profiler.stage("stage"):
+            pass
+        profiler.end()
+
+        self.assertIsNone(profiler.get("signal"))
+
+    def test_stages(self):
+        profiler = Profiler(enabled=True)
+
+        profile = profiler.start("signal")
+        with profiler.stage("stage"):
+            pass
+        with profiler.stage("stage"):
+            pass
+        profile.add_audio(2.0)
+        profiler.end()
+
+        profile = profiler.get("signal").to_dict()
+        self.assertEqual(2, profile["stages"]["stage"]["count"])
+        self.assertTrue(profile["completed"])
+        self.assertEqual(2.0, profile["audio"])
+        self.assertLess(profile["real_time_factor"], 1)
+
+    def test_scope(self):
+        profiler = Profiler()
+
+        with profiler.scope(["signal"]):
+            self.assertIsNone(profiler.start("other"))
+            profiler.end()
+
+            profiler.start("signal")
+            with profiler.stage("stage"):
+                pass
+            profiler.end()
+
+        self.assertIsNone(profiler.start("signal"))
+        self.assertFalse(profiler.enabled)
+        self.assertIsNone(profiler.get("other"))
+        self.assertEqual(1, profiler.get("signal").to_dict()["stages"]["stage"]["count"])
+
+    def test_capacity(self):
+        profiler = Profiler(enabled=True, capacity=2)
+
+        for signal_id in ("1", "2", "3"):
+            profiler.start(signal_id)
+            profiler.end()
+
+        self.assertIsNone(profiler.get("1"))
+        self.assertIsNotNone(profiler.get("3"))
+
+
+class TestFrameWiseVADProfiling(unittest.TestCase):
+    def setUp(self):
+        PROFILER.enabled = True
+
+    def tearDown(self):
+        PROFILER.enabled = False
+        PROFILER.end()
+
+    def test_detection_stages(self):
+        vad = DecisionVAD(padding=0)
+
+        PROFILER.start("signal")
+        speech, offset, consumed = vad.detect_vad(frames(0, 1, 1, 0, 0), SAMPLING_RATE)
+        PROFILER.end()
+
+        profile = PROFILER.get("signal").to_dict()
+        self.assertEqual(5, profile["stages"]["is_vad"]["count"])
+        self.assertEqual(5, profile["stages"]["detection"]["count"])
+        self.assertIn("read", profile["stages"])
+        self.assertAlmostEqual(consumed * FRAME_DURATION / 1000, profile["audio"])
+        self.assertIsNotNone(profile["real_time_factor"])
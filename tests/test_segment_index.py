@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+
+from cltl.vad.segment_index import SegmentIndex, SegmentIndexes
+
+
+class TestSegmentIndex(unittest.TestCase):
+    def test_query(self):
+        index = SegmentIndex(capacity=2)
+        for start in range(0, 1000, 10):
+            index.append(start, start + 5, start / 1000)
+
+        self.assertEqual(100, len(index))
+
+        starts, ends, scores = index.query(12, 31)
+        np.testing.assert_array_equal([10, 20, 30], starts)
+        np.testing.assert_array_equal([15, 25, 35], ends)
+        np.testing.assert_allclose([0.01, 0.02, 0.03], scores)
+
+        starts, _, _ = index.query(15, 20)
+        self.assertEqual(0, len(starts))
+
+        starts, _, _ = index.query(980)
+        np.testing.assert_array_equal([980, 990], starts)
+
+    def test_latest(self):
+        index = SegmentIndex(rate=100)
+        for start in range(0, 1000, 10):
+            index.append(start, start + 5)
+
+        starts, _, _ = index.latest(0.2)
+        np.testing.assert_array_equal([980, 990], starts)
+
+        with self.assertRaises(ValueError):
+            SegmentIndex().latest(1)
+
+    def test_retention(self):
+        index = SegmentIndex(max_segments=10, capacity=4)
+        for start in range(0, 1000, 10):
+            index.append(start, start + 5)
+
+        self.assertEqual(10, len(index))
+        self.assertLessEqual(len(index._starts), 32)
+        starts, _, _ = index.query()
+        np.testing.assert_array_equal(np.arange(900, 1000, 10), starts)
+
+    def test_append_out_of_order(self):
+        index = SegmentIndex()
+        index.append(10, 20)
+
+        with self.assertRaises(ValueError):
+            index.append(5, 25)
+
+
+class TestSegmentIndexes(unittest.TestCase):
+    def test_signal_retention(self):
+        indexes = SegmentIndexes(max_signals=2, max_segments=1)
+        indexes.add("first", [(0, 10)])
+        indexes.add("second", [(0, 10), (20, 30)], rate=16000)
+        indexes.add("first", [(20, 30)])
+        indexes.add("third", [(0, 10)])
+
+        self.assertEqual({"first": 1, "third": 1}, indexes.signals())
+        self.assertIsNone(indexes.get("second"))
+        starts, _, _ = indexes.get("first").query()
+        np.testing.assert_array_equal([20], starts)
+
+    def test_discard(self):
+        indexes = SegmentIndexes()
+        indexes.add("signal", [(0, 10), (20, 30)])
+        indexes.discard("signal")
+        indexes.discard("unknown")
+
+        self.assertIsNone(indexes.get("signal"))
+
+        indexes.add("signal", [(0, 10)])
+        self.assertEqual({"signal": 1}, indexes.signals())
@@ -0,0 +1,159 @@
+import itertools
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from cltl.vad.decisions import FrameDecisions
+from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.segmentation import SegmentationParameters, replay_segments, sweep
+
+
+SAMPLING_RATE = 16000
+FRAME_DURATION = 30
+FRAME_LENGTH = (FRAME_DURATION * SAMPLING_RATE) // 1000
+
+
+class DecisionVAD(FrameWiseVAD):
+    """Uses the first sample of a frame as decision"""
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return audio_frame[0] > 0
+
+
+PARAMETERS = [
+    # activity_window, activity_threshold, allow_gap, padding, min_duration
+    [window * FRAME_DURATION, threshold, gap * FRAME_DURATION, padding * FRAME_DURATION, duration * FRAME_DURATION]
+    for window, threshold, gap, padding, duration in itertools.product([1, 4], [0.5, 0.75, 1], [0, 3], [0, 2, 10], [0, 3])
+]
+
+
+def detect_all(vad, frames):
+    segments = []
+    start = 0
+    while True:
+        speech, offset, consumed = vad.detect_vad(iter(frames[start:]), SAMPLING_RATE)
+        speech = list(speech)
+        if speech:
+            segments.append((start + offset, len(speech)))
+        if consumed == 0:
+            return segments
+        start += consumed
+
+
+def random_decisions(seed, length=400):
+    # Bursts of activity with random gaps
+    random = np.random.default_rng(seed)
+    runs = random.integers(1, 15, size=length)
+    values = np.arange(len(runs)) % 2 == 1
+    decisions = np.repeat(values, runs)[:length]
+
+    return decisions ^ (random.random(length) < 0.05)
+
+
+class TestSegmentation(unittest.TestCase):
+    @parameterized.expand(PARAMETERS)
+    def test_replay_equals_detect_vad(self, activity_window, activity_threshold, allow_gap, padding, min_duration):
+        parameters = SegmentationParameters(activity_window, activity_threshold, allow_gap, padding, min_duration)
+        vad = DecisionVAD(activity_window, activity_threshold, allow_gap, padding, min_duration)
+
+        for seed in range(5):
+            decisions = random_decisions(seed)
+            frames = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+            expected = detect_all(vad, frames)
+            actual = replay_segments(decisions, FRAME_DURATION, parameters)
+
+            self.assertEqual(expected, actual)
+
+    @parameterized.expand([
+        (7 * FRAME_DURATION, 0.6, 50, 45, 100),
+        (200, 0.3, 100, 500, 0),
+        (FRAME_DURATION, 1, 29, 31, 61),
+    ])
+    def test_replay_equals_detect_vad_unaligned(self, activity_window, activity_threshold, allow_gap, padding,
+                                                min_duration):
+        parameters = SegmentationParameters(activity_window, activity_threshold, allow_gap, padding, min_duration)
+        vad = DecisionVAD(activity_window, activity_threshold, allow_gap, padding, min_duration)
+
+        decisions = random_decisions(7, length=2000)
+        frames = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+        self.assertEqual(detect_all(vad, frames), replay_segments(decisions, FRAME_DURATION, parameters))
+
+    @parameterized.expand([
+        (FRAME_DURATION, 1, 0, 0, 0, 5 * FRAME_DURATION),
+        (4 * FRAME_DURATION, 0.5, 3 * FRAME_DURATION, 2 * FRAME_DURATION, 0, 10 * FRAME_DURATION),
+        (4 * FRAME_DURATION, 0.75, 100, 10 * FRAME_DURATION, 3 * FRAME_DURATION, 12 * FRAME_DURATION),
+        (FRAME_DURATION, 0.5, 3 * FRAME_DURATION, 2 * FRAME_DURATION, 0, 10),
+    ])
+    def test_replay_with_max_duration(self, activity_window, activity_threshold, allow_gap, padding, min_duration,
+                                      max_duration):
+        parameters = SegmentationParameters(activity_window, activity_threshold, allow_gap, padding, min_duration,
+                                            max_duration)
+        vad = DecisionVAD(activity_window, activity_threshold, allow_gap, padding, min_duration,
+                          max_duration=max_duration)
+
+        for seed in range(5):
+            decisions = random_decisions(seed)
+            frames = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+            self.assertEqual(detect_all(vad, frames), replay_segments(decisions, FRAME_DURATION, parameters))
+
+    @parameterized.expand([
+        (FRAME_DURATION, 1, 0, 0, 0, 0, 0.5, 4 * FRAME_DURATION),
+        (2 * FRAME_DURATION, 1, 3 * FRAME_DURATION, 2 * FRAME_DURATION, 0, 0, 0.25, 8 * FRAME_DURATION),
+        (4 * FRAME_DURATION, 0.75, 100, 10 * FRAME_DURATION, 3 * FRAME_DURATION, 0, 0.3, 6 * FRAME_DURATION),
+        (FRAME_DURATION, 1, FRAME_DURATION, 2 * FRAME_DURATION, 0, 10 * FRAME_DURATION, 0.5, 3 * FRAME_DURATION),
+        (3 * FRAME_DURATION, 0.6, 0, FRAME_DURATION, 0, 0, 0.6, FRAME_DURATION),
+    ])
+    def test_replay_with_hysteresis(self, activity_window, activity_threshold, allow_gap, padding, min_duration,
+                                    max_duration, offset_threshold, offset_window):
+        parameters = SegmentationParameters(activity_window, activity_threshold, allow_gap, padding, min_duration,
+                                            max_duration, offset_threshold, offset_window)
+        vad = DecisionVAD(activity_window, activity_threshold, allow_gap, padding, min_duration,
+                          max_duration=max_duration, offset_threshold=offset_threshold, offset_window=offset_window)
+
+        for seed in range(5):
+            decisions = random_decisions(seed)
+            frames = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+            self.assertEqual(detect_all(vad, frames), replay_segments(decisions, FRAME_DURATION, parameters))
+
+    def test_replay_edge_cases(self):
+        parameters = SegmentationParameters(4 * FRAME_DURATION, 0.5, FRAME_DURATION, 2 * FRAME_DURATION, 0)
+        vad = DecisionVAD(4 * FRAME_DURATION, 0.5, FRAME_DURATION, 2 * FRAME_DURATION, 0)
+
+        for decisions in ([], [True], [False] * 3, [True] * 10, [True, False, False, False, True]):
+            decisions = np.array(decisions, dtype=bool)
+            frames = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+
+            self.assertEqual(detect_all(vad, frames), replay_segments(decisions, FRAME_DURATION, parameters))
+
+    def test_frame_wise_vad_segments(self):
+        decisions = random_decisions(0)
+        frames = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+        vad = DecisionVAD(4 * FRAME_DURATION, 0.5, 3 * FRAME_DURATION, 2 * FRAME_DURATION, 0)
+
+        frame_decisions = FrameDecisions.compute(vad, frames, SAMPLING_RATE)
+
+        self.assertEqual(detect_all(vad, frames), vad.segments(frame_decisions))
+
+    def test_save_and_load_decisions(self):
+        decisions = random_decisions(0, length=101)
+
+        with tempfile.TemporaryDirectory() as directory:
+            FrameDecisions(decisions, FRAME_DURATION).save(f"{directory}/decisions")
+            loaded = FrameDecisions.load(f"{directory}/decisions")
+
+        self.assertEqual(FRAME_DURATION, loaded.frame_duration)
+        np.testing.assert_array_equal(decisions, loaded.decisions)
+
+    def test_sweep(self):
+        frame_decisions = FrameDecisions(random_decisions(0), FRAME_DURATION)
+        grid = [{"activity_window": window, "padding": 0} for window in (30, 120)]
+
+        results = sweep(frame_decisions, grid)
+
+        self.assertEqual(grid, [setting for setting, _ in results])
+        self.assertTrue(all(segments for _, segments in results))
@@ -0,0 +1,36 @@
+import io
+import unittest
+
+import numpy as np
+
+from app.stream import read_frames, segment_bytes
+
+
+class ShortReads(io.RawIOBase):
+    """Stream returning at most `chunk` bytes per read"""
+    def __init__(self, data: bytes, chunk: int):
+        self._data = io.BytesIO(data)
+        self._chunk = chunk
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._data.read(min(len(b), self._chunk))
+        b[:len(data)] = data
+
+        return len(data)
+
+
+class TestStream(unittest.TestCase):
+    def test_read_frames_from_short_chunks(self):
+        audio = np.arange(10 * 16 * 2, dtype=np.int16).reshape((10, 16, 2))
+        # Append an incomplete frame
+        data = audio.tobytes() + b'\x00' * 7
+
+        frames = list(read_frames(ShortReads(data, 13), 16, 2, block_frames=4))
+
+        self.assertEqual(10, len(frames))
+        self.assertTrue(all(frame.shape == (16, 2) for frame in frames))
+        np.testing.assert_array_equal(audio, np.stack(frames))
+        self.assertEqual(audio.tobytes(), segment_bytes(frames))
@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+import soundfile as sf
+from importlib.resources import path
+
+from cltl.vad.frame_vad import FrameWiseVAD
+from cltl.vad.timeline import ActivityTimeline
+from cltl.vad.webrtc_vad import WebRtcVAD
+
+
+SAMPLING_RATE = 16000
+FRAME_DURATION = 30
+FRAME_LENGTH = (FRAME_DURATION * SAMPLING_RATE) // 1000
+
+
+class DecisionVAD(FrameWiseVAD):
+    """Uses the first sample of each channel as decision"""
+    def is_vad(self, audio_frame: np.ndarray, sampling_rate: int) -> bool:
+        return audio_frame[0].max() > 0
+
+    def channel_decisions(self, audio_frame: np.ndarray, sampling_rate: int) -> np.ndarray:
+        return audio_frame[0] > 0
+
+
+def frames(*decisions):
+    return [np.tile(np.array(decision, dtype=np.int16), (FRAME_LENGTH, 1)) for decision in decisions]
+
+
+class TestActivityTimeline(unittest.TestCase):
+    def setUp(self):
+        # Channel 0: frames 1-3 and 6-, channel 1: frames 3-4, channel 2: none
+        self.timeline = ActivityTimeline.compute(DecisionVAD(), frames(
+            [0, 0, 0], [1, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 0], [1, 0, 0], [1, 0, 0]), SAMPLING_RATE)
+
+    def test_intervals(self):
+        self.assertEqual(3, self.timeline.channels)
+        self.assertEqual(8, len(self.timeline))
+        self.assertEqual(FRAME_DURATION, self.timeline.frame_duration)
+
+        self.assertEqual([(1, 4), (6, 8)], self.timeline.intervals(0))
+        self.assertEqual([(3, 5)], self.timeline.intervals(1))
+        self.assertEqual([], self.timeline.intervals(2))
+
+    def test_interval_queries(self):
+        self.assertEqual([(1, 4)], self.timeline.intervals(0, 0, 4))
+        self.assertEqual([(6, 8)], self.timeline.intervals(0, 4, 6 + 1))
+        self.assertEqual([], self.timeline.intervals(0, 4, 6))
+
+        self.assertEqual([], self.timeline.active_channels(0, 1))
+        self.assertEqual([0, 1], self.timeline.active_channels(3, 4))
+        self.assertEqual([1], self.timeline.active_channels(4, 5))
+        self.assertEqual([0], self.timeline.active_channels(5, 10))
+
+    def test_overlaps(self):
+        self.assertEqual([(3, 4)], self.timeline.overlaps())
+        self.assertEqual([(1, 5), (6, 8)], self.timeline.overlaps(min_channels=1))
+        self.assertEqual([], self.timeline.overlaps(min_channels=3))
+
+    def test_segments_per_channel(self):
+        vad = DecisionVAD(padding=0)
+        segments = self.timeline.segments(vad)
+
+        for channel in range(3):
+            decisions = self.timeline.decisions(channel).decisions
+            expected = []
+            start = 0
+            audio = [np.full((FRAME_LENGTH,), int(decision), dtype=np.int16) for decision in decisions]
+            while start < len(audio):
+                speech, offset, consumed = vad.detect_vad(iter(audio[start:]), SAMPLING_RATE)
+                speech = list(speech)
+                if speech:
+                    expected.append((start + offset, len(speech)))
+                start += consumed
+            self.assertEqual(expected, segments[channel])
+
+    def test_webrtc_channels(self):
+        with path("resources", "test.wav") as wav:
+            speech_array, sampling_rate = sf.read(wav, dtype=np.int16)
+
+        total = len(speech_array) // FRAME_LENGTH
+        stereo = np.stack([speech_array, np.zeros_like(speech_array)], axis=1)
+        audio_frames = np.split(stereo[:total * FRAME_LENGTH], total)
+
+        vad = WebRtcVAD(mode=2)
+        timeline = ActivityTimeline.compute(vad, audio_frames, sampling_rate)
+
+        self.assertEqual(2, timeline.channels)
+        self.assertEqual(total, len(timeline))
+        self.assertTrue(timeline.intervals(0))
+        self.assertEqual([], timeline.intervals(1))
+        self.assertEqual([0], timeline.active_channels(0, total))
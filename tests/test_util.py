@@ -6,7 +6,7 @@ import matplotlib.pyplot as plt
 
 import numpy as np
 
-from cltl.vad.util import as_iterable
+from cltl.vad.util import as_iterable, cancellable, CancelToken
 
 
 def plot_wav(audio_array: np.array, sampling_rate, window_size, marked):
@@ -44,3 +44,38 @@ class TestVADUtil(unittest.TestCase):
             self.assertEqual(i, element.shape[0])
             length += 1
         self.assertEqual(10, length)
+
+    def test_as_iterable_cancelled(self):
+        queue = Queue()
+        cancel = CancelToken()
+
+        list(map(queue.put, range(3)))
+
+        iterable = as_iterable(queue, cancel)
+        self.assertEqual([0, 1, 2], [next(iterable) for _ in range(3)])
+
+        cancel.cancel()
+        self.assertEqual([], list(iterable))
+
+    def test_cancellable(self):
+        cancel = CancelToken()
+
+        def frames():
+            for i in range(10):
+                if i == 5:
+                    cancel.cancel()
+                yield i
+
+        self.assertEqual(list(range(5)), list(cancellable(frames(), cancel)))
+
+    def test_cancel_token_callbacks(self):
+        cancel = CancelToken()
+        calls = []
+
+        cancel.on_cancel(lambda: calls.append(1))
+        cancel.cancel()
+        cancel.cancel()
+        cancel.on_cancel(lambda: calls.append(2))
+
+        self.assertTrue(cancel.cancelled)
+        self.assertEqual([1, 2], calls)
@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from cltl_service.vad.shared_source import SharedAudioWriter, SharedMemoryAudioSource
+
+
+URL = "cltl-storage:audio/test-shared-source"
+
+
+class TestSharedSource(unittest.TestCase):
+    def test_read_written_frames(self):
+        frames = [np.full((16, 2), i, dtype=np.int16) for i in range(10)]
+
+        with SharedAudioWriter(URL, 16000, 2, 16, capacity=16) as writer:
+            with SharedMemoryAudioSource.for_url(URL, offset=0) as source:
+                self.assertEqual(16000, source.rate)
+                self.assertEqual(2, source.channels)
+                self.assertEqual(16, source.frame_size)
+
+                def write():
+                    for frame in frames[:-1]:
+                        writer.write(frame)
+                    writer.write(frames[-1].tobytes())
+                    writer.close()
+
+                thread = threading.Thread(target=write)
+                audio = source.audio
+                thread.start()
+                received = [int(frame[0, 0]) for frame in audio]
+                thread.join()
+
+        self.assertEqual(list(range(10)), received)
+
+    def test_read_with_offset_and_length(self):
+        with SharedAudioWriter(URL, 16000, 1, 16, capacity=10) as writer:
+            for i in range(10):
+                writer.write(np.full((16, 1), i, dtype=np.int16))
+
+            with SharedMemoryAudioSource.for_url(URL, offset=2 * 16, length=3 * 16) as source:
+                received = [int(frame[0, 0]) for frame in source.audio]
+
+        self.assertEqual([2, 3, 4], received)
+
+    def test_overrun(self):
+        with SharedAudioWriter(URL, 16000, 1, 16, capacity=4, max_wait=0) as writer:
+            with SharedMemoryAudioSource.for_url(URL) as source:
+                for i in range(5):
+                    writer.write(np.full((16, 1), i, dtype=np.int16))
+
+                with self.assertRaises(ValueError):
+                    next(iter(source.audio))
+
+    def test_read_full_buffer(self):
+        with SharedAudioWriter(URL, 16000, 1, 16, capacity=4, max_wait=0) as writer:
+            with SharedMemoryAudioSource.for_url(URL, length=4 * 16) as source:
+                for i in range(4):
+                    writer.write(np.full((16, 1), i, dtype=np.int16))
+
+                received = [int(frame[0, 0]) for frame in source.audio]
+
+        self.assertEqual([0, 1, 2, 3], received)
+
+    def test_writer_waits_for_held_frames(self):
+        with SharedAudioWriter(URL, 16000, 1, 16, capacity=2, max_wait=10) as writer:
+            with SharedMemoryAudioSource.for_url(URL) as source:
+                writer.write(np.zeros((16, 1), dtype=np.int16))
+                writer.write(np.ones((16, 1), dtype=np.int16))
+                audio = iter(source.audio)
+                # Hold the first frame only through a derived array
+                derived = np.frombuffer(next(audio).data, dtype=np.int16)
+
+                thread = threading.Thread(target=writer.write, args=(np.full((16, 1), 2, dtype=np.int16),))
+                thread.start()
+                thread.join(0.2)
+                self.assertTrue(thread.is_alive())
+                self.assertEqual([0] * 16, derived.tolist())
+
+                del derived
+                self.assertEqual([1] * 16, next(audio).ravel().tolist())
+                thread.join(1)
+                self.assertFalse(thread.is_alive())
+                self.assertEqual([2] * 16, next(audio).ravel().tolist())
+
+    def test_writer_does_not_wait_without_reader(self):
+        with SharedAudioWriter(URL, 16000, 1, 16, capacity=2, max_wait=10) as writer:
+            with SharedMemoryAudioSource.for_url(URL) as source:
+                writer.write(np.zeros((16, 1), dtype=np.int16))
+                frame = next(iter(source.audio))
+
+            start = time.monotonic()
+            for i in range(1, 4):
+                writer.write(np.full((16, 1), i, dtype=np.int16))
+
+            self.assertLess(time.monotonic() - start, 1)
+
+    def test_interrupt(self):
+        with SharedAudioWriter(URL, 16000, 1, 16, capacity=4):
+            with SharedMemoryAudioSource.for_url(URL, poll_interval=10) as source:
+                timer = threading.Timer(0.1, source.interrupt)
+                timer.start()
+                start = time.monotonic()
+                received = list(source.audio)
+                timer.join()
+
+        self.assertEqual([], received)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_missing_segment(self):
+        with self.assertRaises(FileNotFoundError):
+            SharedMemoryAudioSource.for_url("cltl-storage:audio/not-shared")
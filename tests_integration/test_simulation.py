@@ -0,0 +1,42 @@
+import unittest
+from importlib.resources import path
+
+from cltl.vad.factory import DetectorSpec
+from cltl.vad.profiling import PROFILER
+from cltl_service.vad.simulation import LoadSimulation, Recording
+
+
+class TestLoadSimulation(unittest.TestCase):
+    def setUp(self):
+        with path("resources", "test.wav") as wav:
+            self.recording = Recording.load(str(wav))
+
+    def test_paced_replay(self):
+        vad = DetectorSpec("webrtc", dict(activity_window=90, activity_threshold=0.5, allow_gap=200, padding=60,
+                                          mode=3))
+        simulation = LoadSimulation(vad, [self.recording], sessions=3, speed=4)
+
+        report = simulation.run(timeout=10)
+        summary = report.summary()
+
+        self.assertEqual(3, summary["completed"])
+        self.assertGreater(summary["segments"], 0)
+        self.assertEqual({"signal-0", "signal-1", "signal-2"}, {signal.signal_id for signal in report.signals})
+        # Events are received after the end of the segment was replayed
+        self.assertGreater(summary["latency"]["mean"], -0.01)
+        self.assertGreater(report.elapsed, self.recording.duration / 4)
+        self.assertGreaterEqual(summary["max_threads"], 3)
+        self.assertIsNotNone(summary["real_time_factor"])
+
+    def test_unpaced_replay(self):
+        vad = DetectorSpec("webrtc", dict(activity_window=90, activity_threshold=0.5, allow_gap=200, padding=60,
+                                          mode=3))
+        simulation = LoadSimulation(vad, [self.recording], sessions=2, speed=0)
+
+        summary = simulation.run(timeout=10).summary()
+
+        self.assertEqual(2, summary["completed"])
+        self.assertGreater(summary["segments"], 0)
+        # Only the simulated signals are profiled
+        self.assertFalse(PROFILER.enabled)
+        self.assertIsNotNone(summary["real_time_factor"])
@@ -1,16 +1,27 @@
 import threading
+import time
 import unittest
 from queue import Queue, Empty
 from typing import Iterable
+from unittest import mock
 
 import numpy as np
 from cltl.backend.spi.audio import AudioSource
 from cltl.combot.infra.event import Event
 from cltl.combot.infra.event.memory import SynchronousEventBus
+from cltl.combot.event.emissor import AudioSignalStopped
 from cltl_service.backend.schema import AudioSignalStarted
 from emissor.representation.scenario import AudioSignal
 
 from cltl.vad.api import VAD
+from cltl.vad.cache import SegmentCache
+from cltl.vad.factory import DetectorSpec
+from cltl.vad.frame_vad import FrameWiseVAD, WALL_CLOCK
+from cltl.vad.lookback import LookbackBuffers
+from cltl.vad.profiling import PROFILER
+from cltl.vad.segment_index import SegmentIndexes
+from cltl_service.vad.schema import VadSegmentsEvent, VadChunkEvent, VadMentionEvent
+from cltl_service.vad import service
 from cltl_service.vad.service import VadService
 
 
@@ -85,6 +96,34 @@ def test_source(start, speech_started, speech_ended):
     return TestSource
 
 
+def static_source(frames):
+    class StaticSource(AudioSource):
+        def __init__(self, url, offset, length):
+            self.offset = offset // 16
+
+        @property
+        def audio(self) -> Iterable[np.array]:
+            return (np.full((16, 1), value, dtype=np.int16) for value in frames[self.offset:])
+
+        @property
+        def rate(self):
+            return 16000
+
+        @property
+        def channels(self):
+            return 1
+
+        @property
+        def frame_size(self):
+            return 16
+
+        @property
+        def depth(self):
+            return 2
+
+    return StaticSource
+
+
 class DummyVad(VAD):
     def is_vad(self, audio_frame: np.array, sampling_rate: int) -> bool:
         return audio_frame.sum() > 0
@@ -94,6 +133,7 @@ class DummyVad(VAD):
         is_vad = False
         offset = 0
         speech = []
+        last = -1
         for last, frame in enumerate(audio_frames):
             if is_vad and not self.is_vad(frame, sampling_rate):
                 return speech, offset, last + 1
@@ -106,6 +146,11 @@ class DummyVad(VAD):
         return speech, offset, last + 1
 
 
+class DummyFrameVad(FrameWiseVAD):
+    def is_vad(self, audio_frame: np.array, sampling_rate: int) -> bool:
+        return audio_frame.sum() > 0
+
+
 class TestVAD(unittest.TestCase):
     def setUp(self) -> None:
         self.event_bus = SynchronousEventBus()
@@ -161,3 +206,509 @@ class TestVAD(unittest.TestCase):
         event = events.get(block=True, timeout=0.1)
         self.assertEqual(7 * 16, event.payload.mentions[0].segment[0].start)
         self.assertEqual(10 * 16, event.payload.mentions[0].segment[0].stop)
+
+    def test_batched_events_from_vad_service(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(),
+                                      static_source([0, 1, 0, 1, 1, 0, 1, 0]), self.event_bus, None,
+                                      batch_size=2, batch_window=60)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        event = events.get(block=True, timeout=1)
+        self.assertEqual([(16, 32), (48, 80)], [(mention.segment[0].start, mention.segment[0].stop)
+                                                for mention in event.payload.mentions])
+
+        event = events.get(block=True, timeout=1)
+        self.assertEqual([(96, 112)], [(mention.segment[0].start, mention.segment[0].stop)
+                                       for mention in event.payload.mentions])
+
+    def test_batch_published_after_window_without_speech(self):
+        release = threading.Event()
+
+        class LiveSource(static_source([])):
+            @property
+            def audio(self) -> Iterable[np.array]:
+                yield from (np.full((16, 1), value, dtype=np.int16) for value in [0, 1, 0][self.offset:])
+                # No further speech on the live signal
+                release.wait(5)
+
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), LiveSource, self.event_bus, None,
+                                      batch_size=10, batch_window=0.1)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        try:
+            event = events.get(block=True, timeout=1)
+            self.assertEqual([(16, 32)], [(mention.segment[0].start, mention.segment[0].stop)
+                                          for mention in event.payload.mentions])
+        finally:
+            release.set()
+
+    def test_listen_timeout_interrupts_stalled_source(self):
+        interrupted = threading.Event()
+        opened = []
+
+        class StalledSource(static_source([])):
+            def __init__(self, url, offset, length):
+                super().__init__(url, offset, length)
+                opened.append(offset)
+
+            @property
+            def audio(self) -> Iterable[np.array]:
+                yield from (np.full((16, 1), value, dtype=np.int16) for value in [0, 0][self.offset:])
+                # The signal stalls until the source is interrupted
+                interrupted.wait(5)
+
+            def interrupt(self):
+                interrupted.set()
+
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyFrameVad(timeout_clock=WALL_CLOCK),
+                                      StalledSource, self.event_bus, None, listen_timeout=0.2)
+        self.vad_service.start()
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        self.assertTrue(interrupted.wait(2))
+        # Wait for the task to end, the signal is not processed after the timeout
+        for _ in range(20):
+            if not self.vad_service._tasks[1][0].running():
+                break
+            time.sleep(0.05)
+        self.assertTrue(self.vad_service._tasks[1][0].done())
+        self.assertEqual([0], opened)
+
+    def test_detect_until_end_of_stopped_signal(self):
+        release = threading.Event()
+        frames = [0, 1, 0, 1, 0]
+
+        class SlowSource(static_source([])):
+            @property
+            def audio(self) -> Iterable[np.array]:
+                for position in range(self.offset, len(frames)):
+                    if position == 3:
+                        # Remaining audio arrives after the signal was stopped
+                        release.wait(1)
+                    yield np.full((16, 1), frames[position], dtype=np.int16)
+
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), SlowSource, self.event_bus, None)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        event = events.get(block=True, timeout=1)
+        segment = event.payload.mentions[0].segment[0]
+        self.assertEqual((16, 32), (segment.start, segment.stop))
+
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStopped.create(audio_signal)))
+        for _ in range(20):
+            if 1 in self.vad_service._stopping:
+                break
+            time.sleep(0.05)
+        self.assertIn(1, self.vad_service._stopping)
+        release.set()
+
+        event = events.get(block=True, timeout=1)
+        segment = event.payload.mentions[0].segment[0]
+        self.assertEqual((48, 64), (segment.start, segment.stop))
+
+    def test_stop_cancels_running_tasks(self):
+        release = threading.Event()
+
+        class StalledSource(static_source([])):
+            @property
+            def audio(self) -> Iterable[np.array]:
+                yield np.zeros((16, 1), dtype=np.int16)
+                release.wait(5)
+                yield np.zeros((16, 1), dtype=np.int16)
+
+            def interrupt(self):
+                release.set()
+
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), StalledSource, self.event_bus, None,
+                                      stop_timeout=2)
+        self.vad_service.start()
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        for _ in range(20):
+            if 1 in self.vad_service._tasks:
+                break
+            time.sleep(0.05)
+        task, _ = self.vad_service._tasks[1]
+
+        self.vad_service.stop()
+        self.vad_service = None
+
+        self.assertTrue(release.is_set())
+        self.assertTrue(task.done())
+
+    def test_no_timeout_for_task_finished_before_stop(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), static_source([0, 1, 0]),
+                                      self.event_bus, None, stop_timeout=0.1)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        events.get(block=True, timeout=1)
+        # The task is registered after it was submitted
+        for _ in range(20):
+            if 1 in self.vad_service._tasks:
+                break
+            time.sleep(0.05)
+        task, _ = self.vad_service._tasks[1]
+        task.result(timeout=1)
+
+        with mock.patch.object(service.logger, "error") as error:
+            self.vad_service._process_completed()
+            self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStopped.create(audio_signal)))
+            time.sleep(0.2)
+            self.vad_service._process_completed()
+
+        error.assert_not_called()
+        self.assertEqual({}, self.vad_service._stopping)
+
+    def test_audio_source_opened_once_per_signal(self):
+        for vad in [DummyVad(), DummyFrameVad(padding=0, allow_gap=0)]:
+            with self.subTest(vad=vad.__class__.__name__):
+                opened, closed = [], []
+
+                class CountingSource(static_source([0, 1, 0, 0, 1, 1, 0, 0, 1, 0, 0])):
+                    def __init__(self, url, offset, length):
+                        super().__init__(url, offset, length)
+                        opened.append(offset)
+
+                    def __enter__(self):
+                        return self
+
+                    def __exit__(self, exc_type, exc_val, exc_tb):
+                        closed.append(self.offset)
+
+                event_bus = SynchronousEventBus()
+                vad_service = VadService("mic_topic", "vad_topic", vad, CountingSource, event_bus, None)
+                vad_service.start()
+                try:
+                    events = Queue()
+                    event_bus.subscribe("vad_topic", events.put)
+
+                    audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2,
+                                                            signal_id=1)
+                    event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+                    segments = [events.get(block=True, timeout=1).payload.mentions[0].segment[0] for _ in range(3)]
+                    self.assertEqual([(16, 32), (64, 96), (128, 144)],
+                                     [(segment.start, segment.stop) for segment in segments])
+                    for _ in range(20):
+                        if closed:
+                            break
+                        time.sleep(0.05)
+                    self.assertEqual([0], opened)
+                    self.assertEqual([0], closed)
+                finally:
+                    vad_service.stop()
+
+    def test_audio_source_reopened_after_split(self):
+        opened = []
+
+        class CountingSource(static_source([0, 1, 1, 1, 1, 0, 0])):
+            def __init__(self, url, offset, length):
+                super().__init__(url, offset, length)
+                opened.append(offset)
+
+        # Voice activity is split after two frames, detection continues with the frame read before the split
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyFrameVad(padding=0, max_duration=2),
+                                      CountingSource, self.event_bus, None)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        segments = [events.get(block=True, timeout=1).payload.mentions[0].segment[0] for _ in range(2)]
+        self.assertEqual([(16, 48), (48, 80)], [(segment.start, segment.stop) for segment in segments])
+        self.assertEqual([0, 48], opened)
+
+    def test_stop_closes_audio_session(self):
+        class Session:
+            closed = 0
+
+            def close(self):
+                self.closed += 1
+
+        session = Session()
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), static_source([]), self.event_bus, None,
+                                      audio_session=session)
+        # Stopping a service that was not started is a no-op
+        self.vad_service.stop()
+        self.assertEqual(0, session.closed)
+
+        self.vad_service.start()
+        self.vad_service.stop()
+        self.assertEqual(1, session.closed)
+        self.vad_service = None
+
+    def test_compact_events_from_vad_service(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(),
+                                      static_source([0, 1, 0, 1, 1, 0, 1, 0]), self.event_bus, None,
+                                      batch_size=10, batch_window=60, compact=True)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        event = events.get(block=True, timeout=1)
+        self.assertEqual(VadSegmentsEvent.__name__, event.payload.type)
+        self.assertEqual(1, event.payload.signal_id)
+        self.assertEqual([16, 48, 96], event.payload.starts)
+        self.assertEqual([32, 80, 112], event.payload.stops)
+
+    def test_cached_events_from_vad_service(self):
+        cache = SegmentCache()
+        cache.put(SegmentCache.key("cltl-storage:audio/1", DummyVad()), [(16, 32), (48, 80)])
+
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), static_source([]), self.event_bus, None,
+                                      cache=cache)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        self.assertEqual(16, events.get(block=True, timeout=1).payload.mentions[0].segment[0].start)
+        self.assertEqual(48, events.get(block=True, timeout=1).payload.mentions[0].segment[0].start)
+
+    def test_chunked_events_from_vad_service(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyFrameVad(padding=0),
+                                      static_source([0, 1, 1, 1, 1, 1, 0, 0, 0]), self.event_bus, None,
+                                      chunk_duration=2, chunk_overlap=1)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        received = [events.get(block=True, timeout=1).payload for _ in range(3)]
+
+        self.assertEqual([VadChunkEvent.__name__, VadChunkEvent.__name__, VadMentionEvent.__name__],
+                         [payload.type for payload in received])
+        self.assertEqual([(16, 48), (32, 80), (16, 96)],
+                         [(payload.mentions[0].segment[0].start, payload.mentions[0].segment[0].stop)
+                          for payload in received])
+        self.assertEqual(1, len({payload.mentions[0].id for payload in received}))
+
+    def test_profiling_routes(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyFrameVad(padding=0),
+                                      static_source([0, 1, 1, 0, 0, 0]), self.event_bus, None)
+        client = self.vad_service.app.test_client()
+
+        self.assertEqual("False", client.get("/rest/profiling").get_data(as_text=True))
+        self.assertEqual("True", client.post("/rest/profiling").get_data(as_text=True))
+        try:
+            self.vad_service.start()
+
+            events = Queue()
+            self.event_bus.subscribe("vad_topic", events.put)
+
+            audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2,
+                                                    signal_id="profiled")
+            self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+            events.get(block=True, timeout=1)
+
+            # The profile is completed after the last detection
+            for _ in range(100):
+                response = client.get("/rest/profile/profiled")
+                if response.status_code == 200 and response.get_json()["completed"]:
+                    break
+                threading.Event().wait(0.01)
+
+            profile = response.get_json()
+            self.assertTrue(profile["completed"])
+            self.assertEqual({"read", "is_vad", "detection", "payload", "publish"}, set(profile["stages"]))
+            self.assertIsNotNone(profile["real_time_factor"])
+            self.assertEqual(404, client.get("/rest/profile/unknown").status_code)
+        finally:
+            client.post("/rest/profiling/stop")
+
+        self.assertFalse(PROFILER.enabled)
+
+    def test_segment_index_routes(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(),
+                                      static_source([0, 1, 0, 1, 1, 0, 1, 0]), self.event_bus, None,
+                                      segment_index=SegmentIndexes())
+        client = self.vad_service.app.test_client()
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id="indexed")
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        for _ in range(3):
+            events.get(block=True, timeout=1)
+
+        self.assertEqual({"indexed": 3}, client.get("/rest/segments").get_json())
+
+        response = client.get("/rest/segments/indexed").get_json()
+        self.assertEqual(16000, response["rate"])
+        self.assertEqual([(16, 32), (48, 80), (96, 112)],
+                         [(segment["start"], segment["end"]) for segment in response["segments"]])
+
+        response = client.get("/rest/segments/indexed?start=40&end=100").get_json()
+        self.assertEqual([48, 96], [segment["start"] for segment in response["segments"]])
+
+        # 48 samples at 16kHz before the end of the last segment
+        response = client.get("/rest/segments/indexed?last=0.003").get_json()
+        self.assertEqual([48, 96], [segment["start"] for segment in response["segments"]])
+
+        self.assertEqual(400, client.get("/rest/segments/indexed?start=x").status_code)
+        self.assertEqual(404, client.get("/rest/segments/unknown").status_code)
+
+    def test_segment_index_of_reprocessed_signal(self):
+        cache = SegmentCache()
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(),
+                                      static_source([0, 1, 0, 1, 1, 0, 1, 0]), self.event_bus, None,
+                                      segment_index=SegmentIndexes(), cache=cache)
+        client = self.vad_service.app.test_client()
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id="indexed")
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        for _ in range(3):
+            events.get(block=True, timeout=1)
+        # Segments are cached when the task finished
+        key = SegmentCache.key("cltl-storage:audio/1", DummyVad())
+        for _ in range(20):
+            if cache.get(key) is not None:
+                break
+            time.sleep(0.05)
+        self.assertIsNotNone(cache.get(key))
+
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        for _ in range(3):
+            events.get(block=True, timeout=1)
+
+        # The second run is served from the cache and replaces the indexed segments
+        self.assertEqual({"indexed": 3}, client.get("/rest/segments").get_json())
+        response = client.get("/rest/segments/indexed?last=0.003").get_json()
+        self.assertEqual(16000, response["rate"])
+        self.assertEqual([48, 96], [segment["start"] for segment in response["segments"]])
+
+    def test_lookback_routes(self):
+        # Retain 3 frames of 16 samples at 16kHz
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(),
+                                      static_source([0, 1, 0, 2, 3, 0]), self.event_bus, None,
+                                      lookback=LookbackBuffers(48 / 16000))
+        client = self.vad_service.app.test_client()
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2,
+                                                signal_id="retained")
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+        for _ in range(2):
+            events.get(block=True, timeout=1)
+
+        response = client.get("/rest/lookback/retained").get_json()
+        self.assertEqual((3 * 16, 6 * 16, 16000), (response["start"], response["end"], response["rate"]))
+
+        audio = self.vad_service.lookback_audio("retained", 3 * 16, 5 * 16)
+        self.assertEqual([2] * 16 + [3] * 16, audio.ravel().tolist())
+
+        response = client.get("/rest/lookback/retained/audio?start=48&end=80")
+        self.assertTrue(response.content_type.startswith("audio/L16; rate=16000"))
+        self.assertEqual(audio.ravel().tolist(), np.frombuffer(response.data, dtype='>i2').tolist())
+
+        self.assertEqual(400, client.get("/rest/lookback/retained/audio?start=0&end=16").status_code)
+        self.assertEqual(404, client.get("/rest/lookback/unknown").status_code)
+
+    def test_events_from_detector_spec(self):
+        spec = DetectorSpec(f"{DummyFrameVad.__module__}.DummyFrameVad", {"padding": 0})
+        self.vad_service = VadService("mic_topic", "vad_topic", spec,
+                                      static_source([0, 1, 0, 0, 1, 1, 0, 0]), self.event_bus, None)
+        self.vad_service.start()
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        segments = [events.get(block=True, timeout=1).payload.mentions[0].segment[0] for _ in range(2)]
+        self.assertEqual([(16, 32), (64, 96)], [(segment.start, segment.stop) for segment in segments])
+
+    def test_reconfigure_route(self):
+        spec = DetectorSpec(f"{DummyFrameVad.__module__}.DummyFrameVad", {"padding": 0})
+        self.vad_service = VadService("mic_topic", "vad_topic", spec,
+                                      static_source([0, 1, 0, 0, 1, 1, 0, 0]), self.event_bus, None)
+        client = self.vad_service.app.test_client()
+        self.vad_service.start()
+
+        # Bridge gaps of up to 3 frames of 1 ms
+        response = client.put("/rest/vad", json={"allow_gap": 3})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"padding": 0, "allow_gap": 3}, response.get_json()["parameters"])
+        self.assertEqual({"padding": 0, "allow_gap": 3}, client.get("/rest/vad").get_json()["parameters"])
+
+        self.assertEqual(400, client.put("/rest/vad", json={"unknown": 1}).status_code)
+        self.assertEqual(400, client.put("/rest/vad", json={"padding": "200"}).status_code)
+        self.assertEqual(400, client.put("/rest/vad", json={"activity_threshold": "x"}).status_code)
+        self.assertEqual(400, client.put("/rest/vad", data="1").status_code)
+        self.assertEqual({"padding": 0, "allow_gap": 3}, client.get("/rest/vad").get_json()["parameters"])
+
+        events = Queue()
+        self.event_bus.subscribe("vad_topic", events.put)
+
+        audio_signal = AudioSignal.for_scenario("scenario_id", 0, 1, f"cltl-storage:audio/1", 1, 2, signal_id=1)
+        self.event_bus.publish("mic_topic", Event.for_payload(AudioSignalStarted.create(audio_signal)))
+
+        segment = events.get(block=True, timeout=1).payload.mentions[0].segment[0]
+        self.assertEqual((16, 96), (segment.start, segment.stop))
+
+    def test_reconfigure_requires_spec(self):
+        self.vad_service = VadService("mic_topic", "vad_topic", DummyVad(), static_source([0, 1]), self.event_bus, None)
+        client = self.vad_service.app.test_client()
+        self.vad_service.start()
+
+        self.assertEqual("DummyVad", client.get("/rest/vad").get_json()["type"])
+        self.assertEqual(409, client.put("/rest/vad", json={"padding": 1}).status_code)
+
+    def test_reconfigure_validates_frame_counts(self):
+        spec = DetectorSpec(f"{DummyFrameVad.__module__}.DummyFrameVad", {"padding": 0})
+        self.vad_service = VadService("mic_topic", "vad_topic", spec, static_source([0, 1]), self.event_bus, None)
+        self.vad_service.start()
+
+        with self.assertRaises(TypeError):
+            self.vad_service.reconfigure(DetectorSpec(spec.type, {"padding": "200"}))
+
+        self.assertEqual(spec, self.vad_service._spec)
+